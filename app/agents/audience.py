@@ -0,0 +1,339 @@
+"""
+Audience Analysis Module
+
+Runs the Audience_Sketch agent over a campaign's creators. Small campaigns
+go to a single agent run. Campaigns whose serialized creators exceed
+`audience_shard_token_budget` are analyzed map-reduce style: creators are
+packed into token-budgeted shards, the agent runs on the shards
+concurrently (at most `audience_shard_concurrency` at a time, inside a
+TaskGroup so one failure cancels the rest), and the partial analyses are
+merged deterministically into one AudienceAnalysisResponse.
+
+Merge rules:
+- Micro-segments with the same name (case and whitespace insensitive) are
+  combined; creator ids are unioned, core interests ordered by how many
+  shards named them, and view shares re-weighted by each shard's share of
+  the campaign's total mean views
+- Network breakdown counts are summed (shards hold disjoint creators)
+- Rate bands are computed from the creators' USD rate bands
+- Title and macro persona come from the shard with the largest view pool
+
+Results are cached under a content fingerprint of the campaign's creators
+(sorted ids plus a hash of their normalized platform and deliverable data),
+the prompt version, the model and the mode, so repeated calls on unchanged
+data skip the agent entirely. The cache is size-bounded LRU
+(`audience_cache_max_size`); `force_refresh` bypasses the lookup. A request
+arriving while the same analysis is running awaits that run instead of
+starting another, and storing a result drops the campaign's results for
+older data in the same mode.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import statistics
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Literal, Optional, Sequence
+from agents import Runner
+from app.agents.core import create_audience_analysis_agent
+from app.agents.prompts import prompt_registry
+from app.analytics.features import CreatorFeatures
+from app.cache import TTLCache
+from app.db.feature_store import get_campaign_features
+from app.db.queries import creator_details
+from app.serialization import compact_creator_size, estimate_tokens, serialize_creators
+from app.models.audience_analysis import (
+    AudienceAnalysisResponse,
+    MicroSegment,
+    NetworkBreakdown,
+    NetworkCheatSheet,
+    ViewPoolShareRank,
+)
+from app.config import settings
+from app.constants import DefaultValues, PromptNames
+
+logger = logging.getLogger(__name__)
+
+AudienceMode = Literal["auto", "single", "map_reduce"]
+
+audience_cache = TTLCache(
+    "audience_results",
+    max_size=settings.audience_cache_max_size,
+    ttl_seconds=settings.audience_cache_ttl_seconds,
+)
+
+# Analyses in progress, by cache key; duplicates await the running task
+_in_flight: Dict[Hashable, asyncio.Task] = {}
+
+
+@dataclass
+class AudienceAnalysisRun:
+    """Merged agent output plus how it was produced."""
+    output: AudienceAnalysisResponse
+    mode: str
+    shards: int
+    estimated_input_tokens: int
+    agent_input: str = ""  # single-run input, kept for tracing
+    fingerprint: str = ""
+    cached: bool = False
+    age_seconds: float = 0.0
+
+
+def audience_fingerprint(features: Sequence[CreatorFeatures], mode: str) -> str:
+    """
+    Content fingerprint of everything an audience analysis depends on.
+
+    Covers the sorted creator ids, a hash of each creator's serialized
+    details and raw deliverable prices, the Audience_Sketch prompt version,
+    the model and the requested mode.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        "prompt_version": prompt_registry.version(PromptNames.AUDIENCE_SKETCH),
+        "model": str(settings.audience_analysis_model),
+        "mode": mode,
+        "creator_ids": sorted(feature.creator_id for feature in features),
+    }, sort_keys=True).encode())
+    for feature in sorted(features, key=lambda feature: feature.creator_id):
+        digest.update(json.dumps(
+            [creator_details(feature), feature.prices],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        ).encode())
+    return digest.hexdigest()
+
+
+def shard_creators(
+    features: Sequence[CreatorFeatures],
+    token_budget: int
+) -> List[List[CreatorFeatures]]:
+    """
+    Pack creators, in order, into shards whose serialized size stays within `token_budget`.
+
+    A creator larger than the budget on its own gets a shard to itself.
+    """
+    shards: List[List[CreatorFeatures]] = []
+    current: List[CreatorFeatures] = []
+    current_tokens = 0
+    for feature in features:
+        tokens = compact_creator_size(creator_details(feature))
+        if current and current_tokens + tokens > token_budget:
+            shards.append(current)
+            current, current_tokens = [], 0
+        current.append(feature)
+        current_tokens += tokens
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _views_pool(shard: Sequence[CreatorFeatures]) -> float:
+    return sum(feature.mean_views or 0.0 for feature in shard)
+
+
+def _segment_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def describe_rate_bands(features: Sequence[CreatorFeatures]) -> str:
+    """Summarize the creators' USD rate bands as one line."""
+    priced = [feature for feature in features if feature.rate_min_usd is not None]
+    if not priced:
+        return f"No formal rates on file for {len(features)} creators"
+    low = min(feature.rate_min_usd for feature in priced)
+    high = max(feature.rate_max_usd for feature in priced)
+    median = statistics.median((feature.rate_min_usd + feature.rate_max_usd) / 2 for feature in priced)
+    return (
+        f"Formal rates from {len(priced)} of {len(features)} creators: "
+        f"${int(low):,}-${int(high):,} USD (median ${int(median):,})"
+    )
+
+
+def merge_audience_analyses(
+    partials: Sequence[AudienceAnalysisResponse],
+    shards: Sequence[Sequence[CreatorFeatures]]
+) -> AudienceAnalysisResponse:
+    """
+    Merge per-shard analyses into one response; the result depends only on the inputs' order.
+
+    Args:
+        partials: Agent output for each shard
+        shards: The creators each partial analysis was produced from
+    """
+    weights = [_views_pool(shard) for shard in shards]
+    if not any(weights):
+        # No view data at all; weight shards by creator count instead
+        weights = [float(len(shard)) for shard in shards]
+    total_weight = sum(weights)
+
+    segments: Dict[str, Dict[str, Any]] = {}
+    for partial, weight in zip(partials, weights):
+        for segment in partial.micro_segments:
+            key = _segment_key(segment.segment)
+            merged = segments.setdefault(key, {
+                "segment": segment.segment,
+                "share": 0.0,
+                "interests": {},
+                "creator_ids": set(),
+            })
+            merged["share"] += segment.views_pool_share_percent * weight / total_weight
+            merged["creator_ids"].update(segment.creator_ids)
+            for interest in segment.core_interests:
+                entry = merged["interests"].setdefault(_segment_key(interest), [interest, 0, len(merged["interests"])])
+                entry[1] += 1
+
+    micro_segments = [
+        MicroSegment(
+            segment=merged["segment"],
+            views_pool_share_percent=round(merged["share"], 2),
+            core_interests=[
+                interest for interest, _, _ in
+                sorted(merged["interests"].values(), key=lambda entry: (-entry[1], entry[2]))
+            ],
+            creator_ids=sorted(merged["creator_ids"]),
+        )
+        for merged in segments.values()
+    ]
+    micro_segments.sort(key=lambda segment: (-segment.views_pool_share_percent, _segment_key(segment.segment)))
+
+    network_breakdown = NetworkBreakdown(
+        **{
+            field: sum(getattr(partial.network_cheatsheet.network_breakdown, field) for partial in partials)
+            for field in NetworkBreakdown.model_fields
+        }
+    )
+
+    # Largest view pool wins; ties go to the earliest shard
+    lead = max(range(len(partials)), key=lambda index: (weights[index], -index))
+    return AudienceAnalysisResponse(
+        title=partials[lead].title,
+        macro_persona=partials[lead].macro_persona,
+        micro_segments=micro_segments,
+        network_cheatsheet=NetworkCheatSheet(
+            views_pool_share_ranked=[
+                ViewPoolShareRank(segment=segment.segment, share_percent=segment.views_pool_share_percent)
+                for segment in micro_segments
+            ],
+            rate_bands=describe_rate_bands([feature for shard in shards for feature in shard]),
+            network_breakdown=network_breakdown,
+        ),
+    )
+
+
+async def _run_agent(agent_input: str) -> AudienceAnalysisResponse:
+    result = await Runner.run(
+        create_audience_analysis_agent(),
+        agent_input,
+        max_turns=DefaultValues.MAX_AGENT_TURNS
+    )
+    return result.final_output
+
+
+async def run_audience_analysis(
+    campaign_id: int,
+    mode: AudienceMode = "auto",
+    force_refresh: bool = False
+) -> AudienceAnalysisRun:
+    """
+    Analyze a campaign's audience, reusing a cached result when nothing it depends on has changed.
+
+    Args:
+        campaign_id: The parent campaign ID to analyze
+        mode: "single" forces one agent run, "map_reduce" always shards,
+            "auto" shards only when the creators exceed the token budget
+        force_refresh: Run the agent even if a cached result exists
+
+    Returns:
+        AudienceAnalysisRun with the (possibly cached) response
+    """
+    features = (await get_campaign_features(campaign_id)).creators
+    fingerprint = await asyncio.to_thread(audience_fingerprint, features, mode)
+    key = ("audience", campaign_id, mode, fingerprint)
+
+    if not force_refresh:
+        cached: Optional[AudienceAnalysisRun] = audience_cache.get(key)
+        if cached is not None:
+            return AudienceAnalysisRun(
+                output=cached.output,
+                mode=cached.mode,
+                shards=cached.shards,
+                estimated_input_tokens=cached.estimated_input_tokens,
+                fingerprint=fingerprint,
+                cached=True,
+                age_seconds=audience_cache.age(key) or 0.0,
+            )
+        task = _in_flight.get(key)
+        if task is not None:
+            return await asyncio.shield(task)
+
+    # Run in its own task so a disconnecting client does not cancel a run others await
+    task = asyncio.ensure_future(_analyze_and_store(key, campaign_id, features, mode, fingerprint))
+    _in_flight[key] = task
+    task.add_done_callback(lambda done: _finish(key, done))
+    return await asyncio.shield(task)
+
+
+async def _analyze_and_store(
+    key: tuple,
+    campaign_id: int,
+    features: List[CreatorFeatures],
+    mode: AudienceMode,
+    fingerprint: str
+) -> AudienceAnalysisRun:
+    audience_run = await _analyze(campaign_id, features, mode)
+    audience_run.fingerprint = fingerprint
+    audience_cache.set(key, audience_run)
+    # Results for the campaign's earlier data can no longer be requested
+    audience_cache.invalidate(lambda other: other[:3] == key[:3] and other != key)
+    return audience_run
+
+
+def _finish(key: tuple, task: asyncio.Task) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    if not task.cancelled():
+        # Mark the exception retrieved; every awaiting request has already received it
+        task.exception()
+
+
+async def _analyze(campaign_id: int, features: List[CreatorFeatures], mode: AudienceMode) -> AudienceAnalysisRun:
+    budget = settings.audience_shard_token_budget
+
+    if mode != "map_reduce" or not features:
+        # Every creator goes into the single run; over the budget, "auto" shards instead of truncating
+        agent_input = serialize_creators([creator_details(feature) for feature in features])
+        estimated_tokens = estimate_tokens(agent_input)
+        if mode == "single" or not features or estimated_tokens <= budget:
+            output = await _run_agent(agent_input)
+            return AudienceAnalysisRun(
+                output=output,
+                mode="single",
+                shards=1,
+                estimated_input_tokens=estimated_tokens,
+                agent_input=agent_input,
+            )
+
+    shards = shard_creators(features, budget)
+    shard_inputs = [
+        serialize_creators([creator_details(feature) for feature in shard], request_type="audience_shard")
+        for shard in shards
+    ]
+    logger.info(f"Audience analysis for campaign {campaign_id}: {len(features)} creators in {len(shards)} shards")
+
+    semaphore = asyncio.Semaphore(settings.audience_shard_concurrency)
+
+    async def run_shard(agent_input: str) -> AudienceAnalysisResponse:
+        async with semaphore:
+            return await _run_agent(agent_input)
+
+    async with asyncio.TaskGroup() as task_group:
+        tasks = [task_group.create_task(run_shard(agent_input)) for agent_input in shard_inputs]
+
+    return AudienceAnalysisRun(
+        output=merge_audience_analyses([task.result() for task in tasks], shards),
+        mode="map_reduce",
+        shards=len(shards),
+        estimated_input_tokens=sum(estimate_tokens(agent_input) for agent_input in shard_inputs),
+    )
@@ -14,7 +14,7 @@ Agent Types:
 """
 
 from agents import Agent, ModelSettings
-from app.tracing import langfuse
+from app.agents.prompts import get_prompt
 from app.models.metadata import MetadataResponse
 from app.models.planning import PlanningResponse
 from app.models.execution import ExecutionResponse
@@ -24,13 +24,13 @@ from app.models.cpm_analysis import CPMAnalysisResponse
 from app.agents.tools import (
     get_campaign_conversation_stages,
     get_campaign_details,
-    find_rates_in_email,
-    parse_pricing_from_email,
-    get_creator_engagement_metrics_MOCK,
-    assess_creator_campaign_fit_MOCK,
-    generate_email_draft,
-    verify_draft_quality,
-    share_campaign_brief_link,
+    find_rates,
+    extract_rates,
+    find_engagement,
+    profile_assessment,
+    draft_writing,
+    verify_draft,
+    share_brief_link,
     get_email_thread_by_id,
     get_creator_details_by_id,
 )
@@ -53,7 +53,7 @@ def create_metadata_agent() -> Agent:
     Returns:
         Agent: Configured metadata extraction agent
     """
-    metadata_prompt = langfuse.get_prompt(PromptNames.EMAIL_METADATA)
+    metadata_prompt = get_prompt(PromptNames.EMAIL_METADATA)
     metadata_instructions = metadata_prompt.prompt
     
     return Agent(
@@ -78,7 +78,7 @@ def create_planning_agent() -> Agent:
     Returns:
         Agent: Configured email planning agent
     """
-    planning_prompt = langfuse.get_prompt(PromptNames.EMAIL_PLANNER)
+    planning_prompt = get_prompt(PromptNames.EMAIL_PLANNER)
     planning_instructions = planning_prompt.prompt
     
     return Agent(
@@ -89,7 +89,7 @@ def create_planning_agent() -> Agent:
     )
 
 def create_execution_agent() -> Agent:
-    execution_prompt = langfuse.get_prompt("email_execution")
+    execution_prompt = get_prompt(PromptNames.EMAIL_EXECUTION)
     execution_instructions = execution_prompt.prompt
     
     return Agent(
@@ -114,7 +114,7 @@ def create_execution_agent() -> Agent:
     )
     
 def create_action_agent() -> Agent:
-    action_prompt = langfuse.get_prompt("action_agent")
+    action_prompt = get_prompt(PromptNames.ACTION_AGENT)
     action_instructions = action_prompt.prompt
     
     return Agent(
@@ -127,15 +127,15 @@ def create_action_agent() -> Agent:
         ),
         tools=[
             get_campaign_details,
-            get_creator_details,
-            get_email_thread,
+            get_creator_details_by_id,
+            get_email_thread_by_id,
             draft_writing
         ],
         output_type=ActionResponse,
     )
     
 def create_audience_analysis_agent() -> Agent:
-    audience_analysis_prompt = langfuse.get_prompt("Audience_Sketch")
+    audience_analysis_prompt = get_prompt(PromptNames.AUDIENCE_SKETCH)
     audience_analysis_instructions = audience_analysis_prompt.prompt
     
     return Agent(
@@ -146,7 +146,7 @@ def create_audience_analysis_agent() -> Agent:
     )
     
 def create_cpm_analysis_agent() -> Agent:
-    cpm_analysis_prompt = langfuse.get_prompt("CPM_Dashbaord")
+    cpm_analysis_prompt = get_prompt(PromptNames.CPM_DASHBOARD)
     cpm_analysis_instructions = cpm_analysis_prompt.prompt
     
     return Agent(
@@ -0,0 +1,193 @@
+"""
+Email Processing Pipeline Module
+
+This module runs the metadata, planning and execution agents for a single
+email conversation. Stages that do not depend on each other's output run
+concurrently inside an asyncio TaskGroup, so a failure in one stage cancels
+its siblings instead of leaving orphaned model calls behind.
+
+Stage Dependencies:
+- Pre-classifier: latest message only; trivial inbound messages (auto-replies,
+  out-of-office, bounces, bare thanks) skip every agent stage
+- Metadata Agent: conversation only
+- Planning Agent: conversation only (inbound emails)
+- Execution Agent: conversation + planning output (inbound emails)
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from agents import Agent, Runner, RunResult, trace
+from app.agents.core import (
+    create_metadata_agent,
+    create_planning_agent,
+    create_execution_agent,
+)
+from app.agents.preclassifier import preclassify
+from app.models.conversation import Conversation
+from app.config import settings
+from app.constants import (
+    MessageDirection,
+    PipelineStages,
+    SpanNames,
+    DefaultValues
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StaticRunResult:
+    """Stands in for an agent's RunResult when a stage was answered without a model call."""
+    final_output: Any
+    new_items: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class EmailPipelineResult:
+    """Agent results and wall-clock timings for one pipeline run."""
+    metadata_result: Union[RunResult, StaticRunResult]
+    planning_result: Optional[Union[RunResult, StaticRunResult]] = None
+    execution_result: Optional[Union[RunResult, StaticRunResult]] = None
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
+    total_ms: float = 0.0
+    fast_path: Optional[str] = None  # message class when the pre-classifier answered
+
+
+def build_execution_input(response_plan: str, conversation_json: str) -> str:
+    """Build the execution agent prompt from the plan and the email thread."""
+    return f"""
+        I need you to execute the following plan for responding to this email thread:
+        {response_plan}
+        Email Thread:
+        {conversation_json}
+        Please follow the plan step by step and generate an appropriate response.
+    """
+
+
+async def _run_stage(
+    stage: str,
+    agent: Agent,
+    agent_input: str,
+    timings: Dict[str, float],
+    **kwargs
+) -> RunResult:
+    """Run a single agent and record its wall-clock duration under `stage`."""
+    start = time.perf_counter()
+    try:
+        return await Runner.run(agent, agent_input, **kwargs)
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def run_email_pipeline(
+    conversation_json: str,
+    direction: Optional[str],
+    conversation: Optional[Conversation] = None
+) -> EmailPipelineResult:
+    """
+    Run the agent pipeline for a serialized conversation.
+
+    When the conversation is given, its latest message is pre-classified
+    first; trivial messages are answered without any agent call. Otherwise
+    metadata extraction and response planning, which both read only the
+    conversation, are started together for inbound emails. Execution waits
+    for the plan. If any stage raises, the TaskGroup cancels the remaining
+    stages and the error propagates as an ExceptionGroup.
+
+    Args:
+        conversation_json: Serialized conversation passed to every agent
+        direction: Direction of the last message in the conversation
+        conversation: The conversation as received, for the pre-classifier
+
+    Returns:
+        EmailPipelineResult with agent results and per-stage timings
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    if conversation is not None and settings.fast_path_enabled:
+        fast_path = preclassify(conversation, direction)
+        timings[PipelineStages.PRECLASSIFY] = round((time.perf_counter() - start) * 1000, 1)
+        if fast_path is not None:
+            logger.info(f"Pre-classified latest message as {fast_path.message_class} - skipping agents")
+            return EmailPipelineResult(
+                metadata_result=StaticRunResult(fast_path.metadata),
+                planning_result=StaticRunResult(fast_path.planning),
+                execution_result=StaticRunResult(fast_path.execution),
+                stage_timings_ms=timings,
+                total_ms=round((time.perf_counter() - start) * 1000, 1),
+                fast_path=fast_path.message_class,
+            )
+
+    is_inbound = direction == MessageDirection.INBOUND
+    planning_task = None
+
+    async with asyncio.TaskGroup() as group:
+        metadata_task = group.create_task(
+            _run_stage(PipelineStages.METADATA, create_metadata_agent(), conversation_json, timings)
+        )
+        if is_inbound:
+            logger.info("Processing inbound email - running metadata and planning concurrently")
+            planning_task = group.create_task(
+                _run_stage(PipelineStages.PLANNING, create_planning_agent(), conversation_json, timings)
+            )
+        else:
+            logger.info("Processing outbound email - metadata only")
+
+    result = EmailPipelineResult(
+        metadata_result=metadata_task.result(),
+        planning_result=planning_task.result() if planning_task else None,
+        stage_timings_ms=timings,
+    )
+
+    if result.planning_result is not None:
+        response_plan = result.planning_result.final_output.plan
+        result.execution_result = await _run_stage(
+            PipelineStages.EXECUTION,
+            create_execution_agent(),
+            build_execution_input(response_plan, conversation_json),
+            timings,
+            max_turns=DefaultValues.MAX_AGENT_TURNS
+        )
+        logger.info("Response execution completed successfully")
+
+    result.total_ms = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"Email pipeline completed in {result.total_ms}ms (stages: {timings})")
+    return result
+
+
+async def run_email_pipeline_batch(
+    items: Sequence[Tuple[str, Optional[str], Optional[Conversation]]],
+    concurrency: int
+) -> List[Union[EmailPipelineResult, BaseException]]:
+    """
+    Run the pipeline for many conversations with at most `concurrency` in flight.
+
+    Failures are isolated per item: a failing conversation yields its exception
+    in the result list and does not cancel the rest of the batch.
+
+    Args:
+        items: (conversation_json, last_message_direction, conversation) triples
+        concurrency: Maximum number of pipelines running at the same time
+
+    Returns:
+        One EmailPipelineResult or exception per item, in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(
+        conversation_json: str,
+        direction: Optional[str],
+        conversation: Optional[Conversation]
+    ) -> EmailPipelineResult:
+        async with semaphore:
+            with trace(SpanNames.AGENT_WORKFLOW):
+                return await run_email_pipeline(conversation_json, direction, conversation)
+
+    return await asyncio.gather(
+        *(run_item(conversation_json, direction, conversation) for conversation_json, direction, conversation in items),
+        return_exceptions=True
+    )
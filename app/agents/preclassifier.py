@@ -0,0 +1,203 @@
+"""
+Message Pre-Classifier Module
+
+Cheap, deterministic triage of the latest inbound message before any agent
+runs. Auto-replies, out-of-office notices, delivery failures and bare
+"thanks!" replies need neither metadata extraction nor a drafted response,
+so the pipeline answers them directly:
+- metadata keeps the thread's stored stage and negotiation summary; bounces
+  are tagged "notify" and out-of-office notices ask for a follow-up
+- the plan says not to reply and the execution output has an empty email body
+
+Detection looks only at the sender, subject and the message's own text
+(quoted history and signature removed), and prefers missing a case over
+silencing a real reply: threads with no stored stage, and messages with a
+question or any price, rate or offer wording, are always left to the
+agents, and an out-of-office or auto-reply subject alone only counts when
+the message has next to no text of its own. Classification counters are
+reported by `preclassifier_stats.stats()`.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.models.conversation import Conversation, Message
+from app.models.execution import ExecutionResponse
+from app.models.metadata import MessageMetadata, MetadataResponse
+from app.models.planning import PlanningResponse
+from app.thread_preprocessing import strip_quoted_reply, strip_signature
+from app.constants import MessageDirection
+
+BOUNCE = "bounce"
+OUT_OF_OFFICE = "out_of_office"
+AUTO_REPLY = "auto_reply"
+THANKS = "thanks"
+
+# Own text longer than this is never treated as an out-of-office notice or auto-reply by body alone
+_MAX_NOTICE_CHARS = 1200
+# Up to this much own text, an out-of-office or auto-reply subject is enough without a matching body
+_MAX_SUBJECT_ONLY_CHARS = 200
+_MAX_THANKS_CHARS = 80
+
+_BOUNCE_SENDER = re.compile(r"(mailer-daemon|postmaster)@", re.I)
+_BOUNCE_SUBJECT = re.compile(
+    r"undeliverable|undelivered mail|delivery status notification|mail delivery (failed|failure|subsystem)|"
+    r"returned mail|delivery (has )?failed|failure notice",
+    re.I,
+)
+# "OOO" only in capitals; "Ooo I love this" is a reply
+_OOO_SUBJECT = re.compile(r"out of (the )?office|(?-i:\bOOO\b)|abwesenheit|away from (the )?office|on vacation", re.I)
+_OOO_BODY = re.compile(
+    r"\b(i am|i'm|i will be|i'll be)( currently)? (out of (the )?office|on (annual |parental |maternity )?leave|"
+    r"(on vacation|on holiday|away) (until|through|till))|"
+    r"limited access to (my )?e-?mail|(?-i:\bOOO\b)|abwesend",
+    re.I,
+)
+# A creator who is away but commits to work ("then I can shoot the reel") is replying, not sending a notice
+_WORK_COMMITMENT = re.compile(
+    r"\b(count me in|i can (?!be reached)|i could|we can|happy to|let'?s|send (me )?(the|a|your) brief|"
+    r"i('ll| will) (?!be\b|(only )?(respond|reply|answer|get back|return|have|check)\b))",
+    re.I,
+)
+_AUTO_REPLY_SUBJECT = re.compile(r"auto(matic|mated)?[- ]?(reply|response|antwort)|autoreply|auto-?respon", re.I)
+_AUTO_REPLY_BODY = re.compile(
+    r"this is an auto(mated|matic)(ally generated)? (message|response|reply)|"
+    r"(please )?do not reply to this (e-?mail|message)|this (mailbox|inbox|address) is not monitored|"
+    r"we have received your (e-?mail|message) and will (get back|respond|reply)",
+    re.I,
+)
+_THANKS = re.compile(
+    r"^((ok(ay)?|great|perfect|awesome|amazing|got it|sounds good|will do|cool|noted|received)[\s,.!-]*)?"
+    r"(many thanks|thanks|thank you|thx|ty|cheers)( (you|so much|a lot|again|very much))*"
+    r"( for (everything|the update|your help|the info|letting me know|sharing|the confirmation))?"
+    r"[\s,.!]*([:;]-?\)|\U0001F64F|\U0001F60A|❤️?)*[\s,.!]*$",
+    re.I,
+)
+# Anything that may carry negotiation content goes to the agents
+_NEGOTIATION_TERMS = re.compile(r"[$€£?]|\b(usd|eur|gbp|rates?|price|fee|budget|deliverables?|contract|offer|but)\b", re.I)
+
+_NO_REPLY_REASONS = {
+    BOUNCE: "The message is a delivery failure notice; no reply can reach the recipient.",
+    OUT_OF_OFFICE: "The message is an out-of-office notice; wait for the creator to return.",
+    AUTO_REPLY: "The message is an automatic reply; nobody will read a response.",
+    THANKS: "The message only says thanks; no reply is needed.",
+}
+
+
+@dataclass
+class FastPathResult:
+    """Classification of a trivial message and the agent outputs that stand in for the LLM stages."""
+    message_class: str
+    metadata: MetadataResponse
+    planning: PlanningResponse
+    execution: ExecutionResponse
+
+
+class PreClassifierStats:
+    """Counts of classified messages, to report how often the agents are skipped."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.eligible = 0
+        self.short_circuited: Dict[str, int] = {}
+
+    def record(self, eligible: bool, message_class: Optional[str]) -> None:
+        """Count one message; `eligible` when it was inbound with a stored stage and so was classified."""
+        with self._lock:
+            self.checked += 1
+            self.eligible += 1 if eligible else 0
+            if message_class is not None:
+                self.short_circuited[message_class] = self.short_circuited.get(message_class, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            short_circuited = sum(self.short_circuited.values())
+            return {
+                "checked": self.checked,
+                "eligible": self.eligible,
+                "short_circuited": short_circuited,
+                # Share of the messages that could have been short-circuited
+                "short_circuit_rate": round(short_circuited / self.eligible, 4) if self.eligible else None,
+                "by_class": dict(self.short_circuited),
+            }
+
+
+# Global pre-classifier stats instance
+preclassifier_stats = PreClassifierStats()
+
+
+def classify_message(message: Message) -> Optional[str]:
+    """
+    Class of a trivial inbound message (BOUNCE, OUT_OF_OFFICE, AUTO_REPLY, THANKS), or None.
+    """
+    subject = message.subject or ""
+    own_text = strip_signature(strip_quoted_reply(message.body or ""))
+
+    if _BOUNCE_SENDER.search(message.sender or "") or _BOUNCE_SUBJECT.search(subject):
+        return BOUNCE
+    if _NEGOTIATION_TERMS.search(own_text):
+        return None
+    short = len(own_text) <= _MAX_NOTICE_CHARS
+    # A real reply can keep a subject like "Re: Out of office"; the subject alone needs a near-empty body
+    subject_only = len(own_text) <= _MAX_SUBJECT_ONLY_CHARS
+    ooo = (short and _OOO_BODY.search(own_text)) or (subject_only and _OOO_SUBJECT.search(subject))
+    if ooo and not _WORK_COMMITMENT.search(own_text):
+        return OUT_OF_OFFICE
+    if (short and _AUTO_REPLY_BODY.search(own_text)) or (subject_only and _AUTO_REPLY_SUBJECT.search(subject)):
+        return AUTO_REPLY
+    if len(own_text) <= _MAX_THANKS_CHARS and _THANKS.match(" ".join(own_text.split())):
+        return THANKS
+    return None
+
+
+def _latest_message(conversation: Conversation) -> Optional[Message]:
+    messages = conversation.messages or []
+    if conversation.last_message_id is not None:
+        for message in reversed(messages):
+            if message.id == conversation.last_message_id:
+                return message
+    return messages[-1] if messages else None
+
+
+def preclassify(conversation: Conversation, direction: Optional[str]) -> Optional[FastPathResult]:
+    """
+    Agent outputs for a trivial latest message, or None when the agents must run.
+
+    Args:
+        conversation: The conversation as received
+        direction: Direction of the last message; only inbound messages are classified
+
+    Returns:
+        FastPathResult with metadata, plus a no-reply plan and execution output
+    """
+    message = _latest_message(conversation)
+    message_class = None
+    stored = None
+    if message is not None and direction == MessageDirection.INBOUND:
+        # The stored stage and summary carry over unchanged; without them the agents must run
+        stored = next((earlier for earlier in reversed(conversation.messages) if earlier.stage), None)
+        if stored is not None:
+            message_class = classify_message(message)
+    preclassifier_stats.record(stored is not None, message_class)
+    if message_class is None:
+        return None
+
+    metadata = MetadataResponse(
+        message_metadata=MessageMetadata(
+            message_id=message.id,
+            email_stage=stored.stage,
+            email_tags=["notify"] if message_class == BOUNCE else [],
+            email_negotiation_summary=stored.negotiation_summary or "",
+            email_follow_up_needed=message_class == OUT_OF_OFFICE,
+        ),
+        deliverables=None,
+    )
+    reason = _NO_REPLY_REASONS[message_class]
+    return FastPathResult(
+        message_class=message_class,
+        metadata=metadata,
+        planning=PlanningResponse(plan=f"Do not reply. {reason}"),
+        execution=ExecutionResponse(reasoning=reason, most_recent_message=message.body, email_body=""),
+    )
@@ -0,0 +1,215 @@
+"""
+Prompt Registry Module
+
+This module keeps Langfuse prompts in process memory so agent factories and
+tools can look them up without a network call on the request path.
+
+Behaviour:
+- TTL: entries older than `prompt_cache_ttl_seconds` are refetched on access
+- Background refresh: a loop refetches every known prompt before it expires
+- Version pinning: `prompt_versions` pins a prompt name to a fixed version
+- Invalidation: entries can be dropped individually or all at once
+- Counters: hits, misses and refresh failures are exposed via `stats()`
+- Async lookup: `aget` fetches a missing prompt in a worker thread, once per
+  prompt however many requests miss it concurrently
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.tracing import langfuse
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CachedPrompt:
+    prompt: Any
+    fetched_at: float
+
+
+class PromptRegistry:
+    """In-process, versioned cache of Langfuse prompts."""
+
+    def __init__(
+        self,
+        client: Any,
+        ttl_seconds: float,
+        refresh_interval_seconds: float,
+        pinned_versions: Optional[Dict[str, int]] = None
+    ):
+        self._client = client
+        self._ttl_seconds = ttl_seconds
+        self._refresh_interval_seconds = refresh_interval_seconds
+        self._pinned_versions = dict(pinned_versions or {})
+        self._entries: Dict[str, _CachedPrompt] = {}
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _fetch(self, name: str) -> Any:
+        # The registry owns caching, so bypass the SDK's own prompt cache
+        version = self._pinned_versions.get(name)
+        prompt = self._client.get_prompt(name, version=version, cache_ttl_seconds=0)
+        with self._lock:
+            self._entries[name] = _CachedPrompt(prompt=prompt, fetched_at=time.monotonic())
+        return prompt
+
+    def _lookup(self, name: str) -> Tuple[Optional[_CachedPrompt], bool]:
+        # Returns the cached entry (if any) and whether it is still fresh, counting the hit or miss
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() - entry.fetched_at < self._ttl_seconds:
+                self.hits += 1
+                return entry, True
+            self.misses += 1
+            return entry, False
+
+    def _stale_or_raise(self, name: str, entry: Optional[_CachedPrompt], error: Exception) -> Any:
+        if entry is None:
+            raise error
+        logger.warning(f"Serving stale prompt '{name}' after fetch failure: {error}")
+        return entry.prompt
+
+    def get(self, name: str) -> Any:
+        """
+        Return the prompt for `name`, fetching it only when it is missing or expired.
+
+        If a refetch of an expired prompt fails, the stale prompt is served
+        rather than failing the request. Async callers use `aget`.
+        """
+        entry, fresh = self._lookup(name)
+        if fresh:
+            return entry.prompt
+        try:
+            return self._fetch(name)
+        except Exception as e:
+            return self._stale_or_raise(name, entry, e)
+
+    async def aget(self, name: str) -> Any:
+        """
+        Like `get`, but the fetch runs in a worker thread so it does not block
+        the event loop, and concurrent misses of one prompt share a single fetch.
+        """
+        entry, fresh = self._lookup(name)
+        if fresh:
+            return entry.prompt
+        task = self._in_flight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(self._fetch, name))
+            self._in_flight[name] = task
+            task.add_done_callback(lambda done: self._finish(name, done))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            return self._stale_or_raise(name, entry, e)
+
+    def _finish(self, name: str, task: asyncio.Future) -> None:
+        if self._in_flight.get(name) is task:
+            del self._in_flight[name]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiting lookup has already received it
+            task.exception()
+
+    def version(self, name: str) -> Optional[int]:
+        """Version of the prompt currently served for `name`."""
+        return getattr(self.get(name), "version", None)
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Drop one prompt (or all prompts when `name` is None). Returns the number dropped."""
+        with self._lock:
+            if name is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            return 1 if self._entries.pop(name, None) is not None else 0
+
+    def warm(self, names: Iterable[str]) -> None:
+        """Fetch `names` up front so the first request does not pay for them."""
+        for name in names:
+            try:
+                self._fetch(name)
+            except Exception as e:
+                logger.warning(f"Could not warm prompt '{name}': {e}")
+
+    async def refresh_all(self) -> None:
+        """Refetch every cached prompt without blocking the event loop."""
+        with self._lock:
+            names = list(self._entries)
+        for name in names:
+            try:
+                await asyncio.to_thread(self._fetch, name)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"Background refresh failed for prompt '{name}': {e}")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval_seconds)
+            await self.refresh_all()
+
+    async def start(self, warm_names: Iterable[str] = ()) -> None:
+        """Warm the given prompts and start the background refresh loop."""
+        await asyncio.to_thread(self.warm, list(warm_names))
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            entries = {
+                name: {
+                    "version": getattr(entry.prompt, "version", None),
+                    "pinned": name in self._pinned_versions,
+                    "age_seconds": round(now - entry.fetched_at, 1),
+                }
+                for name, entry in self._entries.items()
+            }
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "ttl_seconds": self._ttl_seconds,
+            "prompts": entries,
+        }
+
+
+# Global prompt registry instance
+prompt_registry = PromptRegistry(
+    langfuse,
+    ttl_seconds=settings.prompt_cache_ttl_seconds,
+    refresh_interval_seconds=settings.prompt_refresh_interval_seconds,
+    pinned_versions=settings.prompt_versions,
+)
+
+
+def get_prompt(name: str) -> Any:
+    """Look up a prompt through the global registry."""
+    return prompt_registry.get(name)
+
+
+async def aget_prompt(name: str) -> Any:
+    """Look up a prompt through the global registry without blocking the event loop."""
+    return await prompt_registry.aget(name)
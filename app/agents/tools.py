@@ -12,11 +12,12 @@ Tool Categories:
 - External Integrations: Share links, access campaign data
 """
 
-import json
 from typing import List
 from agents import function_tool
-from app.tracing import langfuse
+from app.agents.prompts import aget_prompt
 from app.db.supabase import supabase
+from app.db.campaigns import get_campaign_context
+from app.serialization import compact_dumps, prune
 from app.config import settings
 from app.constants import (
     DatabaseTables,
@@ -24,9 +25,34 @@ from app.constants import (
     DefaultValues,
     ErrorMessages
 )
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
-openai_client = OpenAI(api_key=settings.openai_api_key)
+# Shared async client: tool calls must not block the event loop of the worker
+openai_client = AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    timeout=httpx.Timeout(settings.openai_timeout_seconds, connect=settings.openai_connect_timeout_seconds),
+    max_retries=settings.openai_max_retries,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+        )
+    ),
+)
+
+async def close_openai_client() -> None:
+    """Close the pooled connections of the shared OpenAI client."""
+    await openai_client.close()
+
+async def _complete(prompt: str) -> str:
+    """Run a single-message chat completion with the tool model."""
+    response = await openai_client.chat.completions.create(
+        model=settings.tool_model,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    
+    return response.choices[0].message.content
 
 @function_tool
 def get_email_thread_by_id(conversation_id: int) -> str:
@@ -43,13 +69,13 @@ def get_email_thread_by_id(conversation_id: int) -> str:
         JSON string containing conversation data or error message
     """
     conversation_query = supabase.table(DatabaseTables.CONVERSATIONS).select(
-        "messages(id, body, sender, sent_at, subject, direction, opened_at, recipient, created_at, follow_up_date, follow_up_needed, external_message_id, negotiation_summary).order(sent_at)"
+        "messages(id, body, sender, sent_at, subject, direction, recipient, created_at, follow_up_date, follow_up_needed, negotiation_summary).order(sent_at)"
     ).eq("id", conversation_id).execute()
     
     if not conversation_query.data:
         return ErrorMessages.CONVERSATION_NOT_FOUND
     
-    return json.dumps(conversation_query.data[0])
+    return compact_dumps(prune(conversation_query.data[0]))
 
 @function_tool
 def get_creator_details_by_id(creator_id: int) -> str:
@@ -70,7 +96,7 @@ def get_creator_details_by_id(creator_id: int) -> str:
     if not creator_query.data:
         return ErrorMessages.CREATOR_NOT_FOUND
     
-    return json.dumps(creator_query.data[0])
+    return compact_dumps(prune(creator_query.data[0]))
 
 @function_tool
 def get_campaign_conversation_stages(campaign_id: str) -> str:
@@ -83,19 +109,15 @@ def get_campaign_conversation_stages(campaign_id: str) -> str:
     Returns:
         A list of conversation stages for the campaign
     """
-    # First get the campaign_type_id from the campaigns table
-    campaign_query = supabase.table("campaigns").select("campaign_type_id").eq("id", campaign_id).execute()
+    campaign = get_campaign_context(campaign_id)
     
-    if not campaign_query.data or not campaign_query.data[0].get('campaign_type_id'):
+    if not campaign or not campaign.get('campaign_type_id'):
         return "No conversation stages found for this campaign (no campaign type assigned)"
     
-    campaign_type_id = campaign_query.data[0]['campaign_type_id']
-    
-    # Now get the conversation stages for this campaign type
-    stages_query = supabase.table("conversation_stages").select("slug, details").eq("campaign_type_id", campaign_type_id).order("order").execute()
+    stages = campaign["stages"]
     
-    if stages_query.data:
-        return "\n\n".join([f"{stage['slug']}: {stage['details']}" for stage in stages_query.data])
+    if stages:
+        return "\n\n".join([f"{stage['slug']}: {stage['details']}" for stage in stages])
     return "No conversation stages found for this campaign"
 
 @function_tool
@@ -109,30 +131,27 @@ def get_campaign_details(campaign_id: str) -> str:
     Returns:
         Details about the campaign associated with this email
     """
-    # Get campaign details along with campaign type details
-    query = supabase.table("campaigns").select("name, company_details, creative_brief, campaign_types(id, name, details)").eq("id", campaign_id).execute()
+    # Campaign, campaign type and ordered stages come back from one cached fetch
+    campaign_data = get_campaign_context(campaign_id)
     
-    if not query.data:
+    if not campaign_data:
         return "Campaign not found"
     
-    campaign_data = query.data[0]
-    
-    # Get conversation stages separately to ensure proper ordering
-    stages_query = supabase.table("conversation_stages").select("slug, details").eq("campaign_type_id", campaign_data.get("campaign_types", {}).get("id")).order("order").execute()
+    stages = campaign_data["stages"]
     
     # Restructure the data to include campaign type details as 'blueprint' for backward compatibility
     result = {
         "name": campaign_data.get("name"),
         "company_details": campaign_data.get("company_details"),
-        "details": campaign_data.get("campaign_types", {}).get("details") if campaign_data.get("campaign_types") else None,
+        "details": campaign_data["campaign_type"].get("details") if campaign_data["campaign_type"] else None,
         "creative_brief": campaign_data.get("creative_brief"),
-        "conversation_stages": "\n\n".join([f"{stage['slug']}: {stage['details']}" for stage in stages_query.data]) if stages_query.data else None
+        "conversation_stages": "\n\n".join([f"{stage['slug']}: {stage['details']}" for stage in stages]) if stages else None
     }
     
-    return json.dumps(result)
+    return compact_dumps(prune(result))
 
 @function_tool
-def find_rates(creator_email: str, creator_name: str) -> str:
+async def find_rates(creator_email: str, creator_name: str) -> str:
     """
     If there are known rates for this person, retrieve and add them to the context.
     
@@ -145,18 +164,13 @@ def find_rates(creator_email: str, creator_name: str) -> str:
     """
     lead_id = "LEAD-2023-001"
     
-    prompt = langfuse.get_prompt("FindRates_Mock_Response")
+    prompt = await aget_prompt(PromptNames.FIND_RATES_MOCK)
     compiled_prompt = prompt.compile(LEAD_ID=lead_id)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def extract_rates(email_body: str) -> str:
+async def extract_rates(email_body: str) -> str:
     """
     When someone shares their rates, extract and store them in a database.
     
@@ -166,18 +180,13 @@ def extract_rates(email_body: str) -> str:
     Returns:
         Extracted rate information
     """
-    prompt = langfuse.get_prompt("ExtractRates_Mock_Response")
+    prompt = await aget_prompt(PromptNames.EXTRACT_RATES_MOCK)
     compiled_prompt = prompt.compile(RATE_TEXT=email_body)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def find_engagement(creator_name: str, platforms: List[str]) -> str:
+async def find_engagement(creator_name: str, platforms: List[str]) -> str:
     """
     Provides engagement data on the creator (e.g., audience size, average views).
     
@@ -190,18 +199,13 @@ def find_engagement(creator_name: str, platforms: List[str]) -> str:
     """
     lead_id = "LEAD-2023-001"
     
-    prompt = langfuse.get_prompt("FindEngagement_Mock_Response")
+    prompt = await aget_prompt(PromptNames.FIND_ENGAGEMENT_MOCK)
     compiled_prompt = prompt.compile(LEAD_ID=lead_id)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def profile_assessment(creator_name: str, campaign_id: str) -> str:
+async def profile_assessment(creator_name: str, campaign_id: str) -> str:
     """
     Assesses how good of a fit this creator is for the brand's campaign or objectives.
     
@@ -214,18 +218,13 @@ def profile_assessment(creator_name: str, campaign_id: str) -> str:
     """
     lead_id = "LEAD-2023-001"
     
-    prompt = langfuse.get_prompt("ProfileAssessment_Mock_Response")
+    prompt = await aget_prompt(PromptNames.PROFILE_ASSESSMENT_MOCK)
     compiled_prompt = prompt.compile(LEAD_ID=lead_id)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def draft_writing(email_thread: str, campaign_id: str, fit_score: float) -> str:
+async def draft_writing(email_thread: str, campaign_id: str, fit_score: float) -> str:
     """
     Writes the first version of an email response based on the plan.
     
@@ -239,18 +238,13 @@ def draft_writing(email_thread: str, campaign_id: str, fit_score: float) -> str:
     """
     plan = f"- Respond to rate proposal\n- Explain budget constraints\n- Suggest alternative compensation\n- Request availability for call"
     
-    prompt = langfuse.get_prompt("DraftWriting_Mock_Response")
+    prompt = await aget_prompt(PromptNames.DRAFT_WRITING_MOCK)
     compiled_prompt = prompt.compile(PLAN=plan)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def verify_draft(subject: str, body: str, tone: str) -> str:
+async def verify_draft(subject: str, body: str, tone: str) -> str:
     """
     Reviews and finalizes the drafted email before sending.
     
@@ -264,18 +258,13 @@ def verify_draft(subject: str, body: str, tone: str) -> str:
     """
     context = f"Tone: {tone}\nKey points to cover: Rate negotiation, alternative compensation options"
     
-    prompt = langfuse.get_prompt("VerifyDraft_Mock_Response")
+    prompt = await aget_prompt(PromptNames.VERIFY_DRAFT_MOCK)
     compiled_prompt = prompt.compile(DRAFT_EMAIL=body, Context=context)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
 
 @function_tool
-def share_brief_link(campaign_id: str) -> str:
+async def share_brief_link(campaign_id: str) -> str:
     """
     Returns a hyperlink to the campaign's creative brief.
     
@@ -285,12 +274,7 @@ def share_brief_link(campaign_id: str) -> str:
     Returns:
         Hyperlink to the campaign's creative brief
     """
-    prompt = langfuse.get_prompt("ShareCreativeBrief_Mock_Response")
+    prompt = await aget_prompt(PromptNames.SHARE_CREATIVE_BRIEF_MOCK)
     compiled_prompt = prompt.compile(CAMPAIGN_ID=campaign_id)
     
-    response = openai_client.chat.completions.create(
-        model=settings.tool_model,
-        messages=[{"role": "user", "content": compiled_prompt}]
-    )
-    
-    return response.choices[0].message.content
+    return await _complete(compiled_prompt)
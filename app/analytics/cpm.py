@@ -0,0 +1,20 @@
+"""
+CPM Helpers
+
+Parsing shared by the creator feature store (app/analytics/features.py) and
+the incremental CPM ranking (app/analytics/cpm_index.py).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+
+def parse_deliverable_price(deliverable: Dict[str, Any]) -> Optional[Tuple[float, str]]:
+    """(price, upper-cased currency) of a deliverable row, or None when it has no usable price."""
+    price = deliverable.get('price')
+    if price is None:
+        return None
+    try:
+        price_float = float(price)
+    except (ValueError, TypeError):
+        return None
+    return price_float, (deliverable.get('currency') or 'USD').upper()
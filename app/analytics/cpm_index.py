@@ -0,0 +1,226 @@
+"""
+Incremental CPM Ranking
+
+A campaign's CPM ranking kept up to date in place. Creators are held in a
+list sorted by (CPM, creator id), so a price or view-count change for one
+creator costs one removal and one insertion instead of a full recompute.
+The median is read off the middle of the sorted list, the mean comes from a
+running total, and outlier percentages are derived per row when a slice of
+the table is read, so reading the top k rows costs O(k). Key takeaways
+are cached until the next update.
+
+The initial build is columnar: every price of the campaign is converted in
+one `fx_rates.convert_many` call, per-creator average rates come from a
+weighted bincount, and CPM and the rank order are computed with NumPy over
+the whole campaign. Only single-creator updates are evaluated in Python.
+
+Ties in CPM are ordered by creator id; outliers are CPMs above twice the
+upper median, as in the original per-creator ranking loop.
+"""
+
+import bisect
+import math
+import threading
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.analytics.cpm import parse_deliverable_price
+from app.analytics.features import CreatorFeatures
+from app.analytics.fx import fx_rates
+from app.models.cpm_analysis import CPMAnalysisResponse, CPMCheatSheet, CPMKeyTakeaways, CPMTableEntry
+
+
+def _evaluate(prices: Sequence[Tuple[float, str]], mean_views: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+    """Average USD rate and CPM of one creator; CPM is None when either input is missing."""
+    usd_prices = [usd for usd in (fx_rates.convert(price, currency) for price, currency in prices) if usd is not None]
+    rate_usd = sum(usd_prices) / len(usd_prices) if usd_prices else None
+    if rate_usd is not None and rate_usd > 0 and mean_views is not None and mean_views > 0:
+        return rate_usd, rate_usd / mean_views * 1000
+    return rate_usd, None
+
+
+class CampaignCPMIndex:
+    """Sorted, incrementally maintained CPM ranking for one campaign."""
+
+    def __init__(self) -> None:
+        # One column per creator attribute, addressed by the creator's position
+        self._position: Dict[int, int] = {}
+        self._handles: List[str] = []
+        self._brand_fit: List[Any] = []
+        self._mean_views: List[Optional[float]] = []
+        self._prices: List[Sequence[Tuple[float, str]]] = []
+        self._rate_usd: List[Optional[float]] = []
+        self._cpm_usd: List[Optional[float]] = []
+        self._order: List[Tuple[float, int]] = []  # (cpm_usd, creator_id), ascending
+        self._cpm_total = 0.0
+        self._version = 0  # bumped on every creator update
+        self._key_takeaways: Optional[Tuple[int, CPMKeyTakeaways]] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_features(cls, features: Sequence[CreatorFeatures]) -> "CampaignCPMIndex":
+        """Build the index from a campaign's CreatorFeatures."""
+        return cls._build(
+            [feature.creator_id for feature in features],
+            [feature.username for feature in features],
+            # Brand fit score (based on evaluation_score, 1-5 scale)
+            [feature.evaluation_score or 3 for feature in features],
+            [feature.mean_views for feature in features],
+            [feature.prices for feature in features],
+        )
+
+    @classmethod
+    def _build(
+        cls,
+        creator_ids: List[int],
+        handles: List[str],
+        brand_fit: List[Any],
+        mean_views: List[Optional[float]],
+        prices: List[Sequence[Tuple[float, str]]]
+    ) -> "CampaignCPMIndex":
+        # Same rate and CPM as _evaluate, computed for every creator at once
+        n = len(creator_ids)
+        flat_prices = list(chain.from_iterable(prices))
+        usd = fx_rates.convert_many([price for price, _ in flat_prices], [currency for _, currency in flat_prices])
+        owner = np.repeat(np.arange(n), [len(creator_prices) for creator_prices in prices])
+        # Prices without an FX rate are left out of the average
+        convertible = ~np.isnan(usd)
+        totals = np.bincount(owner[convertible], weights=usd[convertible], minlength=n)
+        counts = np.bincount(owner[convertible], minlength=n)
+        views = np.array([np.nan if value is None else value for value in mean_views], dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+            valid = (rate > 0) & (views > 0)
+            cpm = np.where(valid, rate / views * 1000, np.nan)
+
+        ids = np.asarray(creator_ids, dtype=np.int64)
+        ranked = np.flatnonzero(valid)
+        ranked = ranked[np.lexsort((ids[ranked], cpm[ranked]))]
+
+        index = cls()
+        index._position = dict(zip(creator_ids, range(n)))
+        index._handles = handles
+        index._brand_fit = brand_fit
+        index._mean_views = mean_views
+        index._prices = prices
+        index._rate_usd = [None if math.isnan(value) else value for value in rate.tolist()]
+        index._cpm_usd = [None if math.isnan(value) else value for value in cpm.tolist()]
+        index._order = list(zip(cpm[ranked].tolist(), ids[ranked].tolist()))
+        index._cpm_total = math.fsum(cpm[ranked].tolist())
+        return index
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, creator_id: int) -> bool:
+        return creator_id in self._position
+
+    def _update(self, creator_id: int, column: List[Any], value: Any) -> bool:
+        with self._lock:
+            position = self._position.get(creator_id)
+            if position is None:
+                return False
+            column[position] = value
+            old_cpm = self._cpm_usd[position]
+            rate_usd, cpm_usd = _evaluate(self._prices[position], self._mean_views[position])
+            self._rate_usd[position], self._cpm_usd[position] = rate_usd, cpm_usd
+            self._version += 1
+            if old_cpm == cpm_usd:
+                return True
+            if old_cpm is not None:
+                del self._order[bisect.bisect_left(self._order, (old_cpm, creator_id))]
+                self._cpm_total -= old_cpm
+            if cpm_usd is not None:
+                bisect.insort(self._order, (cpm_usd, creator_id))
+                self._cpm_total += cpm_usd
+            if not self._order:
+                self._cpm_total = 0.0
+            return True
+
+    def set_deliverables(self, creator_id: int, deliverables: Iterable[Dict[str, Any]]) -> bool:
+        """Replace a creator's deliverable prices and re-rank them. Returns False if the creator is not indexed."""
+        return self._update(creator_id, self._prices, _parse_prices(deliverables))
+
+    def set_mean_views(self, creator_id: int, mean_views: Optional[float]) -> bool:
+        """Replace a creator's mean views and re-rank them. Returns False if the creator is not indexed."""
+        return self._update(creator_id, self._mean_views, mean_views)
+
+    def typical_cpm(self) -> float:
+        """Upper median CPM; outliers are measured against 2x this."""
+        with self._lock:
+            return self._order[len(self._order) // 2][0] if self._order else 0.0
+
+    def cpm_stats(self) -> Optional[CPMCheatSheet]:
+        """Unrounded CPM statistics for key takeaways, or None when no creator has a CPM."""
+        with self._lock:
+            n = len(self._order)
+            if not n:
+                return None
+            middle = n // 2
+            median = self._order[middle][0] if n % 2 else (self._order[middle - 1][0] + self._order[middle][0]) / 2
+            return CPMCheatSheet(
+                low_cpm=self._order[0][0],
+                high_cpm=self._order[-1][0],
+                median_cpm=median,
+                average_cpm=self._cpm_total / n
+            )
+
+    def _snapshot(self, start: int, stop: Optional[int]) -> Tuple[float, List[tuple]]:
+        # Copy plain fields under the lock so rows can be materialized later without it
+        with self._lock:
+            stop = len(self._order) if stop is None else min(stop, len(self._order))
+            rows = []
+            for position in range(start, stop):
+                cpm, creator_id = self._order[position]
+                row = self._position[creator_id]
+                rows.append((position + 1, cpm, self._handles[row], self._brand_fit[row], self._rate_usd[row], self._mean_views[row]))
+            # Define "typical" range as within 2x of median
+            return self.typical_cpm() * 2, rows
+
+    @staticmethod
+    def _entry(row: tuple, typical_upper_bound: float) -> CPMTableEntry:
+        rank, cpm, handle, brand_fit, rate_usd, mean_views = row
+        return CPMTableEntry(
+            rank=rank,
+            handle=handle,
+            brand_fit=brand_fit,
+            rate_usd=rate_usd,
+            mean_views=int(math.floor(mean_views)),
+            cpm_usd=cpm,
+            outlier_rate_pct=max(0.0, ((cpm - typical_upper_bound) / typical_upper_bound) * 100)
+            if typical_upper_bound > 0 else 0.0,
+        )
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> List[CPMTableEntry]:
+        """Rows [start, stop) of the ranking as CPMTableEntry objects with 1-based ranks."""
+        typical_upper_bound, rows = self._snapshot(start, stop)
+        return [self._entry(row, typical_upper_bound) for row in rows]
+
+    def iter_entries(self, start: int = 0, stop: Optional[int] = None, chunk_size: int = 500) -> Iterator[List[CPMTableEntry]]:
+        """
+        Rows [start, stop) in chunks, all from one consistent snapshot.
+
+        Only the snapshot is taken up front; CPMTableEntry objects are built
+        one chunk at a time as the iterator is consumed.
+        """
+        typical_upper_bound, rows = self._snapshot(start, stop)
+        for offset in range(0, len(rows), chunk_size):
+            yield [self._entry(row, typical_upper_bound) for row in rows[offset:offset + chunk_size]]
+
+    def key_takeaways(self) -> CPMKeyTakeaways:
+        """Key takeaways for the current ranking, recomputed only after the ranking changes."""
+        with self._lock:
+            if self._key_takeaways is not None and self._key_takeaways[0] == self._version:
+                return self._key_takeaways[1]
+            version = self._version
+            creator_ranking = self.entries()
+            cpm_stats = self.cpm_stats()
+        key_takeaways = CPMAnalysisResponse.generate_key_takeaways(creator_ranking, cpm_stats=cpm_stats)
+        with self._lock:
+            if self._version == version:
+                self._key_takeaways = (version, key_takeaways)
+        return key_takeaways
+
+
+def _parse_prices(deliverables: Iterable[Dict[str, Any]]) -> List[Tuple[float, str]]:
+    return [parsed for parsed in map(parse_deliverable_price, deliverables) if parsed is not None]
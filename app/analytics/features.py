@@ -0,0 +1,112 @@
+"""
+Creator Features
+
+A compact, typed record per campaign creator holding everything the
+analytics endpoints read: identity and evaluation columns, the platform
+network and followers, the normalized video summary and mean views, and
+deliverable prices with a USD rate band. Records are built once per
+campaign from the creators/creators_platform join and the creator's
+deliverables, and shared by audience analysis and CPM ranking. Only the
+normalized `video_summary` and `mean_views` columns are read, never the
+raw video_analysis blob (see app/analytics/video_summary.py).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.analytics.cpm import parse_deliverable_price
+from app.analytics.fx import fx_rates
+
+# creators columns copied into CreatorFeatures.profile for audience analysis
+PROFILE_COLUMNS = (
+    "core_platform",
+    "primary_email",
+    "created_at",
+    "evaluation_reasoning",
+    "brand",
+    "source",
+    "screenshot_path",
+)
+
+CREATOR_FEATURE_COLUMNS = f"""
+    id,
+    username,
+    evaluation_score,
+    {", ".join(PROFILE_COLUMNS)},
+    creators_platform (
+        network,
+        followers,
+        bio,
+        video_summary,
+        mean_views
+    )
+"""
+
+
+@dataclass(slots=True)
+class CreatorFeatures:
+    creator_id: int
+    username: str
+    evaluation_score: Optional[int]
+    network: Optional[str]
+    followers: Optional[int]
+    bio: Optional[str]
+    mean_views: Optional[float]         # normalized across platforms, None when unknown
+    video_summary: Dict[str, Any]       # see app/analytics/video_summary.py; {} when not summarized
+    prices: Tuple[Tuple[float, str], ...]  # (price, upper-cased currency) of priced deliverables
+    has_formal_rates: bool              # creator has at least one deliverable row
+    rate_min_usd: Optional[float]
+    rate_max_usd: Optional[float]
+    profile: Dict[str, Any]             # PROFILE_COLUMNS as stored
+
+
+def build_creator_features(
+    creators: Sequence[Dict[str, Any]],
+    deliverables_by_creator: Dict[int, List[Dict[str, Any]]]
+) -> List[CreatorFeatures]:
+    """
+    Build one CreatorFeatures record per creator row.
+
+    Args:
+        creators: Rows selected with CREATOR_FEATURE_COLUMNS
+        deliverables_by_creator: Deliverable rows grouped by creator_id
+
+    Returns:
+        Records in the order of `creators`
+    """
+    prices_of = [
+        tuple(parsed for parsed in map(parse_deliverable_price, deliverables_by_creator.get(creator['id'], ())) if parsed is not None)
+        for creator in creators
+    ]
+    # Rate band in USD over non-zero prices, converted for the whole campaign in one call
+    band_prices = [[(price, currency) for price, currency in prices if price] for prices in prices_of]
+    flat = [price for prices in band_prices for price in prices]
+    usd_flat = fx_rates.convert_many([price for price, _ in flat], [currency for _, currency in flat]).tolist()
+
+    features = []
+    offset = 0
+    for creator, prices, band in zip(creators, prices_of, band_prices):
+        creator_id = creator['id']
+        platform_data = creator.get('creators_platform', [{}])[0] if creator.get('creators_platform') else {}
+        mean_views = platform_data.get('mean_views')
+        deliverables = deliverables_by_creator.get(creator_id, [])
+
+        # Prices without an FX rate (NaN) are left out
+        usd_prices = [usd for usd in usd_flat[offset:offset + len(band)] if usd == usd]
+        offset += len(band)
+
+        features.append(CreatorFeatures(
+            creator_id=creator_id,
+            username=creator['username'],
+            evaluation_score=creator.get('evaluation_score'),
+            network=platform_data.get('network'),
+            followers=platform_data.get('followers'),
+            bio=platform_data.get('bio'),
+            mean_views=float(mean_views) if mean_views is not None else None,
+            video_summary=platform_data.get('video_summary') or {},
+            prices=prices,
+            has_formal_rates=bool(deliverables),
+            rate_min_usd=min(usd_prices) if usd_prices else None,
+            rate_max_usd=max(usd_prices) if usd_prices else None,
+            profile={column: creator.get(column) for column in PROFILE_COLUMNS},
+        ))
+    return features
@@ -0,0 +1,228 @@
+"""
+FX Rates Module
+
+Currency conversion to USD for deliverable prices. Rates are loaded once
+into an immutable FXRateTable (USD per unit of each currency, with the date
+they are valid for) and swapped atomically when the source is reloaded, so
+readers never see a half-updated table.
+
+Behaviour:
+- Source: a loader callable; the default reads the JSON file at `fx_rates_path`
+- Refresh: a background loop reloads the table every `fx_refresh_interval_seconds`,
+  keeping the previous table when a reload fails. Tables with an earlier
+  `as_of` stay available for dated conversions
+- Vectorized: `convert_many` converts whole price/currency arrays with one
+  lookup per distinct currency
+- Unknown currencies convert to None, or NaN in arrays (never silently to
+  USD), and are counted in `stats()`
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FX_RATES_PATH = Path(__file__).resolve().parent.parent / "data" / "fx_rates.json"
+
+# Earlier tables kept for dated conversions, by as_of
+_MAX_TABLE_HISTORY = 32
+
+
+@dataclass(frozen=True)
+class FXRateTable:
+    """USD value of one unit of each currency, valid as of `as_of`."""
+    as_of: date
+    usd_per_unit: Dict[str, float]
+    source: str = ""
+
+    def rate(self, currency: Optional[str]) -> Optional[float]:
+        """USD per unit of `currency` (case-insensitive, None means USD), or None if unknown."""
+        return self.usd_per_unit.get((currency or "USD").upper())
+
+    def convert_many(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        on_date: Optional[date] = None
+    ) -> np.ndarray:
+        """
+        Convert a whole price array to USD, recording currencies that have no rate.
+
+        Args:
+            amounts: Prices
+            currencies: Currency code of each price (as parse_deliverable_price returns it)
+            on_date: Use the rates valid on this date; None uses the current table
+
+        Returns:
+            float64 array of USD prices, NaN where the currency has no rate
+        """
+        usd = self.table_for(on_date).convert_many(amounts, currencies)
+        unknown = np.isnan(usd) & ~np.isnan(np.asarray(amounts, dtype=np.float64))
+        if unknown.any():
+            self.record_unknown(np.asarray(currencies, dtype=object)[unknown])
+        return usd
+
+    def convert(self, price: float, currency: Optional[str]) -> Optional[float]:
+        """`price` in USD, or None if the currency is unknown."""
+        rate = self.rate(currency)
+        return price * rate if rate is not None else None
+
+    def convert_many(self, amounts: Sequence[float], currencies: Sequence[str]) -> np.ndarray:
+        """Convert a price array to USD in one pass; prices in unknown currencies become NaN."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if len(amounts) == 0:
+            return amounts
+        unique_currencies, inverse = np.unique(np.asarray(currencies, dtype=str), return_inverse=True)
+        usd_per_unit = np.array([
+            rate if rate is not None else np.nan
+            for rate in map(self.rate, unique_currencies)
+        ])
+        return amounts * usd_per_unit[inverse]
+
+
+def load_rate_file(path: Optional[str] = None) -> FXRateTable:
+    """Load an FXRateTable from a JSON file with `as_of` and `usd_per_unit` keys."""
+    path = Path(path or settings.fx_rates_path or DEFAULT_FX_RATES_PATH)
+    with open(path) as f:
+        data = json.load(f)
+    return FXRateTable(
+        as_of=date.fromisoformat(data["as_of"]),
+        usd_per_unit={currency.upper(): float(rate) for currency, rate in data["usd_per_unit"].items()},
+        source=str(path),
+    )
+
+
+class FXRates:
+    """Holds the current FXRateTable and reloads it on a schedule."""
+
+    def __init__(self, loader: Callable[[], FXRateTable], refresh_interval_seconds: float):
+        self._loader = loader
+        self._refresh_interval_seconds = refresh_interval_seconds
+        self._table: Optional[FXRateTable] = None
+        self._history: Dict[date, FXRateTable] = {}
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._unknown_currencies: Dict[str, int] = {}
+        self.reloads = 0
+        self.reload_failures = 0
+
+    def reload(self) -> FXRateTable:
+        """Load a fresh table from the source and make it current."""
+        table = self._loader()
+        with self._lock:
+            self._table = table
+            self._history[table.as_of] = table
+            while len(self._history) > _MAX_TABLE_HISTORY:
+                del self._history[min(self._history)]
+            self.reloads += 1
+        return table
+
+    def current(self) -> FXRateTable:
+        """The current table, loading it on first use."""
+        table = self._table
+        if table is None:
+            with self._lock:
+                table = self._table
+            if table is None:
+                table = self.reload()
+        return table
+
+    def table_for(self, on_date: Optional[date] = None) -> FXRateTable:
+        """The newest loaded table valid on `on_date` (the current one when None), else the oldest loaded."""
+        current = self.current()
+        if on_date is None or current.as_of <= on_date:
+            return current
+        with self._lock:
+            valid = [as_of for as_of in self._history if as_of <= on_date]
+            return self._history[max(valid) if valid else min(self._history)]
+
+    def record_unknown(self, currencies: Any) -> None:
+        """Count prices dropped because their currency has no rate, logging each currency once."""
+        for currency in currencies:
+            currency = (currency or "USD").upper()
+            with self._lock:
+                first_seen = currency not in self._unknown_currencies
+                self._unknown_currencies[currency] = self._unknown_currencies.get(currency, 0) + 1
+            if first_seen:
+                logger.warning(f"No FX rate for currency '{currency}'; its prices are excluded from USD figures")
+
+    def convert_many(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        on_date: Optional[date] = None
+    ) -> np.ndarray:
+        """
+        Convert a whole price array to USD, recording currencies that have no rate.
+
+        Args:
+            amounts: Prices
+            currencies: Currency code of each price (as parse_deliverable_price returns it)
+            on_date: Use the rates valid on this date; None uses the current table
+
+        Returns:
+            float64 array of USD prices, NaN where the currency has no rate
+        """
+        usd = self.table_for(on_date).convert_many(amounts, currencies)
+        unknown = np.isnan(usd) & ~np.isnan(np.asarray(amounts, dtype=np.float64))
+        if unknown.any():
+            self.record_unknown(np.asarray(currencies, dtype=object)[unknown])
+        return usd
+
+    def convert(self, price: float, currency: Optional[str]) -> Optional[float]:
+        """Convert one price with the current table, recording an unknown currency."""
+        usd = self.current().convert(price, currency)
+        if usd is None:
+            self.record_unknown([currency])
+        return usd
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval_seconds)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                self.reload_failures += 1
+                logger.warning(f"FX rate reload failed, keeping rates as of {self.current().as_of}: {e}")
+
+    async def start(self) -> None:
+        """Load the table and start the background refresh loop."""
+        await asyncio.to_thread(self.reload)
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        table = self._table
+        with self._lock:
+            unknown = dict(self._unknown_currencies)
+        return {
+            "as_of": table.as_of.isoformat() if table else None,
+            "age_days": (date.today() - table.as_of).days if table else None,
+            "source": table.source if table else None,
+            "currencies": len(table.usd_per_unit) if table else 0,
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+            "unknown_currencies": unknown,
+        }
+
+
+# Global FX rates instance
+fx_rates = FXRates(load_rate_file, refresh_interval_seconds=settings.fx_refresh_interval_seconds)
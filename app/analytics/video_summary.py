@@ -0,0 +1,101 @@
+"""
+Video Summary Normalizer
+
+Turns the raw `creators_platform.video_analysis` blob, whose shape depends on
+the network, into a compact summary with a fixed schema. The summary is
+computed once when video analysis is written and stored next to the raw
+blob (`video_summary`, plus `mean_views` as its own column), so analytics
+never parse the blob on the request path. The database computes the same
+summary in a trigger on creators_platform (video_summary_of in
+supabase/migrations/20261017000400_creators_platform_video_summary_trigger.sql);
+a change here needs a matching migration and a new VIDEO_SUMMARY_VERSION.
+Malformed values (nulls, non-numeric strings, wrong shapes) become None just
+as they become NULL in SQL; tests/test_video_summary.py runs both against the
+same fixtures.
+
+Summary schema (version 1); every key is always present:
+- version: schema version
+- platform: network the analysis came from
+- mean_views: normalized views figure used for CPM (see extract_mean_views)
+- median_views: median views per video, None when unknown
+- subscribers: subscriber count, None when unknown
+- sample_size_videos: number of videos the stats cover, None when unknown
+- performance_distribution: non-zero buckets of views relative to the median
+  ({range, count, percentage})
+"""
+
+from typing import Any, Dict, List, Optional
+
+VIDEO_SUMMARY_VERSION = 1
+
+
+def summarize_video_analysis(video_analysis: Optional[Dict[str, Any]], network: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Normalize a raw video_analysis blob; None when there is nothing to summarize."""
+    if not video_analysis or not isinstance(video_analysis, dict):
+        return None
+
+    summary = video_analysis.get("last_15_videos_summary")
+    sample_size = None
+    if "last_15_videos_summary" in video_analysis:
+        # YouTube analyses cover the last 15 videos; Instagram ones state their sample size
+        sample_size = 15 if network == "youtube" else video_analysis.get("sample_size_videos", 24)
+
+    return {
+        "version": VIDEO_SUMMARY_VERSION,
+        "platform": network,
+        "mean_views": extract_mean_views(video_analysis, network),
+        "median_views": _number(summary.get("median_views")) if isinstance(summary, dict) else None,
+        "subscribers": _number(video_analysis.get("subscribers")),
+        "sample_size_videos": sample_size,
+        "performance_distribution": _performance_distribution(
+            video_analysis.get("last_15_videos_distribution_relative_to_median")
+        ),
+    }
+
+
+def extract_mean_views(video_analysis: Dict[str, Any], network: Optional[str]) -> Optional[float]:
+    """Extract mean views from video analysis data; None when missing or not a number."""
+    if not video_analysis or not isinstance(video_analysis, dict):
+        return None
+    
+    # Handle YouTube format
+    if network == "youtube":
+        views = video_analysis.get("views")
+        if isinstance(views, dict) and "current" in views:
+            return _number(views["current"])
+    
+    # Handle Instagram format
+    elif network == "instagram":
+        summary = video_analysis.get("last_15_videos_summary")
+        if isinstance(summary, dict):
+            if "mean_views" in summary:
+                return _number(summary["mean_views"])
+            elif "median_views" in summary:
+                # Fall back to median if mean not available
+                return _number(summary["median_views"])
+    
+    return None
+
+
+def _number(value: Any) -> Optional[float]:
+    # Some analyses store counts as {"current": n, ...}
+    if isinstance(value, dict):
+        value = value.get("current")
+    # Only JSON numbers and numeric strings count, as in video_summary_number
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _performance_distribution(distribution: Any) -> List[Dict[str, Any]]:
+    if not isinstance(distribution, list):
+        return []
+    # Only include non-zero counts
+    return [
+        {"range": item.get("range"), "count": item.get("count"), "percentage": item.get("percentage")}
+        for item in distribution
+        if isinstance(item, dict) and (_number(item.get("count")) or 0) > 0
+    ]
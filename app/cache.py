@@ -0,0 +1,164 @@
+"""
+In-Process Cache Module
+
+This module provides a small thread-safe LRU cache with per-entry TTL, used
+for read-mostly data that would otherwise be fetched from Supabase on every
+request. Each cache keeps hit/miss/eviction counters and the time spent in
+loaders, so `stats()` can report the hit ratio and the estimated time saved.
+Concurrent async misses on one key share a single load.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._loads = 0
+        self._load_ms_total = 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self._ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since `key` was stored, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.monotonic() - entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _record_load(self, start: float) -> None:
+        with self._lock:
+            self._loads += 1
+            self._load_ms_total += (time.perf_counter() - start) * 1000
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], cache_none: bool = True) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` and caching its result on a miss.
+
+        With `cache_none=False` a None result is returned but not stored, so
+        the next lookup loads again.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        start = time.perf_counter()
+        value = loader()
+        self._record_load(start)
+        if value is not None or cache_none:
+            self.set(key, value)
+        return value
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of `get_or_load` for coroutine loaders.
+
+        Concurrent misses on `key` await the load already in flight instead of
+        starting another. The load runs in its own task, so a cancelled caller
+        does not cancel it for the others; a failed load is raised to every
+        waiter and not cached. A load whose key is invalidated while it runs
+        is returned to its waiters but not stored.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = asyncio.ensure_future(self._load(key, loader))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        value = await loader()
+        self._record_load(start)
+        with self._lock:
+            current = self._in_flight.get(key) is asyncio.current_task()
+        if current:
+            self.set(key, value)
+        return value
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiter has already received it
+            task.exception()
+
+    def values(self) -> List[Any]:
+        """Snapshot of unexpired values, without touching LRU order or hit counters."""
+        with self._lock:
+            now = time.monotonic()
+            return [value for value, stored_at in self._entries.values() if now - stored_at < self._ttl_seconds]
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop entries whose key matches `predicate` (all entries when None). Returns the number dropped."""
+        with self._lock:
+            # Loads in flight for these keys may have read the old data; later misses start afresh
+            for key in [key for key in self._in_flight if predicate is None or predicate(key)]:
+                del self._in_flight[key]
+            if predicate is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_load_ms = self._load_ms_total / self._loads if self._loads else None
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "ttl_seconds": self._ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "avg_load_ms": round(avg_load_ms, 1) if avg_load_ms is not None else None,
+                # Each hit avoids one load, so estimate the saving from the average load time
+                "time_saved_ms": round(self.hits * avg_load_ms, 1) if avg_load_ms is not None else None,
+            }
@@ -10,8 +10,10 @@ Configuration Categories:
 - Supabase: Database connection and authentication  
 - OpenAI: AI model API access
 - Model Selection: Agent-specific model configuration
+- Batch Processing: Concurrency limits for bulk email processing
 """
 
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from app.constants import AgentModel
 
@@ -30,12 +32,22 @@ class Settings(BaseSettings):
     langfuse_host: str
     langfuse_environment: str
     
+    # Prompt Registry Configuration
+    prompt_cache_ttl_seconds: int = 300
+    prompt_refresh_interval_seconds: int = 60
+    prompt_versions: Dict[str, int] = {}  # Pinned versions, e.g. PROMPT_VERSIONS='{"email_planner": 12}'
+    
     # Supabase Configuration (Database)
     supabase_url: str
     supabase_key: str
     
     # OpenAI Configuration (AI Models)
     openai_api_key: str
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_timeout_seconds: float = 60.0
+    openai_connect_timeout_seconds: float = 5.0
+    openai_max_retries: int = 2
     
     # Agent Model Configuration
     planning_model: str = AgentModel.O3
@@ -46,6 +58,72 @@ class Settings(BaseSettings):
     audience_analysis_model: str = AgentModel.O3
     cpm_analysis_model: str = AgentModel.O3
     
+    # Agent Input Configuration (compact serialization; oldest messages are trimmed past the budget)
+    agent_input_token_budget: int = 100000
+    agent_input_stats_sample_every: int = 20  # pretty-printed baseline for token savings is built for 1 in N inputs
+    thread_preprocessing_enabled: bool = True
+    thread_window_messages: int = 8  # older messages are replaced by their stored negotiation_summary
+    
+    # Incremental Processing Configuration (send only messages since the conversation's last run)
+    incremental_processing_enabled: bool = True
+    incremental_max_new_messages: int = 10
+    conversation_state_cache_max_size: int = 10000
+    conversation_state_cache_ttl_seconds: int = 86400
+    
+    # Fast Path Configuration (auto-replies, out-of-office, bounces and bare thanks skip the agents)
+    fast_path_enabled: bool = True
+    
+    # Query Configuration (large IN-lists are split and fetched concurrently)
+    in_list_chunk_size: int = 200
+    query_concurrency: int = 8
+    query_page_size: int = 1000
+    
+    # Campaign Context Cache Configuration (campaigns are edited elsewhere; the TTL bounds staleness)
+    campaign_cache_max_size: int = 1024
+    campaign_cache_ttl_seconds: int = 120
+    
+    # FX Rate Configuration (USD per unit; empty path uses the bundled app/data/fx_rates.json)
+    fx_rates_path: str = ""
+    fx_refresh_interval_seconds: int = 3600
+    
+    # Audience Analysis Configuration (larger campaigns are sharded and merged)
+    audience_shard_token_budget: int = 60000
+    audience_shard_concurrency: int = 4
+    audience_cache_max_size: int = 128
+    audience_cache_ttl_seconds: int = 86400
+    
+    # Creator Feature Store Configuration (shared by audience and CPM analytics)
+    creator_features_cache_max_size: int = 256
+    creator_features_cache_ttl_seconds: int = 900
+    
+    # CPM Ranking Cache Configuration (rankings are updated in place on writes)
+    cpm_ranking_cache_max_size: int = 256
+    # In-place updates reach only the worker process that handled the write; other
+    # workers serve their cached ranking until it expires, so this bounds their staleness
+    cpm_ranking_cache_ttl_seconds: int = 900
+    cpm_page_max_limit: int = 5000
+    cpm_stream_chunk_size: int = 500
+    
+    # Idempotency Configuration (duplicate /process-email and /action requests reuse the first run)
+    idempotency_ttl_seconds: int = 3600
+    idempotency_cache_max_size: int = 10000
+    
+    # Conversation Scheduling Configuration (runs of one conversation are debounced, serialized and coalesced)
+    conversation_debounce_seconds: float = 2.0
+    conversation_debounce_max_wait_seconds: float = 10.0
+    
+    # Write-Behind Persistence Configuration
+    persistence_batch_size: int = 50
+    persistence_flush_interval_seconds: float = 1.0
+    persistence_max_retries: int = 3
+    persistence_retry_backoff_seconds: float = 0.5
+    persistence_queue_max_size: int = 10000
+    persistence_shutdown_timeout_seconds: float = 30.0
+    
+    # Batch Processing Configuration
+    batch_concurrency: int = 8
+    batch_max_concurrency: int = 32
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -42,9 +42,21 @@ class PromptNames:
     CPM_DASHBOARD = "CPM_Dashbaord"  # Note: keeping original typo for compatibility
     
     # Tool prompts
+    FIND_RATES_MOCK = "FindRates_Mock_Response"
     EXTRACT_RATES_MOCK = "ExtractRates_Mock_Response"
     FIND_ENGAGEMENT_MOCK = "FindEngagement_Mock_Response"
     PROFILE_ASSESSMENT_MOCK = "ProfileAssessment_Mock_Response"
+    DRAFT_WRITING_MOCK = "DraftWriting_Mock_Response"
+    VERIFY_DRAFT_MOCK = "VerifyDraft_Mock_Response"
+    SHARE_CREATIVE_BRIEF_MOCK = "ShareCreativeBrief_Mock_Response"
+    
+    @classmethod
+    def all(cls) -> list:
+        """All prompt names, used to warm the prompt registry at startup."""
+        return [
+            value for key, value in vars(cls).items()
+            if key.isupper() and isinstance(value, str)
+        ]
 
 
 class DatabaseTables:
@@ -65,12 +77,22 @@ class ServiceNames:
 class SpanNames:
     """OpenTelemetry span names for different workflows."""
     EMAIL_PROCESSING = "Email-Processing-Workflow"
+    EMAIL_BATCH_PROCESSING = "Email-Batch-Processing-Workflow"
     ACTION_WORKFLOW = "Action-Workflow"
     AUDIENCE_ANALYSIS = "Audience-Analysis-Workflow"
     CPM_ANALYSIS = "CPM-Analysis-Workflow"
+    CPM_KEY_TAKEAWAYS = "CPM-Key-Takeaways-Workflow"
     AGENT_WORKFLOW = "Agent Workflow"
 
 
+class PipelineStages:
+    """Stage names used for per-stage timings in the email pipeline."""
+    PRECLASSIFY = "preclassify"
+    METADATA = "metadata"
+    PLANNING = "planning"
+    EXECUTION = "execution"
+
+
 class DefaultValues:
     """Default values used throughout the application."""
     MOCK_LEAD_ID = "LEAD-2023-001"
@@ -82,6 +104,10 @@ class HttpHeaders:
     """HTTP header constants."""
     CONTENT_TYPE = "Content-Type"
     APPLICATION_JSON = "application/json"
+    APPLICATION_NDJSON = "application/x-ndjson"
+    TOTAL_COUNT = "X-Total-Count"
+    AGE = "Age"
+    CACHE_STATUS = "X-Cache"
 
 
 class ErrorMessages:
@@ -92,4 +118,5 @@ class ErrorMessages:
     PLANNING_FAILED = "Email planning failed"
     EXECUTION_FAILED = "Email execution failed"
     ACTION_PROCESSING_FAILED = "Action processing failed"
+    CPM_ANALYSIS_FAILED = "CPM analysis failed"
     DATABASE_ERROR = "Database operation failed"
\ No newline at end of file
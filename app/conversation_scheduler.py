@@ -0,0 +1,150 @@
+"""
+Conversation Scheduler Module
+
+Serializes and coalesces agent runs per conversation. When a creator sends
+several emails in quick succession, each webhook would start its own
+pipeline for the same thread; those runs race in `save_message_metadata`
+and `save_deliverable` and repeat LLM calls. Instead, each conversation has
+a lane:
+- a request waits until no newer request for the conversation has arrived
+  for `conversation_debounce_seconds` (at most
+  `conversation_debounce_max_wait_seconds` after the first one), then the
+  newest payload runs; every request it covered receives that run's result
+- requests arriving while a run is in progress queue behind it, so runs of
+  one conversation never overlap
+- a request for a message no newer than the running one attaches to it
+
+Different conversations have independent lanes and run in parallel.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.config import settings
+
+
+@dataclass
+class _Lane:
+    pending: Optional[Callable[[], Awaitable[Any]]] = None
+    pending_message_id: Optional[int] = None
+    pending_future: Optional[asyncio.Future] = None
+    first_arrival: float = 0.0
+    last_arrival: float = 0.0
+    running_message_id: Optional[int] = None
+    running_future: Optional[asyncio.Future] = None
+    worker: Optional[asyncio.Task] = None
+
+
+def _newer(message_id: Optional[int], than: Optional[int]) -> bool:
+    # Unknown ids count as newest, so such a request is never dropped in favour of another
+    return message_id is None or than is None or message_id >= than
+
+
+class ConversationScheduler:
+    """Per-conversation debounce, single-flight and coalescing of agent runs."""
+
+    def __init__(self, debounce_seconds: float, max_wait_seconds: float):
+        self._debounce_seconds = debounce_seconds
+        self._max_wait_seconds = max_wait_seconds
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self.submitted = 0
+        self.runs = 0
+        self.coalesced = 0
+
+    async def submit(
+        self,
+        conversation_key: Hashable,
+        message_id: Optional[int],
+        execute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run `execute` for a conversation's message, or share a run that covers it.
+
+        Args:
+            conversation_key: Identifies the conversation's lane
+            message_id: The payload's last_message_id; newer ids replace older pending ones
+            execute: Runs the pipeline for this payload
+
+        Returns:
+            The result of the run that processed this message or a newer one
+        """
+        self.submitted += 1
+        lane = self._lanes.setdefault(conversation_key, _Lane())
+
+        if lane.running_future is not None and lane.pending is None and not _newer(message_id, lane.running_message_id):
+            # An older or repeated message; the run in progress already covers it
+            self.coalesced += 1
+            return await asyncio.shield(lane.running_future)
+
+        now = time.monotonic()
+        if lane.pending is None:
+            lane.pending_future = asyncio.get_running_loop().create_future()
+            lane.pending_future.add_done_callback(_retrieve_exception)
+            lane.first_arrival = now
+        else:
+            self.coalesced += 1
+        if lane.pending is None or _newer(message_id, lane.pending_message_id):
+            lane.pending, lane.pending_message_id = execute, message_id
+        lane.last_arrival = now
+
+        future = lane.pending_future
+        if lane.worker is None:
+            lane.worker = asyncio.ensure_future(self._drain(conversation_key, lane))
+        return await asyncio.shield(future)
+
+    async def _drain(self, conversation_key: Hashable, lane: _Lane) -> None:
+        try:
+            while lane.pending is not None:
+                # Debounce: wait for a quiet period, bounded by the maximum wait
+                while True:
+                    deadline = min(lane.last_arrival + self._debounce_seconds, lane.first_arrival + self._max_wait_seconds)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(remaining)
+
+                execute, future = lane.pending, lane.pending_future
+                lane.running_message_id, lane.running_future = lane.pending_message_id, future
+                lane.pending, lane.pending_message_id, lane.pending_future = None, None, None
+                self.runs += 1
+                try:
+                    future.set_result(await execute())
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    if not isinstance(e, Exception):
+                        raise
+                finally:
+                    lane.running_message_id, lane.running_future = None, None
+        finally:
+            # A cancelled worker leaves no one to run the requests still waiting in the lane
+            if lane.pending_future is not None and not lane.pending_future.done():
+                lane.pending_future.cancel()
+            if self._lanes.get(conversation_key) is lane:
+                del self._lanes[conversation_key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / self.submitted, 4) if self.submitted else None,
+            "active_conversations": len(self._lanes),
+            "debounce_seconds": self._debounce_seconds,
+        }
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # Requests that were cancelled meanwhile never read the exception
+    if not future.cancelled():
+        future.exception()
+
+
+# Global scheduler instance for /process-email
+conversation_scheduler = ConversationScheduler(
+    debounce_seconds=settings.conversation_debounce_seconds,
+    max_wait_seconds=settings.conversation_debounce_max_wait_seconds,
+)
@@ -0,0 +1,71 @@
+"""
+Campaign Context Module
+
+Read-through cache for campaign data that agent tools look up on almost every
+call: the campaign with its type and the type's ordered conversation stages,
+fetched together in one round trip. Campaigns are edited outside this
+service, so entries live only for `campaign_cache_ttl_seconds` and can be
+dropped explicitly with `invalidate_campaign`. A campaign that is not found
+is not cached, so a newly created campaign is visible on the next lookup.
+"""
+
+from typing import Any, Dict, Optional, Union
+from app.cache import TTLCache
+from app.db.supabase import supabase
+from app.config import settings
+
+CampaignId = Union[int, str]
+
+campaign_cache = TTLCache(
+    "campaign_context",
+    max_size=settings.campaign_cache_max_size,
+    ttl_seconds=settings.campaign_cache_ttl_seconds,
+)
+
+
+def _key(kind: str, campaign_id: CampaignId) -> tuple:
+    # Tools receive campaign ids as strings, analytics as ints
+    return (kind, str(campaign_id))
+
+
+def _fetch_campaign_context(campaign_id: CampaignId) -> Optional[Dict[str, Any]]:
+    # One embedded PostgREST select: campaign -> campaign type -> conversation stages
+    query = supabase.table("campaigns").select(
+        "name, company_details, creative_brief, campaign_type_id, "
+        "campaign_types(id, name, details, conversation_stages(slug, details, order))"
+    ).eq("id", campaign_id).execute()
+    if not query.data:
+        return None
+
+    campaign = query.data[0]
+    campaign_type = campaign.pop("campaign_types", None) or None
+    stages = (campaign_type.pop("conversation_stages", None) if campaign_type else None) or []
+    stages.sort(key=lambda stage: (stage.get("order") is None, stage.get("order")))
+    return {
+        **campaign,
+        "campaign_type": campaign_type,
+        "stages": [{"slug": stage["slug"], "details": stage["details"]} for stage in stages],
+    }
+
+
+def get_campaign_context(campaign_id: CampaignId) -> Optional[Dict[str, Any]]:
+    """
+    Campaign, campaign type and ordered conversation stages in one fetch.
+
+    Returns the campaign columns plus `campaign_type` (id, name, details or
+    None) and `stages` (list of slug/details ordered by stage order), or None
+    if the campaign does not exist. Shared by the metadata agent's stage tool
+    and the execution/action agents' campaign tool.
+    """
+    return campaign_cache.get_or_load(
+        _key("context", campaign_id),
+        lambda: _fetch_campaign_context(campaign_id),
+        cache_none=False,
+    )
+
+
+def invalidate_campaign(campaign_id: Optional[CampaignId] = None) -> int:
+    """Drop cached context for one campaign, or for all campaigns when `campaign_id` is None."""
+    if campaign_id is None:
+        return campaign_cache.invalidate()
+    return campaign_cache.invalidate(lambda key: key[1] == str(campaign_id))
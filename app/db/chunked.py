@@ -0,0 +1,70 @@
+"""
+Chunked Query Module
+
+Helpers for selects filtered on large id lists. PostgREST encodes `in.(...)`
+filters in the URL, so long id lists are split into chunks of
+`in_list_chunk_size` ids. Chunks are fetched concurrently (bounded by
+`query_concurrency`) on worker threads, because the Supabase client is
+synchronous, and each chunk is paged with `range()` so no response is cut
+off at the server's max-rows limit.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Sequence
+from app.db.supabase import supabase
+from app.config import settings
+
+
+def _fetch_all_pages(table: str, columns: str, column: str, values: Sequence[Any], order: str) -> List[Dict[str, Any]]:
+    page_size = settings.query_page_size
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        # A stable order keeps pages from overlapping or skipping rows
+        page = supabase.table(table).select(columns).in_(column, list(values)).order(order).range(
+            offset, offset + page_size - 1
+        ).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+async def fetch_in_chunks(
+    table: str,
+    columns: str,
+    column: str,
+    values: Sequence[Any],
+    order: str = "id",
+    chunk_size: int = None,
+    concurrency: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Select `columns` from `table` where `column` is in `values`.
+
+    Args:
+        table: Table to select from
+        columns: PostgREST select expression
+        column: Column matched against `values`
+        values: Values for the IN filter; may be arbitrarily long
+        order: Column used to page results in a stable order
+        chunk_size: Values per request (default: settings.in_list_chunk_size)
+        concurrency: Requests in flight (default: settings.query_concurrency)
+
+    Returns:
+        All matching rows, in chunk order
+    """
+    values = list(values)
+    if not values:
+        return []
+
+    chunk_size = chunk_size or settings.in_list_chunk_size
+    semaphore = asyncio.Semaphore(concurrency or settings.query_concurrency)
+
+    async def fetch_chunk(chunk: List[Any]) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await asyncio.to_thread(_fetch_all_pages, table, columns, column, chunk, order)
+
+    chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    return [row for rows in results for row in rows]
@@ -0,0 +1,110 @@
+"""
+Conversation State Module
+
+The last agent run of each conversation, used by `/process-email`'s
+incremental mode. Runs are remembered in memory as they are queued for
+persistence, because write-behind may not have stored them yet when the
+next message arrives; otherwise the latest `agent_runs` row for one of the
+conversation's earlier messages is read. Entries live for
+`conversation_state_cache_ttl_seconds`.
+
+The deliverables in an incremental run's previous state are the creator's
+rows in `deliverables`, updated with the ones the previous run extracted
+(which write-behind may not have stored yet), so rates agreed several
+messages ago stay in the state.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from app.cache import TTLCache
+from app.db.persistence import DELIVERABLE_NATURAL_KEY, agent_runs_schema, get_creator_deliverables
+from app.db.supabase import supabase
+from app.models.agent import AgentRun
+from app.models.conversation import Conversation
+from app.thread_preprocessing import IncrementalView, incremental_view
+from app.config import settings
+from app.constants import DatabaseTables
+
+logger = logging.getLogger(__name__)
+
+conversation_state_cache = TTLCache(
+    "conversation_state",
+    max_size=settings.conversation_state_cache_max_size,
+    ttl_seconds=settings.conversation_state_cache_ttl_seconds,
+)
+
+
+@dataclass(frozen=True)
+class ConversationState:
+    message_id: int                               # last message the run processed
+    metadata_output: Optional[Dict[str, Any]]     # metadata_agent_output as stored
+
+
+def _key(env: str, conversation_id: int) -> tuple:
+    return ("conversation_state", agent_runs_schema(env), int(conversation_id))
+
+
+def remember_agent_run(conversation_id: int, env: str, agent_run: AgentRun) -> None:
+    """Record a conversation's newest agent run as soon as it is queued for persistence."""
+    conversation_state_cache.set(_key(env, conversation_id), ConversationState(
+        message_id=agent_run.message_id,
+        metadata_output=agent_run.metadata_agent_output.to_dict() if agent_run.metadata_agent_output else None,
+    ))
+
+
+def _fetch_last_state(conversation: Conversation, env: str) -> Optional[ConversationState]:
+    earlier_ids = [message.id for message in conversation.messages if message.id != conversation.last_message_id]
+    if not earlier_ids:
+        return None
+    query = supabase.schema(agent_runs_schema(env)).table(DatabaseTables.AGENT_RUNS).select(
+        "message_id, metadata_agent_output"
+    ).in_("message_id", earlier_ids).order("id", desc=True).limit(1).execute()
+    if not query.data:
+        return None
+    row = query.data[0]
+    return ConversationState(message_id=row["message_id"], metadata_output=row.get("metadata_agent_output"))
+
+
+def _current_deliverables(conversation: Conversation, state: ConversationState) -> Optional[List[Dict[str, Any]]]:
+    if conversation.creator_id is None:
+        return None
+    rows = get_creator_deliverables(conversation.creator_id)
+    by_key = {tuple(row.get(column) for column in DELIVERABLE_NATURAL_KEY): row for row in rows}
+    for deliverable in (state.metadata_output or {}).get("deliverables") or []:
+        by_key[tuple(deliverable.get(column) for column in DELIVERABLE_NATURAL_KEY)] = deliverable
+    return list(by_key.values())
+
+
+async def load_incremental_view(conversation: Conversation, env: str) -> Optional[IncrementalView]:
+    """
+    What an incremental run of `conversation` should send, or None to process it in full.
+
+    Falls back to full processing (None) when no earlier run is known, the
+    stored state does not fit the thread (see incremental_view) or the
+    lookup fails.
+    """
+    key = _key(env, conversation.id)
+    state: Optional[ConversationState] = conversation_state_cache.get(key)
+    if state is None or state.message_id == conversation.last_message_id:
+        try:
+            state = await asyncio.to_thread(_fetch_last_state, conversation, env)
+        except Exception as e:
+            logger.warning(f"Could not load the previous run of conversation {conversation.id}: {e!r}")
+            return None
+    if state is None:
+        return None
+    try:
+        deliverables = await asyncio.to_thread(_current_deliverables, conversation, state)
+    except Exception as e:
+        # The previous run's deliverables are still a usable, if partial, state
+        logger.warning(f"Could not load the deliverables of creator {conversation.creator_id}: {e!r}")
+        deliverables = None
+    return incremental_view(
+        conversation,
+        state.message_id,
+        state.metadata_output,
+        settings.incremental_max_new_messages,
+        deliverables=deliverables,
+    )
@@ -0,0 +1,94 @@
+"""
+CPM Ranking Cache Module
+
+Per-campaign CPM rankings kept in memory and updated in place. A campaign's
+ranking is built from its creator features (app/db/feature_store.py) on
+first use; afterwards deliverable writes
+(`update_creator_deliverables`, called by `save_deliverables`) re-rank only
+the affected creator in every cached campaign that contains them. These are
+the only in-place updates: mean views are computed by a database trigger
+whenever video analysis is written, by scrapers outside this service, so a
+view change reaches a ranking when its entry expires. Entries expire after
+`cpm_ranking_cache_ttl_seconds`, which also bounds how long a change to
+mean views or campaign membership goes unnoticed, and can be dropped
+explicitly with `invalidate_cpm_rankings`.
+
+The cache is per process. An in-place update reaches only the worker that
+handled the write; with several uvicorn workers, the others keep serving
+their cached ranking for up to `cpm_ranking_cache_ttl_seconds`. Deployments
+that need fresher rankings across workers should lower the TTL or run a
+single worker.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+from app.analytics.cpm_index import CampaignCPMIndex
+from app.cache import TTLCache
+from app.db.feature_store import get_campaign_features
+from app.config import settings
+
+cpm_ranking_cache = TTLCache(
+    "cpm_rankings",
+    max_size=settings.cpm_ranking_cache_max_size,
+    ttl_seconds=settings.cpm_ranking_cache_ttl_seconds,
+)
+
+# Bumped on every creator update so a ranking loaded concurrently with a write is not cached stale
+_write_generation = 0
+_write_lock = threading.Lock()
+
+
+def _key(campaign_id: int) -> tuple:
+    return ("cpm", int(campaign_id))
+
+
+def _bump_generation() -> None:
+    global _write_generation
+    with _write_lock:
+        _write_generation += 1
+
+
+async def _load_index(campaign_id: int) -> CampaignCPMIndex:
+    features = await get_campaign_features(campaign_id)
+    return CampaignCPMIndex.from_features(features.creators)
+
+
+async def get_campaign_cpm_index(campaign_id: int) -> CampaignCPMIndex:
+    """
+    Current CPM ranking of a campaign, built on first use and then maintained incrementally.
+
+    Creators without a CPM are kept in the index so that a later price or
+    view update can rank them. Errors propagate so that a failed load is not
+    cached.
+    """
+    generation = _write_generation
+    index = await cpm_ranking_cache.aget_or_load(_key(campaign_id), lambda: _load_index(campaign_id))
+    if generation != _write_generation:
+        # A creator changed while this ranking may have been loading; serve it but rebuild next time
+        cpm_ranking_cache.invalidate(lambda key: key == _key(campaign_id))
+    return index
+
+
+def update_creator_deliverables(deliverables_by_creator: Dict[int, List[Dict[str, Any]]]) -> int:
+    """
+    Re-rank creators whose deliverables changed in every cached campaign ranking.
+
+    Args:
+        deliverables_by_creator: The complete current deliverable rows of each changed creator
+
+    Returns:
+        Number of (campaign, creator) rankings updated
+    """
+    _bump_generation()
+    updated = 0
+    for index in cpm_ranking_cache.values():
+        for creator_id, deliverables in deliverables_by_creator.items():
+            updated += index.set_deliverables(creator_id, deliverables)
+    return updated
+
+
+def invalidate_cpm_rankings(campaign_id: Optional[int] = None) -> int:
+    """Drop the cached ranking of one campaign, or of all campaigns when `campaign_id` is None."""
+    if campaign_id is None:
+        return cpm_ranking_cache.invalidate()
+    return cpm_ranking_cache.invalidate(lambda key: key == _key(campaign_id))
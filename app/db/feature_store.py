@@ -0,0 +1,128 @@
+"""
+Creator Feature Store Module
+
+Per-campaign CreatorFeatures, fetched once and shared by audience analysis
+and CPM ranking. A miss reads the campaign_creators membership index, then
+fetches the creators/creators_platform join and the deliverables
+concurrently in chunked IN-lists. Entries live for
+`creator_features_cache_ttl_seconds`; deliverable writes drop every cached
+campaign that contains the changed creators.
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from app.analytics.features import CREATOR_FEATURE_COLUMNS, CreatorFeatures, build_creator_features
+from app.cache import TTLCache
+from app.db.chunked import fetch_in_chunks
+from app.config import settings
+
+creator_features_cache = TTLCache(
+    "creator_features",
+    max_size=settings.creator_features_cache_max_size,
+    ttl_seconds=settings.creator_features_cache_ttl_seconds,
+)
+
+# Bumped on every invalidation so features loaded concurrently with a write are not cached stale
+_write_generation = 0
+_write_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CampaignFeatures:
+    campaign_id: int
+    creators: List[CreatorFeatures]  # creator id order
+    creator_ids: FrozenSet[int]
+
+
+def _key(campaign_id: int) -> tuple:
+    return ("features", int(campaign_id))
+
+
+async def get_campaign_creator_ids(campaign_id: int) -> List[int]:
+    """
+    Distinct creator ids of a parent campaign.
+
+    Reads the campaign_creators membership index, which triggers on
+    conversations and smartlead_campaigns keep up to date, instead of
+    deduplicating every conversation row of the campaign.
+    """
+    rows = await fetch_in_chunks("campaign_creators", "creator_id", "parent_campaign_id", [campaign_id], order="creator_id")
+    return [row['creator_id'] for row in rows]
+
+
+async def fetch_creators_and_deliverables(
+    creator_ids: List[int],
+    creator_columns: str
+) -> Tuple[List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Fetch creator rows and their deliverables at the same time.
+
+    Both selects filter on the creator ids, so they are independent; each is
+    split into chunked IN-lists by fetch_in_chunks.
+
+    Returns:
+        (creators, deliverables grouped by creator_id)
+    """
+    creators, deliverables = await asyncio.gather(
+        fetch_in_chunks("creators", creator_columns, "id", creator_ids),
+        fetch_in_chunks("deliverables", "*", "creator_id", creator_ids),
+    )
+
+    # Create deliverables lookup by creator_id
+    deliverables_by_creator = {}
+    for deliverable in deliverables:
+        creator_id = deliverable['creator_id']
+        if creator_id not in deliverables_by_creator:
+            deliverables_by_creator[creator_id] = []
+        deliverables_by_creator[creator_id].append(deliverable)
+
+    return creators, deliverables_by_creator
+
+
+async def _load_campaign_features(campaign_id: int) -> CampaignFeatures:
+    creator_ids = await get_campaign_creator_ids(campaign_id)
+    if not creator_ids:
+        return CampaignFeatures(campaign_id=campaign_id, creators=[], creator_ids=frozenset())
+    creators, deliverables_by_creator = await fetch_creators_and_deliverables(creator_ids, CREATOR_FEATURE_COLUMNS)
+    features = build_creator_features(creators, deliverables_by_creator)
+    return CampaignFeatures(
+        campaign_id=campaign_id,
+        creators=features,
+        creator_ids=frozenset(feature.creator_id for feature in features),
+    )
+
+
+async def get_campaign_features(campaign_id: int) -> CampaignFeatures:
+    """
+    CreatorFeatures of every creator in a campaign, in creator id order.
+
+    Errors propagate so that a failed load is not cached.
+    """
+    generation = _write_generation
+    features = await creator_features_cache.aget_or_load(_key(campaign_id), lambda: _load_campaign_features(campaign_id))
+    if generation != _write_generation:
+        # A creator changed while these features may have been loading; serve them but refetch next time
+        creator_features_cache.invalidate(lambda key: key == _key(campaign_id))
+    return features
+
+
+def invalidate_creator_features(creator_ids: Iterable[int]) -> int:
+    """Drop cached features of every campaign containing any of `creator_ids`. Returns the number dropped."""
+    global _write_generation
+    creator_ids = set(creator_ids)
+    with _write_lock:
+        _write_generation += 1
+    affected = {
+        _key(features.campaign_id) for features in creator_features_cache.values()
+        if not features.creator_ids.isdisjoint(creator_ids)
+    }
+    return creator_features_cache.invalidate(lambda key: key in affected) if affected else 0
+
+
+def invalidate_campaign_features(campaign_id: Optional[int] = None) -> int:
+    """Drop cached features of one campaign, or of all campaigns when `campaign_id` is None."""
+    if campaign_id is None:
+        return creator_features_cache.invalidate()
+    return creator_features_cache.invalidate(lambda key: key == _key(campaign_id))
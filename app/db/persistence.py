@@ -4,47 +4,83 @@ from agents import RunResult, RunItem
 from app.models.agent import AgentRun, AgentToolCall
 from app.models.metadata import MetadataResponse, MessageMetadata, Deliverable
 from app.db.supabase import supabase
+from app.db.cpm_rankings import update_creator_deliverables
+from app.db.feature_store import invalidate_creator_features
 
-def save_agent_run_and_tool_calls(agent_run: AgentRun, env: str) -> AgentRun:
-    schema = "public"
-    if env == "labeling":
-        schema = "labeling"
+def agent_runs_schema(env: str) -> str:
+    return "labeling" if env == "labeling" else "public"
+
+def _tool_call_to_dict(tool_call: AgentToolCall, agent_run_id: int) -> Dict:
+    # Convert the tool call to a dict for Supabase
+    tool_call_dict = tool_call.model_dump()
+    
+    # Add the agent_run_id
+    tool_call_dict["agent_run_id"] = agent_run_id
+    
+    # Convert arguments and output to JSON strings if they're dicts
+    if isinstance(tool_call_dict["arguments"], dict):
+        tool_call_dict["arguments"] = json.dumps(tool_call_dict["arguments"])
+    if isinstance(tool_call_dict["output"], dict):
+        tool_call_dict["output"] = json.dumps(tool_call_dict["output"])
+    
+    return tool_call_dict
+
+def save_agent_runs_and_tool_calls(agent_runs: List[AgentRun], env: str) -> List[int]:
+    """
+    Write many AgentRun records with one bulk upsert, followed by one bulk
+    upsert for all of their tool calls. Returns the agent_run ids in the same
+    order as `agent_runs`.
+    
+    Runs are keyed on their client-side run_key and tool calls on
+    (agent_run_id, execution_order), so writing the same runs again, e.g.
+    when a flush is retried after a partial failure, adds no rows.
+    """
+    if not agent_runs:
+        return []
     
-    # Convert the AgentRun to a dict for Supabase
-    agent_run_dict = agent_run.to_dict()
+    schema = agent_runs_schema(env)
     
-    # Insert the AgentRun record
-    agent_run_response = supabase.schema(schema).table("agent_runs").insert(agent_run_dict).execute()
+    # Upsert all AgentRun records in one round trip
+    agent_runs_response = supabase.schema(schema).table("agent_runs").upsert(
+        [agent_run.to_dict() for agent_run in agent_runs],
+        on_conflict="run_key"
+    ).execute()
     
-    # Get the inserted record ID
-    agent_run_id = agent_run_response.data[0]["id"]
+    # Match returned rows back to the runs by key rather than relying on row order
+    id_by_run_key = {row["run_key"]: row["id"] for row in agent_runs_response.data}
+    agent_run_ids = [id_by_run_key[agent_run.run_key] for agent_run in agent_runs]
     
-    # Process all tool calls
     tool_calls_dicts = []
-    for tool_call in agent_run.tool_calls:
-        # Convert the tool call to a dict for Supabase
-        tool_call_dict = tool_call.model_dump()
-        
-        # Add the agent_run_id
-        tool_call_dict["agent_run_id"] = agent_run_id
-        
-        # Convert arguments and output to JSON strings if they're dicts
-        if isinstance(tool_call_dict["arguments"], dict):
-            tool_call_dict["arguments"] = json.dumps(tool_call_dict["arguments"])
-        if isinstance(tool_call_dict["output"], dict):
-            tool_call_dict["output"] = json.dumps(tool_call_dict["output"])
-        
-        tool_calls_dicts.append(tool_call_dict)
+    for agent_run, agent_run_id in zip(agent_runs, agent_run_ids):
+        for tool_call in agent_run.tool_calls or []:
+            tool_calls_dicts.append(_tool_call_to_dict(tool_call, agent_run_id))
     
-    # Insert all tool calls if there are any
+    # Upsert all tool calls if there are any
     if tool_calls_dicts:
-        supabase.schema(schema).table("agent_tool_calls").insert(tool_calls_dicts).execute()
+        supabase.schema(schema).table("agent_tool_calls").upsert(
+            tool_calls_dicts,
+            on_conflict="agent_run_id,execution_order"
+        ).execute()
+    
+    return agent_run_ids
+
+def get_email_agent_run(message_id: int, env: str) -> Optional[AgentRun]:
+    """
+    The latest stored /process-email run for a message, or None.
+
+    Action runs, which have no metadata output, are ignored. Tool calls are
+    not loaded.
+    """
+    query = supabase.schema(agent_runs_schema(env)).table("agent_runs").select(
+        "run_key, message_id, input, batch_name, metadata_agent_output, planning_agent_output, "
+        "execution_agent_output, suggested_email_body, trace_id, processing_time"
+    ).eq("message_id", message_id).not_.is_("metadata_agent_output", "null").order("id", desc=True).limit(1).execute()
+    if not query.data:
+        return None
+    return AgentRun.model_validate(query.data[0])
 
 def save_message_metadata(message_metadata: MessageMetadata):
-    # Find the message by id
-    query_result = supabase.table("messages").select("*").eq("id", message_metadata.message_id).execute()
-    
-    message_id = query_result.data[0]["id"]
+    message_id = message_metadata.message_id
     
     update_data = {
         "tags": message_metadata.email_tags,
@@ -56,11 +92,10 @@ def save_message_metadata(message_metadata: MessageMetadata):
     
     supabase.table("messages").update(update_data).eq("id", message_id).execute()
 
-def save_deliverable(deliverable: Deliverable):
-    # Check if a deliverable with the same creator_id, media_type, platform, and unit already exists
-    existing_query = supabase.table("deliverables").select("id").eq("creator_id", deliverable.creator_id).eq("media_type", deliverable.media_type).eq("platform", deliverable.platform).eq("unit", deliverable.unit).execute()
+DELIVERABLE_NATURAL_KEY = ("creator_id", "media_type", "platform", "unit")
 
-    deliverable_data = {
+def _deliverable_to_dict(deliverable: Deliverable) -> Dict:
+    return {
         "creator_id": deliverable.creator_id,
         "name": deliverable.name,
         "media_type": deliverable.media_type,
@@ -73,22 +108,99 @@ def save_deliverable(deliverable: Deliverable):
         "notes": deliverable.notes,
         "raw_text": deliverable.raw_text
     }
-    if existing_query.data and len(existing_query.data) > 0:
-        # Update the existing deliverable
-        existing_id = existing_query.data[0]["id"]
-        supabase.table("deliverables").update(deliverable_data).eq("id", existing_id).execute()
-    else:
-        # Insert a new deliverable
-        supabase.table("deliverables").insert(deliverable_data).execute()
+
+def _deliverable_key(row: Dict) -> tuple:
+    return tuple(row.get(column) for column in DELIVERABLE_NATURAL_KEY)
+
+def _deliverable_changed(existing: Dict, new: Dict) -> bool:
+    for column, value in new.items():
+        current = existing.get(column)
+        if column == "price" and current is not None and value is not None:
+            # numeric columns may come back as strings
+            if float(current) != value:
+                return True
+        elif current != value:
+            return True
+    return False
+
+def save_deliverables(deliverables: List[Deliverable]) -> List[Dict]:
+    """
+    Upsert deliverables keyed on (creator_id, media_type, platform, unit).
+    
+    Existing rows for the affected creators are read with one select so that
+    unchanged deliverables are skipped; everything else is written with one
+    upsert. Later entries win when the same key appears more than once.
+    Returns the rows that were written.
+    """
+    rows_by_key = {}
+    for deliverable in deliverables:
+        row = _deliverable_to_dict(deliverable)
+        rows_by_key[_deliverable_key(row)] = row
+    if not rows_by_key:
+        return []
+    
+    creator_ids = list({row["creator_id"] for row in rows_by_key.values()})
+    existing_query = supabase.table("deliverables").select("*").in_("creator_id", creator_ids).execute()
+    existing_by_key = {_deliverable_key(row): row for row in existing_query.data or []}
+    
+    changed_rows = [
+        row for key, row in rows_by_key.items()
+        if key not in existing_by_key or _deliverable_changed(existing_by_key[key], row)
+    ]
+    if changed_rows:
+        supabase.table("deliverables").upsert(
+            changed_rows,
+            on_conflict=",".join(DELIVERABLE_NATURAL_KEY)
+        ).execute()
+        
+        # Re-rank the affected creators in cached CPM rankings from their full current deliverables
+        current_by_key = {**existing_by_key, **{_deliverable_key(row): row for row in changed_rows}}
+        changed_creator_ids = {row["creator_id"] for row in changed_rows}
+        deliverables_by_creator = {creator_id: [] for creator_id in changed_creator_ids}
+        for row in current_by_key.values():
+            if row["creator_id"] in changed_creator_ids:
+                deliverables_by_creator[row["creator_id"]].append(row)
+        update_creator_deliverables(deliverables_by_creator)
+        invalidate_creator_features(changed_creator_ids)
+    
+    return changed_rows
+
+def get_creator_deliverables(creator_id: int) -> List[Dict]:
+    """A creator's stored deliverables, without ids and timestamps."""
+    query = supabase.table("deliverables").select(
+        "creator_id, name, media_type, platform, duration_sec, cross_posted, price, currency, unit, notes, raw_text"
+    ).eq("creator_id", creator_id).execute()
+    return query.data or []
+
+def save_deliverable(deliverable: Deliverable):
+    save_deliverables([deliverable])
 
 def save_metadata(metadata: MetadataResponse):
     if metadata.message_metadata:
         save_message_metadata(metadata.message_metadata)
     if metadata.deliverables:
-        for deliverable in metadata.deliverables:
-            save_deliverable(deliverable)
+        save_deliverables(metadata.deliverables)
     print(metadata.to_json_str())
 
+def save_metadata_batch(metadata_list: List[MetadataResponse]):
+    """
+    Save metadata from many agent runs, coalescing repeated writes.
+    
+    Only the latest metadata per message and the latest version of each
+    deliverable (by creator_id, media_type, platform, unit) are written.
+    """
+    message_metadata_by_id: Dict[int, MessageMetadata] = {}
+    deliverables: List[Deliverable] = []
+    for metadata in metadata_list:
+        if metadata.message_metadata:
+            message_metadata_by_id[metadata.message_metadata.message_id] = metadata.message_metadata
+        deliverables.extend(metadata.deliverables or [])
+    
+    for message_metadata in message_metadata_by_id.values():
+        save_message_metadata(message_metadata)
+    if deliverables:
+        save_deliverables(deliverables)
+
 def get_tool_calls(new_items: List[RunItem]) -> List[AgentToolCall]:
     """
     Extracts tool calls and their outputs from agent execution result new_items.
@@ -153,7 +265,7 @@ def get_tool_calls(new_items: List[RunItem]) -> List[AgentToolCall]:
             
     return result
 
-def persist_agent_run(
+def build_agent_run(
     input: str,
     message_id: int,
     metadata_agent_result: RunResult = None,
@@ -163,8 +275,7 @@ def persist_agent_run(
     trace_id: str = None,
     processing_time: int = None,
     batch_name: Optional[str] = None,
-    env: str = "production"
-) -> AgentRun:    
+) -> AgentRun:
     metadata_agent_output = metadata_agent_result.final_output if metadata_agent_result else None
     planning_agent_output = planning_agent_result.final_output if planning_agent_result else None
     execution_agent_output = execution_agent_result.final_output if execution_agent_result else None
@@ -182,7 +293,7 @@ def persist_agent_run(
     if action_agent_result and action_agent_result.new_items:
         tool_calls.extend(get_tool_calls(action_agent_result.new_items))
     
-    agent_run = AgentRun(
+    return AgentRun(
         input=input,
         message_id=message_id,
         metadata_agent_output=metadata_agent_output,
@@ -195,12 +306,3 @@ def persist_agent_run(
         batch_name=batch_name,
         tool_calls=tool_calls
     )
-    
-    print(f"agent_run: {agent_run.to_json_str()}")
-    
-    if env == "production" and metadata_agent_output:
-        save_metadata(metadata_agent_output)
-    
-    save_agent_run_and_tool_calls(agent_run, env)
-
-    return agent_run
\ No newline at end of file
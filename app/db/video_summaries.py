@@ -0,0 +1,69 @@
+"""
+Video Summary Persistence Module
+
+Backfills the normalized summary of creators_platform.video_analysis
+(`video_summary`, `mean_views`) for rows whose summary is missing or was
+built by an older summary version.
+
+A database trigger (supabase/migrations/20261017000400_creators_platform_video_summary_trigger.sql)
+computes the same columns whenever video_analysis is inserted or updated, so
+rows stay current whichever service writes them. It mirrors
+app/analytics/video_summary.py; the two must change together.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from app.analytics.video_summary import VIDEO_SUMMARY_VERSION, summarize_video_analysis
+from app.db.supabase import supabase
+from app.config import settings
+
+
+def _normalized_columns(video_analysis: Optional[Dict[str, Any]], network: Optional[str]) -> Dict[str, Any]:
+    summary = summarize_video_analysis(video_analysis, network)
+    return {
+        "video_summary": summary,
+        "mean_views": summary["mean_views"] if summary else None,
+    }
+
+
+def _backfill_row(row: Dict[str, Any]) -> None:
+    supabase.table("creators_platform").update(
+        _normalized_columns(row.get("video_analysis"), row.get("network"))
+    ).eq("id", row["id"]).execute()
+
+
+def backfill_video_summaries(only_stale: bool = True, page_size: Optional[int] = None, concurrency: Optional[int] = None) -> int:
+    """
+    Compute video_summary and mean_views for existing creators_platform rows.
+
+    Rows are read in id order with keyset pagination, so rows updated along
+    the way are neither skipped nor revisited, and each page is written with
+    up to `concurrency` updates in flight.
+
+    Args:
+        only_stale: Only rows with video analysis whose summary is missing or
+            has another version than VIDEO_SUMMARY_VERSION; False recomputes every row
+        page_size: Rows read per request (default: settings.query_page_size)
+        concurrency: Updates in flight (default: settings.query_concurrency)
+
+    Returns:
+        Number of rows updated
+    """
+    page_size = page_size or settings.query_page_size
+    updated = 0
+    last_id = None
+    with ThreadPoolExecutor(max_workers=concurrency or settings.query_concurrency) as executor:
+        while True:
+            query = supabase.table("creators_platform").select("id, network, video_analysis")
+            if only_stale:
+                query = query.not_.is_("video_analysis", "null").or_(
+                    f"video_summary.is.null,video_summary->>version.neq.{VIDEO_SUMMARY_VERSION}"
+                )
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.order("id").limit(page_size).execute().data or []
+            if not rows:
+                return updated
+            list(executor.map(_backfill_row, rows))
+            updated += len(rows)
+            last_id = rows[-1]["id"]
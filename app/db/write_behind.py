@@ -0,0 +1,202 @@
+"""
+Write-Behind Persistence Module
+
+Request handlers enqueue finished agent runs here and return immediately. A
+background worker drains the queue in batches, coalesces message metadata and
+deliverable writes, and writes agent_runs / agent_tool_calls with one bulk
+insert per environment. Failed flushes are retried with exponential backoff;
+every write is idempotent (agent runs are upserted on their run_key), so a
+retry after a partial failure does not duplicate rows. If a batch still
+fails, its runs are written one at a time so that only the runs that fail
+on their own are dead-lettered: logged with their full content and counted
+in `dropped`. The queue is drained on shutdown before the process exits.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.agent import AgentRun
+from app.db.persistence import save_metadata_batch, save_agent_runs_and_tool_calls
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingRun:
+    agent_run: AgentRun
+    env: str
+
+
+class PersistenceQueue:
+    """Background queue that batches agent run writes to Supabase."""
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        flush_interval_seconds: float,
+        max_retries: int,
+        retry_backoff_seconds: float,
+        max_queue_size: int
+    ):
+        self._max_batch_size = max_batch_size
+        self._flush_interval_seconds = flush_interval_seconds
+        self._max_retries = max_retries
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.retries = 0
+        self.dropped = 0
+        self.last_flush_latency_ms: Optional[float] = None
+        self._total_flush_latency_ms = 0.0
+
+    async def enqueue(self, agent_run: AgentRun, env: str = "production") -> None:
+        """Queue an agent run for persistence. Waits only when the queue is full."""
+        if self._queue is None or self._stopping:
+            # Worker not running (e.g. during shutdown): write inline instead of losing the run
+            await self._flush([_PendingRun(agent_run, env)])
+            return
+        await self._queue.put(_PendingRun(agent_run, env))
+        self.enqueued += 1
+
+    def _write_batch(self, batch: List[_PendingRun]) -> None:
+        runs_by_env: Dict[str, List[AgentRun]] = defaultdict(list)
+        for pending in batch:
+            runs_by_env[pending.env].append(pending.agent_run)
+
+        production_runs = runs_by_env.get("production", [])
+        save_metadata_batch([
+            agent_run.metadata_agent_output for agent_run in production_runs if agent_run.metadata_agent_output
+        ])
+        for env, agent_runs in runs_by_env.items():
+            save_agent_runs_and_tool_calls(agent_runs, env)
+
+    async def _flush(self, batch: List[_PendingRun]) -> None:
+        start = time.perf_counter()
+        written = len(batch)
+        for attempt in range(self._max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                break
+            except Exception as e:
+                if attempt == self._max_retries:
+                    logger.error(f"Agent run flush failed after {attempt + 1} attempts, writing runs one at a time: {e!r}")
+                    written = await self._flush_individually(batch)
+                    break
+                self.retries += 1
+                delay = self._retry_backoff_seconds * (2 ** attempt)
+                logger.warning(f"Agent run flush failed (attempt {attempt + 1}), retrying in {delay}s: {e!r}")
+                await asyncio.sleep(delay)
+
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.flushes += 1
+        self.flushed += written
+        self.last_flush_latency_ms = latency_ms
+        self._total_flush_latency_ms += latency_ms
+
+    async def _flush_individually(self, batch: List[_PendingRun]) -> int:
+        # Isolate the runs that cannot be written; the others are stored as usual
+        written = 0
+        for pending in batch:
+            try:
+                await asyncio.to_thread(self._write_batch, [pending])
+                written += 1
+            except Exception as e:
+                self.dropped += 1
+                logger.error(
+                    f"Dead-lettering agent run {pending.agent_run.run_key} "
+                    f"(message_id={pending.agent_run.message_id}, env={pending.env}): {e!r}; "
+                    f"run: {pending.agent_run.model_dump_json()}"
+                )
+        return written
+
+    async def _next_batch(self) -> Tuple[List[_PendingRun], bool]:
+        # Block for the first item, then collect more until the batch is full or the interval ends.
+        # A None item is the shutdown sentinel: flush what was collected and stop.
+        batch: List[_PendingRun] = []
+        first = await self._queue.get()
+        if first is None:
+            return batch, True
+        batch.append(first)
+        deadline = time.monotonic() + self._flush_interval_seconds
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        while True:
+            batch, stop = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+            if stop:
+                break
+
+        # Flush anything enqueued behind the sentinel
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self._max_batch_size):
+            await self._flush(remaining[start:start + self._max_batch_size])
+
+    def start(self) -> None:
+        """Start the background flush worker."""
+        if self._worker_task is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+            self._stopping = False
+            self._worker_task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float) -> None:
+        """Stop accepting queued writes and wait for the worker to flush the backlog."""
+        if self._worker_task is None:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(self._worker_task, timeout=timeout)
+        except asyncio.TimeoutError:
+            depth = self._queue.qsize()
+            self.dropped += depth
+            logger.error(f"Shutdown flush timed out; dropping {depth} queued agent run(s)")
+        self._worker_task = None
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "last_flush_latency_ms": self.last_flush_latency_ms,
+            "avg_flush_latency_ms": round(self._total_flush_latency_ms / self.flushes, 1) if self.flushes else None,
+        }
+
+
+# Global persistence queue instance
+persistence_queue = PersistenceQueue(
+    max_batch_size=settings.persistence_batch_size,
+    flush_interval_seconds=settings.persistence_flush_interval_seconds,
+    max_retries=settings.persistence_max_retries,
+    retry_backoff_seconds=settings.persistence_retry_backoff_seconds,
+    max_queue_size=settings.persistence_queue_max_size,
+)
@@ -0,0 +1,132 @@
+"""
+Idempotency Module
+
+Request deduplication for the agent endpoints. Webhook retries and operator
+re-submits of the same request would otherwise run the agents again and
+write another agent_runs row. Each guarded request has a key; for a key:
+- a result completed within `idempotency_ttl_seconds` is returned from memory
+- otherwise an optional lookup (e.g. agent_runs) can supply a stored result
+- a duplicate arriving while the first request is still running awaits that
+  same run instead of starting another
+- with `bypass`, the request runs regardless and its result replaces the cached one
+
+The work runs in its own task, so a client that disconnects does not cancel
+a run other requests are waiting on. Failed runs are not cached.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from app.cache import TTLCache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Where a guarded result came from
+EXECUTED = "executed"
+CACHED = "cached"
+STORED = "stored"
+IN_FLIGHT = "in_flight"
+
+
+class IdempotencyGuard:
+    """Single-flight execution with a TTL cache of completed results, per request key."""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self._completed = TTLCache(name, max_size=max_size, ttl_seconds=ttl_seconds)
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.stored_hits = 0
+        self.attached = 0
+        self.bypassed = 0
+
+    async def run(
+        self,
+        key: Optional[Hashable],
+        execute: Callable[[], Awaitable[Any]],
+        lookup: Optional[Callable[[], Awaitable[Optional[Any]]]] = None,
+        bypass: bool = False
+    ) -> Tuple[Any, str]:
+        """
+        Run `execute` once per key, or return the result of an earlier or concurrent run.
+
+        Args:
+            key: Request key; None runs `execute` without deduplication
+            execute: Produces the result
+            lookup: Returns a result stored by an earlier process, or None
+            bypass: Run even if a result exists; the new result replaces it
+
+        Returns:
+            (result, source), where source is EXECUTED, CACHED, STORED or IN_FLIGHT
+        """
+        if key is None:
+            return await execute(), EXECUTED
+
+        if bypass:
+            self.bypassed += 1
+        else:
+            cached = self._completed.get(key)
+            if cached is not None:
+                return cached, CACHED
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.attached += 1
+                result, _ = await asyncio.shield(task)
+                return result, IN_FLIGHT
+
+        task = asyncio.ensure_future(self._run_once(key, execute, None if bypass else lookup))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _run_once(
+        self,
+        key: Hashable,
+        execute: Callable[[], Awaitable[Any]],
+        lookup: Optional[Callable[[], Awaitable[Optional[Any]]]]
+    ) -> Tuple[Any, str]:
+        if lookup is not None:
+            try:
+                stored = await lookup()
+            except Exception as e:
+                logger.warning(f"{self.name}: stored result lookup failed for {key!r}: {e!r}")
+                stored = None
+            if stored is not None:
+                self.stored_hits += 1
+                self._completed.set(key, stored)
+                return stored, STORED
+        self.executed += 1
+        result = await execute()
+        self._completed.set(key, result)
+        return result, EXECUTED
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every awaiting request has already received it
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executed": self.executed,
+            "stored_hits": self.stored_hits,
+            "attached": self.attached,
+            "bypassed": self.bypassed,
+            "in_flight": len(self._in_flight),
+            "completed": self._completed.stats(),
+        }
+
+
+# Global guards for the agent endpoints
+process_email_runs = IdempotencyGuard(
+    "process_email_runs",
+    max_size=settings.idempotency_cache_max_size,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+)
+action_runs = IdempotencyGuard(
+    "action_runs",
+    max_size=settings.idempotency_cache_max_size,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+)
@@ -6,41 +6,60 @@ This service handles email analysis, response planning, execution, and campaign
 through a multi-agent AI architecture.
 
 Main endpoints:
-- POST /process-email: Analyzes and responds to email conversations
+- POST /process-email: Analyzes and responds to email conversations (deduplicated per message)
+- POST /process-email/batch: Processes many conversations with bounded concurrency
 - POST /action: Handles specific email actions  
 - POST /audience-analysis: Analyzes campaign audience demographics
-- POST /cpm-analysis: Calculates creator cost-per-mille rankings
+- POST /cpm-analysis: Calculates creator cost-per-mille rankings (paged or NDJSON-streamed)
+- POST /cpm-analysis/key-takeaways: CPM cheatsheet and highlights without the table
+- POST /prompts/invalidate: Drops cached Langfuse prompts
+- POST /campaigns/invalidate-cache: Drops cached campaign context
+- GET /stats: In-process cache and queue counters, agent input token savings
 
 The application uses OpenAI models, Supabase for data persistence, and Langfuse
 for observability and prompt management.
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from agents import Runner, trace
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Any
-from app.models.payload import ProcessEmailPayload, ActionPayload
-from app.models.cpm_analysis import CPMAnalysisResponse
+from typing import Dict, Any, Literal, Optional
+from app.models.payload import ProcessEmailPayload, BatchProcessEmailPayload, ActionPayload
+from app.models.cpm_analysis import CPMAnalysisResponse, CPMTablePage
 from app.agents.core import (
-    create_metadata_agent,
-    create_planning_agent,
-    create_execution_agent,
     create_action_agent,
-    create_audience_analysis_agent,
     create_cpm_analysis_agent,
 )
-from app.db.persistence import persist_agent_run
-from app.db.queries import get_campaign_creators_details, get_campaign_creators_ranked_by_cpm
+from app.agents.prompts import prompt_registry
+from app.agents.tools import close_openai_client
+from app.agents.pipeline import run_email_pipeline, run_email_pipeline_batch
+from app.agents.preclassifier import preclassifier_stats
+from app.agents.audience import AudienceMode, audience_cache, run_audience_analysis
+from app.db.persistence import build_agent_run, get_email_agent_run
+from app.db.write_behind import persistence_queue
+from app.analytics.fx import fx_rates
+from app.db.campaigns import campaign_cache, invalidate_campaign
+from app.db.cpm_rankings import cpm_ranking_cache, get_campaign_cpm_index, invalidate_cpm_rankings
+from app.db.feature_store import creator_features_cache, invalidate_campaign_features
+from app.db.conversation_state import conversation_state_cache, load_incremental_view, remember_agent_run
+from app.serialization import agent_input_stats
+from app.conversation_scheduler import conversation_scheduler
+from app.idempotency import CACHED, EXECUTED, IN_FLIGHT, STORED, action_runs, process_email_runs
+from app.models.agent import AgentRun
 from app.tracing import tracer
 from app.config import settings
 from app.constants import (
-    MessageDirection,
+    PromptNames,
     SpanNames,
     ErrorMessages,
-    DefaultValues
+    DefaultValues,
+    HttpHeaders
 )
 from dotenv import load_dotenv
 
@@ -50,7 +69,27 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# X-Cache values for deduplicated agent requests
+_IDEMPOTENCY_CACHE_STATUS = {
+    EXECUTED: "MISS",
+    CACHED: "HIT",
+    STORED: "HIT",
+    IN_FLIGHT: "COALESCED",
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm in-process caches on startup; flush queued writes and stop background work on shutdown."""
+    await prompt_registry.start(PromptNames.all())
+    await fx_rates.start()
+    persistence_queue.start()
+    yield
+    await persistence_queue.stop(timeout=settings.persistence_shutdown_timeout_seconds)
+    await fx_rates.stop()
+    await prompt_registry.stop()
+    await close_openai_client()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +104,62 @@ def read_root() -> Dict[str, str]:
     """Health check endpoint that returns service status."""
     return {"message": "This is the email processing service", "status": "healthy"}
 
+@app.get("/stats", summary="Service Stats", tags=["health"])
+def stats_endpoint() -> Dict[str, Any]:
+    """Counters for in-process caches and background workers."""
+    return {
+        "prompts": prompt_registry.stats(),
+        "persistence": persistence_queue.stats(),
+        "campaign_cache": campaign_cache.stats(),
+        "creator_features": creator_features_cache.stats(),
+        "audience_results": audience_cache.stats(),
+        "cpm_rankings": cpm_ranking_cache.stats(),
+        "conversation_state": conversation_state_cache.stats(),
+        "fx_rates": fx_rates.stats(),
+        "conversation_scheduler": conversation_scheduler.stats(),
+        "fast_path": preclassifier_stats.stats(),
+        "idempotency": {
+            "process_email": process_email_runs.stats(),
+            "action": action_runs.stats(),
+        },
+        "agent_inputs": agent_input_stats.stats(),
+    }
+
+@app.post("/prompts/invalidate", summary="Invalidate Cached Prompts", tags=["health"])
+def invalidate_prompts_endpoint(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Drop cached Langfuse prompts so the next lookup fetches them again.
+    
+    Args:
+        name: Prompt name to drop; all prompts are dropped when omitted
+        
+    Returns:
+        Dictionary with the number of prompts dropped
+    """
+    invalidated = prompt_registry.invalidate(name)
+    logger.info(f"Invalidated {invalidated} cached prompt(s) (name={name})")
+    return {"invalidated": invalidated}
+
+@app.post("/campaigns/invalidate-cache", summary="Invalidate Cached Campaign Context", tags=["health"])
+def invalidate_campaign_cache_endpoint(campaign_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Drop cached campaign, campaign type and conversation stage data, creator
+    features and CPM rankings.
+    
+    Args:
+        campaign_id: Campaign to drop; all campaigns are dropped when omitted
+        
+    Returns:
+        Dictionary with the number of cache entries dropped
+    """
+    invalidated = (
+        invalidate_campaign(campaign_id)
+        + invalidate_campaign_features(campaign_id)
+        + invalidate_cpm_rankings(campaign_id)
+    )
+    logger.info(f"Invalidated {invalidated} campaign cache entr(ies) (campaign_id={campaign_id})")
+    return {"invalidated": invalidated}
+
 @app.post(
     "/process-email",
     summary="Process Email Conversation", 
@@ -72,15 +167,31 @@ def read_root() -> Dict[str, str]:
     response_description="Agent run results with metadata, planning, and execution outputs",
     tags=["email-processing"]
 )
-async def process_email_endpoint(payload: ProcessEmailPayload) -> Dict[str, Any]:
+async def process_email_endpoint(
+    payload: ProcessEmailPayload,
+    response: Response,
+    force_refresh: bool = Query(False, description="Run the pipeline even if this message was already processed")
+) -> Dict[str, Any]:
     """
     Process an email conversation through the AI agent pipeline.
     
-    For inbound emails, creates a response plan and executes it.
-    For outbound emails, only extracts metadata.
+    For inbound emails, extracts metadata and creates a response plan
+    concurrently, then executes the plan. For outbound emails, only
+    extracts metadata. Per-stage timings are recorded on the span.
+    
+    Requests are deduplicated on (conversation id, last_message_id, env):
+    a message processed within `idempotency_ttl_seconds` or stored in
+    agent_runs returns the earlier run, and a duplicate of a request still
+    running waits for it. The X-Cache header says which happened.
+    
+    Requests for the same conversation are debounced for
+    `conversation_debounce_seconds` and never run concurrently; when several
+    messages arrive in a burst only the newest is processed, and every
+    request in the burst returns that run (its message_id is the newest one).
     
     Args:
         payload: Email conversation data including messages and metadata
+        force_refresh: Skip deduplication and run the pipeline again
         
     Returns:
         Dictionary containing agent run information and results
@@ -88,61 +199,72 @@ async def process_email_endpoint(payload: ProcessEmailPayload) -> Dict[str, Any]
     Raises:
         HTTPException: If agent processing fails
     """
+    conversation = payload.conversation
+    key = None
+    if conversation.last_message_id is not None:
+        key = ("process_email", conversation.id, conversation.last_message_id, payload.env)
+    # Runs of one conversation are serialized; a burst of messages is processed once, for the newest
+    agent_run, source = await process_email_runs.run(
+        key,
+        lambda: conversation_scheduler.submit(
+            (conversation.id, payload.env),
+            conversation.last_message_id,
+            lambda: _process_email(payload),
+        ),
+        lookup=lambda: asyncio.to_thread(get_email_agent_run, conversation.last_message_id, payload.env),
+        bypass=force_refresh,
+    )
+    response.headers[HttpHeaders.CACHE_STATUS] = _IDEMPOTENCY_CACHE_STATUS[source]
+
+    return {
+        "agent_run": agent_run,
+    }
+
+async def _process_email(payload: ProcessEmailPayload) -> AgentRun:
     with tracer.start_as_current_span(SpanNames.EMAIL_PROCESSING) as span:
-        conversation_json = payload.conversation_to_json_str()
+        # Incremental runs send only the messages since the previous run plus its condensed state
+        incremental_view = None
+        if payload.incremental and settings.incremental_processing_enabled:
+            incremental_view = await load_incremental_view(payload.conversation, payload.env)
+        span.set_attribute("pipeline.input_mode", "incremental" if incremental_view else "full")
+        conversation_json = payload.conversation_to_json_str(incremental_view)
         span.set_attribute("input.value", conversation_json)
         
         try:
             with trace(SpanNames.AGENT_WORKFLOW):
-                # Step 1: Extract metadata from email
-                metadata_agent = create_metadata_agent()
-                metadata_result = await Runner.run(metadata_agent, conversation_json)
-                logger.info("Metadata extraction completed successfully")
-
-                planning_result = None
-                execution_result = None
-                
-                # Step 2: For inbound emails, create response plan and execute
-                if payload.conversation_last_message_direction == MessageDirection.INBOUND:
-                    logger.info("Processing inbound email - creating response plan")
-                    
-                    planning_agent = create_planning_agent()
-                    planning_result = await Runner.run(planning_agent, conversation_json)
-                    response_plan = planning_result.final_output.plan
-                    logger.info("Response plan created successfully")
-
-                    # Step 3: Execute the response plan
-                    execution_agent = create_execution_agent()
-                    execution_input = f"""
-                        I need you to execute the following plan for responding to this email thread:
-                        {response_plan}
-                        Email Thread:
-                        {conversation_json}
-                        Please follow the plan step by step and generate an appropriate response.
-                    """
-                    execution_result = await Runner.run(
-                        execution_agent, 
-                        execution_input, 
-                        max_turns=DefaultValues.MAX_AGENT_TURNS
-                    )
-                    logger.info("Response execution completed successfully")
-                else:
-                    logger.info("Processing outbound email - metadata only")
+                # Metadata and planning run concurrently; execution waits for the plan
+                pipeline_result = await run_email_pipeline(
+                    conversation_json,
+                    payload.conversation_last_message_direction,
+                    payload.conversation
+                )
         
         except Exception as e:
-            logger.error(f"Agent processing failed: {e}")
+            logger.error(f"Agent processing failed: {e!r}")
             raise HTTPException(status_code=500, detail=ErrorMessages.METADATA_PROCESSING_FAILED)
 
-        # Persist agent run results to database
-        agent_run = persist_agent_run(
-            conversation_json,
+        metadata_result = pipeline_result.metadata_result
+        planning_result = pipeline_result.planning_result
+        execution_result = pipeline_result.execution_result
+
+        for stage, duration_ms in pipeline_result.stage_timings_ms.items():
+            span.set_attribute(f"pipeline.{stage}_ms", duration_ms)
+        span.set_attribute("pipeline.total_ms", pipeline_result.total_ms)
+        if pipeline_result.fast_path:
+            span.set_attribute("pipeline.fast_path", pipeline_result.fast_path)
+
+        # Queue agent run results for write-behind persistence; the run keeps the original message bodies
+        agent_run = build_agent_run(
+            payload.conversation_to_record_str(),
             message_id=payload.conversation.last_message_id,
             metadata_agent_result=metadata_result,
             planning_agent_result=planning_result,
             execution_agent_result=execution_result,
+            processing_time=round(pipeline_result.total_ms),
             batch_name=payload.batch_name,
-            env=payload.env,
         )
+        await persistence_queue.enqueue(agent_run, env=payload.env)
+        remember_agent_run(payload.conversation.id, payload.env, agent_run)
         
         combined_output = {
             "metadata": metadata_result.final_output.to_json_str() if metadata_result and metadata_result.final_output else None,
@@ -152,8 +274,79 @@ async def process_email_endpoint(payload: ProcessEmailPayload) -> Dict[str, Any]
         
         span.set_attribute("output.value", json.dumps(combined_output))
 
+    return agent_run
+    
+@app.post(
+    "/process-email/batch",
+    summary="Process Email Conversation Batch",
+    description="Runs many email threads through the agent pipeline with a bounded concurrency limit",
+    response_description="Per-conversation agent run results or errors",
+    tags=["email-processing"]
+)
+async def process_email_batch_endpoint(payload: BatchProcessEmailPayload) -> Dict[str, Any]:
+    """
+    Process a batch of email conversations through the AI agent pipeline.
+    
+    Conversations are processed concurrently, with at most `concurrency`
+    pipelines in flight (capped by settings.batch_max_concurrency). A failing
+    conversation is reported in its own result entry and does not abort the
+    batch. Successful agent runs are queued for write-behind persistence and
+    remembered as their conversation's latest run, as in /process-email.
+    
+    Args:
+        payload: Conversations to process plus shared env and batch name
+        
+    Returns:
+        Dictionary with batch counts and one result entry per conversation
+    """
+    with tracer.start_as_current_span(SpanNames.EMAIL_BATCH_PROCESSING) as span:
+        items = payload.item_payloads()
+        concurrency = min(payload.concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+        span.set_attribute("batch.size", len(items))
+        span.set_attribute("batch.concurrency", concurrency)
+        logger.info(f"Processing batch '{payload.batch_name}' of {len(items)} conversations (concurrency={concurrency})")
+        
+        conversation_jsons = [item.conversation_to_json_str() for item in items]
+        outcomes = await run_email_pipeline_batch(
+            [
+                (conversation_json, item.conversation_last_message_direction, item.conversation)
+                for conversation_json, item in zip(conversation_jsons, items)
+            ],
+            concurrency
+        )
+        
+        results = []
+        agent_runs = []
+        for index, (item, outcome) in enumerate(zip(items, outcomes)):
+            result = {"index": index, "conversation_id": item.conversation.id}
+            if isinstance(outcome, BaseException):
+                logger.error(f"Agent processing failed for conversation {item.conversation.id}: {outcome!r}")
+                result.update(status="error", error=repr(outcome))
+            else:
+                agent_run = build_agent_run(
+                    item.conversation_to_record_str(),
+                    message_id=item.conversation.last_message_id,
+                    metadata_agent_result=outcome.metadata_result,
+                    planning_agent_result=outcome.planning_result,
+                    execution_agent_result=outcome.execution_result,
+                    processing_time=round(outcome.total_ms),
+                    batch_name=payload.batch_name,
+                )
+                await persistence_queue.enqueue(agent_run, env=payload.env)
+                remember_agent_run(item.conversation.id, payload.env, agent_run)
+                agent_runs.append(agent_run)
+                result.update(status="ok", agent_run=agent_run)
+            results.append(result)
+        
+        span.set_attribute("batch.succeeded", len(agent_runs))
+        span.set_attribute("batch.failed", len(items) - len(agent_runs))
+
     return {
-        "agent_run": agent_run,
+        "batch_name": payload.batch_name,
+        "total": len(items),
+        "succeeded": len(agent_runs),
+        "failed": len(items) - len(agent_runs),
+        "results": results,
     }
     
 @app.post(
@@ -163,12 +356,22 @@ async def process_email_endpoint(payload: ProcessEmailPayload) -> Dict[str, Any]
     response_description="Action processing results with agent run information",
     tags=["email-processing"]
 )
-async def action_endpoint(payload: ActionPayload) -> Dict[str, Any]:
+async def action_endpoint(
+    payload: ActionPayload,
+    response: Response,
+    force_refresh: bool = Query(False, description="Run the action even if the same request was just handled")
+) -> Dict[str, Any]:
     """
     Process a specific email action through the action agent.
     
+    Identical requests (same ids and instructions) are deduplicated in
+    memory for `idempotency_ttl_seconds`, and a duplicate of a request still
+    running waits for it. Action runs are not looked up in agent_runs, whose
+    message id is only known once the agent has run.
+    
     Args:
         payload: Action request data containing action details
+        force_refresh: Skip deduplication and run the action again
         
     Returns:
         Dictionary containing agent run information and action results
@@ -176,6 +379,21 @@ async def action_endpoint(payload: ActionPayload) -> Dict[str, Any]:
     Raises:
         HTTPException: If action processing fails
     """
+    key = (
+        "action",
+        payload.conversation_id,
+        payload.creator_id,
+        payload.campaign_id,
+        hashlib.sha256(payload.instructions.encode()).hexdigest(),
+    )
+    agent_run, source = await action_runs.run(key, lambda: _run_action(payload), bypass=force_refresh)
+    response.headers[HttpHeaders.CACHE_STATUS] = _IDEMPOTENCY_CACHE_STATUS[source]
+
+    return {
+        "agent_run": agent_run,
+    }
+
+async def _run_action(payload: ActionPayload) -> AgentRun:
     with tracer.start_as_current_span(SpanNames.ACTION_WORKFLOW) as span:
         span.set_attribute("langfuse.environment", settings.langfuse_environment)
         action_data = payload.to_json_str()
@@ -193,12 +411,13 @@ async def action_endpoint(payload: ActionPayload) -> Dict[str, Any]:
             
             message_id = action_result.final_output.last_message_id
             
-            # Persist action results
-            agent_run = persist_agent_run(
+            # Queue action results for write-behind persistence
+            agent_run = build_agent_run(
                 action_data,
                 message_id=message_id,
                 action_agent_result=action_result,
             )
+            await persistence_queue.enqueue(agent_run)
             
             span.set_attribute("output.value", action_result.final_output.to_json_str())
         
@@ -206,9 +425,7 @@ async def action_endpoint(payload: ActionPayload) -> Dict[str, Any]:
             logger.error(f"Action processing failed: {e}")
             raise HTTPException(status_code=500, detail=ErrorMessages.ACTION_PROCESSING_FAILED)
     
-    return {
-        "agent_run": agent_run,
-    }
+    return agent_run
     
 @app.post(
     "/audience-analysis",
@@ -217,12 +434,24 @@ async def action_endpoint(payload: ActionPayload) -> Dict[str, Any]:
     response_description="Detailed audience analysis with demographics and insights",
     tags=["analytics"]
 )
-async def audience_analysis_endpoint(campaign_id: int) -> JSONResponse:
+async def audience_analysis_endpoint(
+    campaign_id: int,
+    mode: AudienceMode = "auto",
+    force_refresh: bool = False
+) -> JSONResponse:
     """
     Analyze the audience characteristics for a campaign's creators.
     
+    Campaigns whose creators do not fit the shard token budget are analyzed
+    map-reduce style across concurrent agent runs (see app/agents/audience.py).
+    Results are cached by a fingerprint of the creators' data and the prompt
+    version; the Age header gives the cached result's age in seconds and
+    X-Cache says whether it was a HIT or a MISS.
+    
     Args:
         campaign_id: ID of the campaign to analyze
+        mode: "auto" (default), "single" or "map_reduce"
+        force_refresh: Re-run the analysis even if a cached result exists
         
     Returns:
         JSONResponse containing audience analysis results
@@ -235,24 +464,33 @@ async def audience_analysis_endpoint(campaign_id: int) -> JSONResponse:
         
         try:
             logger.info(f"Starting audience analysis for campaign {campaign_id}")
-            creator_details = await get_campaign_creators_details(campaign_id)
-            span.set_attribute("input.value", creator_details)
-            
-            audience_analysis_agent = create_audience_analysis_agent()
-            audience_analysis_result = await Runner.run(
-                audience_analysis_agent, 
-                creator_details, 
-                max_turns=DefaultValues.MAX_AGENT_TURNS
+            audience_analysis_run = await run_audience_analysis(campaign_id, mode, force_refresh=force_refresh)
+            logger.info(
+                f"Audience analysis completed successfully "
+                f"(mode={audience_analysis_run.mode}, shards={audience_analysis_run.shards}, "
+                f"cached={audience_analysis_run.cached})"
             )
-            logger.info("Audience analysis completed successfully")
             
-            span.set_attribute("output.value", audience_analysis_result.final_output.to_json_str())
+            span.set_attribute("audience.cached", audience_analysis_run.cached)
+            span.set_attribute("audience.fingerprint", audience_analysis_run.fingerprint)
+            if audience_analysis_run.agent_input:
+                span.set_attribute("input.value", audience_analysis_run.agent_input)
+            span.set_attribute("audience.mode", audience_analysis_run.mode)
+            span.set_attribute("audience.shards", audience_analysis_run.shards)
+            span.set_attribute("audience.estimated_input_tokens", audience_analysis_run.estimated_input_tokens)
+            span.set_attribute("output.value", audience_analysis_run.output.to_json_str())
         
         except Exception as e:
             logger.error(f"Audience analysis failed for campaign {campaign_id}: {e}")
             raise HTTPException(status_code=500, detail="Audience analysis failed")
     
-    return JSONResponse(audience_analysis_result.final_output.to_dict())
+    return JSONResponse(
+        audience_analysis_run.output.to_dict(),
+        headers={
+            HttpHeaders.AGE: str(int(audience_analysis_run.age_seconds)),
+            HttpHeaders.CACHE_STATUS: "HIT" if audience_analysis_run.cached else "MISS",
+        }
+    )
     
 @app.post(
     "/cpm-analysis",
@@ -261,15 +499,30 @@ async def audience_analysis_endpoint(campaign_id: int) -> JSONResponse:
     response_description="CPM analysis with creator rankings and key insights",
     tags=["analytics"]
 )
-async def cpm_analysis_endpoint(campaign_id: int) -> JSONResponse:
+async def cpm_analysis_endpoint(
+    campaign_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=settings.cpm_page_max_limit),
+    after_rank: int = Query(0, ge=0),
+    format: Literal["json", "ndjson"] = "json"
+) -> Response:
     """
     Analyze cost-per-mille efficiency for a campaign's creators.
     
+    Without `limit` the JSON response is the full analysis (key takeaways and
+    the whole table). With `limit` it is one CPMTablePage of rows ranked after
+    `after_rank`; pass `next_after_rank` back to get the next page. Key
+    takeaways for paged clients are at /cpm-analysis/key-takeaways.
+    `format=ndjson` streams table rows, one JSON object per line, honouring
+    `limit` and `after_rank`.
+    
     Args:
         campaign_id: ID of the campaign to analyze
+        limit: Maximum number of table rows to return
+        after_rank: Return rows with rank greater than this cursor
+        format: "json" or "ndjson"
         
     Returns:
-        JSONResponse containing CPM analysis with creator rankings
+        JSONResponse with the analysis or a page, or a streamed NDJSON table
         
     Raises:
         HTTPException: If CPM analysis fails
@@ -277,23 +530,89 @@ async def cpm_analysis_endpoint(campaign_id: int) -> JSONResponse:
     with tracer.start_as_current_span(SpanNames.CPM_ANALYSIS) as span:
         span.set_attribute("langfuse.environment", settings.langfuse_environment)
         span.set_attribute("input.value", campaign_id)
+        span.set_attribute("cpm.after_rank", after_rank)
+        span.set_attribute("cpm.format", format)
+        if limit is not None:
+            span.set_attribute("cpm.limit", limit)
         
         try:
             logger.info(f"Starting CPM analysis for campaign {campaign_id}")
-            creator_ranking = await get_campaign_creators_ranked_by_cpm(campaign_id)
-            
-            key_takeaways = CPMAnalysisResponse.generate_key_takeaways(creator_ranking)
+            # Served from the cached ranking, which deliverable writes keep current
+            ranking = await get_campaign_cpm_index(campaign_id)
+        except Exception as e:
+            logger.error(f"CPM analysis failed for campaign {campaign_id}: {e}")
+            raise HTTPException(status_code=500, detail=ErrorMessages.CPM_ANALYSIS_FAILED)
+        
+        total = len(ranking)
+        stop = after_rank + limit if limit is not None else None
+        span.set_attribute("cpm.total", total)
+        
+        if format == "ndjson":
+            def ndjson_rows():
+                # Rows are built and sent one chunk at a time from a single snapshot
+                for chunk in ranking.iter_entries(after_rank, stop, chunk_size=settings.cpm_stream_chunk_size):
+                    yield "".join(entry.model_dump_json() + "\n" for entry in chunk)
             
-            cpm_analysis_response = CPMAnalysisResponse(
-                key_takeaways=key_takeaways,
-                table=creator_ranking
+            return StreamingResponse(
+                ndjson_rows(),
+                media_type=HttpHeaders.APPLICATION_NDJSON,
+                headers={HttpHeaders.TOTAL_COUNT: str(total)}
             )
-            logger.info("CPM analysis completed successfully")
-            
-            span.set_attribute("output.value", cpm_analysis_response.to_json_str())
         
+        if limit is not None:
+            table = ranking.entries(after_rank, stop)
+            page = CPMTablePage(
+                table=table,
+                total=total,
+                after_rank=after_rank,
+                next_after_rank=stop if stop < total else None
+            )
+            span.set_attribute("cpm.rows", len(table))
+            return JSONResponse(page.model_dump())
+        
+        cpm_analysis_response = CPMAnalysisResponse(
+            key_takeaways=ranking.key_takeaways(),
+            table=ranking.entries()
+        )
+        span.set_attribute("cpm.rows", total)
+        logger.info("CPM analysis completed successfully")
+    
+    return JSONResponse(cpm_analysis_response.to_dict())
+
+@app.post(
+    "/cpm-analysis/key-takeaways",
+    summary="CPM Key Takeaways",
+    description="Returns the CPM cheatsheet and highlighted creators without the ranked table",
+    response_description="CPM key takeaways",
+    tags=["analytics"]
+)
+async def cpm_key_takeaways_endpoint(campaign_id: int) -> JSONResponse:
+    """
+    Key takeaways of a campaign's CPM ranking.
+    
+    Computed from the cached ranking and reused until a deliverable or view
+    update changes it.
+    
+    Args:
+        campaign_id: ID of the campaign to analyze
+        
+    Returns:
+        JSONResponse containing CPMKeyTakeaways
+        
+    Raises:
+        HTTPException: If CPM analysis fails
+    """
+    with tracer.start_as_current_span(SpanNames.CPM_KEY_TAKEAWAYS) as span:
+        span.set_attribute("langfuse.environment", settings.langfuse_environment)
+        span.set_attribute("input.value", campaign_id)
+        
+        try:
+            ranking = await get_campaign_cpm_index(campaign_id)
+            key_takeaways = ranking.key_takeaways()
         except Exception as e:
-            logger.error(f"CPM analysis failed for campaign {campaign_id}: {e}")
-            raise HTTPException(status_code=500, detail="CPM analysis failed")
+            logger.error(f"CPM key takeaways failed for campaign {campaign_id}: {e}")
+            raise HTTPException(status_code=500, detail=ErrorMessages.CPM_ANALYSIS_FAILED)
+        
+        span.set_attribute("output.value", key_takeaways.model_dump_json())
     
-    return JSONResponse(cpm_analysis_response.to_dict())
\ No newline at end of file
+    return JSONResponse(key_takeaways.model_dump())
\ No newline at end of file
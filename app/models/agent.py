@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from uuid import uuid4
+from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from app.models.metadata import MetadataResponse
 from app.models.planning import PlanningResponse
@@ -13,6 +14,8 @@ class AgentToolCall(BaseModel):
     execution_order: int
 
 class AgentRun(BaseModel):
+    # Client-side key; agent_runs is upserted on it so a retried write cannot insert the run twice
+    run_key: str = Field(default_factory=lambda: uuid4().hex)
     message_id: int
     input: str
     batch_name: Optional[str] = None
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
-import statistics
+from typing import List, Optional, Sequence, Set, Tuple
+import heapq
+import math
 
 class CPMCheatSheet(BaseModel):
     low_cpm: float = Field(description="Lowest CPM value found in the analysis")
@@ -28,6 +29,59 @@ class CPMTableEntry(BaseModel):
     cpm_usd: float = Field(description="Cost per mille (CPM) in USD")
     outlier_rate_pct: float = Field(description="Percentage rate above typical CPM range")
 
+class CPMTablePage(BaseModel):
+    table: List[CPMTableEntry] = Field(description="Ranked creators with rank greater than after_rank")
+    total: int = Field(description="Number of ranked creators in the campaign")
+    after_rank: int = Field(description="Cursor this page starts after")
+    next_after_rank: Optional[int] = Field(description="Cursor for the next page, or None on the last page")
+
+# Three caution slots, plus room for up to three creators already placed there
+_CAUTION_FILL_HEAP_SIZE = 6
+
+def compute_cpm_stats(cpm_values: Sequence[float], is_sorted: bool = False) -> CPMCheatSheet:
+    """
+    Unrounded low/high/median/average of CPM values.
+    
+    The median follows statistics.median (mean of the two middle values for
+    even counts). Sorted input, as produced by the ranking step, is detected
+    so the median is read directly instead of sorting again.
+    """
+    n = len(cpm_values)
+    if not is_sorted:
+        is_sorted = all(cpm_values[i] <= cpm_values[i + 1] for i in range(n - 1))
+    ordered = cpm_values if is_sorted else sorted(cpm_values)
+    middle = n // 2
+    median = ordered[middle] if n % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+    return CPMCheatSheet(
+        low_cpm=ordered[0],
+        high_cpm=ordered[-1],
+        median_cpm=median,
+        average_cpm=math.fsum(cpm_values) / n
+    )
+
+def _performer_entry(entry: CPMTableEntry, note: str) -> CPMPerformerEntry:
+    return CPMPerformerEntry(
+        creator=entry.handle,
+        cpm_usd=round(entry.cpm_usd, 2),
+        note=note
+    )
+
+def _fill_caution_zone(
+    creator_ranking: List[CPMTableEntry],
+    candidates: List[Tuple[float, int]],
+    caution_zone: List[CPMPerformerEntry],
+    caution_handles: Set[str]
+) -> bool:
+    """Append candidates (cpm, -index) not already present until there are three. Returns True when full."""
+    for _, negative_index in candidates:
+        if len(caution_zone) >= 3:
+            break
+        entry = creator_ranking[-negative_index]
+        if entry.handle not in caution_handles:
+            caution_zone.append(_performer_entry(entry, "High CPM, review efficiency"))
+            caution_handles.add(entry.handle)
+    return len(caution_zone) >= 3
+
 class CPMAnalysisResponse(BaseModel):
     key_takeaways: CPMKeyTakeaways = Field(description="Key insights based on CPM analysis")
     table: List[CPMTableEntry] = Field(description="Ranked list of creators based on CPM")
@@ -40,12 +94,21 @@ class CPMAnalysisResponse(BaseModel):
         return json.dumps(self.model_dump(), indent=2, default=str)
     
     @staticmethod
-    def generate_key_takeaways(creator_ranking: List[CPMTableEntry]) -> CPMKeyTakeaways:
+    def generate_key_takeaways(
+        creator_ranking: List[CPMTableEntry],
+        cpm_stats: Optional[CPMCheatSheet] = None
+    ) -> CPMKeyTakeaways:
         """
         Generate key takeaways from the creator ranking data.
         
+        Creators are categorized in a single pass: the first three creators
+        (in ranking order) of each bucket are kept, and the caution zone is
+        topped up from a bounded heap of the highest-CPM creators.
+        
         Args:
             creator_ranking: List of CPMTableEntry objects
+            cpm_stats: Unrounded CPM statistics already computed by the
+                ranking step; computed here when omitted
             
         Returns:
             CPMKeyTakeaways object with analysis insights
@@ -59,17 +122,15 @@ class CPMAnalysisResponse(BaseModel):
             )
         
         # Calculate cheatsheet statistics
-        cpm_values = [entry.cpm_usd for entry in creator_ranking]
-        low_cpm = min(cpm_values)
-        high_cpm = max(cpm_values)
-        median_cpm = statistics.median(cpm_values)
-        average_cpm = statistics.mean(cpm_values)
+        if cpm_stats is None:
+            cpm_stats = compute_cpm_stats([entry.cpm_usd for entry in creator_ranking])
+        median_cpm = cpm_stats.median_cpm
         
         cheatsheet = CPMCheatSheet(
-            low_cpm=round(low_cpm, 2),
-            high_cpm=round(high_cpm, 2),
+            low_cpm=round(cpm_stats.low_cpm, 2),
+            high_cpm=round(cpm_stats.high_cpm, 2),
             median_cpm=round(median_cpm, 2),
-            average_cpm=round(average_cpm, 2)
+            average_cpm=round(cpm_stats.average_cpm, 2)
         )
         
         # Categorize creators based on CPM performance
@@ -86,81 +147,72 @@ class CPMAnalysisResponse(BaseModel):
         high_threshold = median_cpm * 2  # 2x median is considered high
         very_high_threshold = median_cpm * 4  # 4x median is caution zone
         
-        for entry in creator_ranking:
-            creator_entry = CPMPerformerEntry(
-                creator=entry.handle,
-                cpm_usd=round(entry.cpm_usd, 2),
-                note=""
-            )
+        # Min-heap of (cpm, -index) keeping the highest-CPM creators above the
+        # high threshold, used to fill the caution zone after the pass
+        high_cpm_heap = []
+        high_cpm_count = 0
+        
+        for index, entry in enumerate(creator_ranking):
+            cpm = entry.cpm_usd
+            
+            if cpm > high_threshold:
+                high_cpm_count += 1
+                item = (cpm, -index)
+                if len(high_cpm_heap) < _CAUTION_FILL_HEAP_SIZE:
+                    heapq.heappush(high_cpm_heap, item)
+                elif item > high_cpm_heap[0]:
+                    heapq.heapreplace(high_cpm_heap, item)
             
             # Categorize based on CPM and other metrics
-            if entry.cpm_usd <= median_threshold:
+            if cpm <= median_threshold:
                 # Top performers: low CPM
-                if entry.mean_views >= 100000:
-                    creator_entry.note = "Top reach, best value"
-                elif entry.brand_fit >= 3:
-                    creator_entry.note = "Great fit, strong value"
-                else:
-                    creator_entry.note = "Engaged micro, low cost"
-                
                 if len(top_performers) < 3:  # Limit to top 3
-                    top_performers.append(creator_entry)
+                    if entry.mean_views >= 100000:
+                        note = "Top reach, best value"
+                    elif entry.brand_fit >= 3:
+                        note = "Great fit, strong value"
+                    else:
+                        note = "Engaged micro, low cost"
+                    top_performers.append(_performer_entry(entry, note))
                     
-            elif entry.cpm_usd <= high_threshold:
+            elif cpm <= high_threshold:
                 # Solid value: moderate CPM
-                if entry.mean_views >= 50000:
-                    creator_entry.note = "High views, solid cost"
-                elif entry.brand_fit >= 3:
-                    creator_entry.note = "Balanced cost and fit"
-                else:
-                    creator_entry.note = "Fair cost, decent reach"
-                
                 if len(solid_value) < 3:  # Limit to top 3
-                    solid_value.append(creator_entry)
+                    if entry.mean_views >= 50000:
+                        note = "High views, solid cost"
+                    elif entry.brand_fit >= 3:
+                        note = "Balanced cost and fit"
+                    else:
+                        note = "Fair cost, decent reach"
+                    solid_value.append(_performer_entry(entry, note))
                     
-            elif entry.cpm_usd >= very_high_threshold:
+            elif cpm >= very_high_threshold:
                 # Caution zone: very high CPM
-                if entry.mean_views < 20000:
-                    creator_entry.note = "Costly, poor efficiency"
-                elif entry.mean_views < 50000:
-                    creator_entry.note = "High cost, low reach"
-                else:
-                    creator_entry.note = "Limited ROI despite fit"
-                
                 if len(caution_zone) < 3:  # Limit to top 3 worst
-                    caution_zone.append(creator_entry)
+                    if entry.mean_views < 20000:
+                        note = "Costly, poor efficiency"
+                    elif entry.mean_views < 50000:
+                        note = "High cost, low reach"
+                    else:
+                        note = "Limited ROI despite fit"
+                    caution_zone.append(_performer_entry(entry, note))
         
-        # If we don't have enough in each category, fill from remaining creators
-        remaining_creators = [entry for entry in creator_ranking 
-                            if entry.cpm_usd > median_threshold and entry.cpm_usd <= high_threshold]
-        
-        # Fill solid_value if needed
-        for entry in remaining_creators:
-            if len(solid_value) >= 3:
-                break
-            if not any(sv.creator == entry.handle for sv in solid_value):
-                creator_entry = CPMPerformerEntry(
-                    creator=entry.handle,
-                    cpm_usd=round(entry.cpm_usd, 2),
-                    note="Balanced cost and performance"
-                )
-                solid_value.append(creator_entry)
+        # Solid value is never short of creators that are still available: every
+        # creator in its CPM band was offered to it, in order, during the pass.
         
         # Fill caution_zone from highest CPM if needed
-        high_cpm_creators = [entry for entry in creator_ranking 
-                           if entry.cpm_usd > high_threshold]
-        high_cpm_creators.sort(key=lambda x: x.cpm_usd, reverse=True)
-        
-        for entry in high_cpm_creators:
-            if len(caution_zone) >= 3:
-                break
-            if not any(cz.creator == entry.handle for cz in caution_zone):
-                creator_entry = CPMPerformerEntry(
-                    creator=entry.handle,
-                    cpm_usd=round(entry.cpm_usd, 2),
-                    note="High CPM, review efficiency"
+        if len(caution_zone) < 3:
+            # Highest CPM first; ties keep ranking order
+            candidates = sorted(high_cpm_heap, reverse=True)
+            caution_handles = {cz.creator for cz in caution_zone}
+            filled = _fill_caution_zone(creator_ranking, candidates, caution_zone, caution_handles)
+            if not filled and high_cpm_count > len(candidates):
+                # Duplicate handles exhausted the heap; fall back to every candidate
+                candidates = sorted(
+                    ((entry.cpm_usd, -index) for index, entry in enumerate(creator_ranking) if entry.cpm_usd > high_threshold),
+                    reverse=True
                 )
-                caution_zone.append(creator_entry)
+                _fill_caution_zone(creator_ranking, candidates[len(high_cpm_heap):], caution_zone, caution_handles)
         
         return CPMKeyTakeaways(
             cheatsheet=cheatsheet,
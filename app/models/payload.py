@@ -1,19 +1,67 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from app.models.conversation import Conversation
+from app.serialization import compact_dumps, serialize_conversation, serialize_model
+from app.thread_preprocessing import IncrementalView, preprocess_thread
+from app.config import settings
 
 class ProcessEmailPayload(BaseModel):
     conversation: Conversation
     env: str = "production"
     batch_name: Optional[str] = None
+    incremental: bool = True  # False always sends the whole thread
     
     @property
     def conversation_last_message_direction(self) -> str:
         return self.conversation.last_message_direction
 
-    def conversation_to_json_str(self) -> str:
-        import json
-        return json.dumps(self.conversation.model_dump(), indent=2, default=str)
+    def conversation_to_json_str(self, incremental_view: Optional[IncrementalView] = None) -> str:
+        """
+        Compact, token-budgeted conversation JSON used as the agents' input.
+
+        Quoted replies, signatures and repeated content are stripped and older
+        messages are windowed first (see app/thread_preprocessing.py). With an
+        `incremental_view`, only the messages since the previous run are sent,
+        together with that run's condensed state.
+        """
+        if incremental_view is not None:
+            conversation = self.conversation.model_copy(update={"messages": incremental_view.messages})
+            if settings.thread_preprocessing_enabled:
+                conversation = preprocess_thread(conversation, window_messages=0).conversation
+            return serialize_conversation(
+                conversation,
+                settings.agent_input_token_budget,
+                request_type="process_email_incremental",
+                baseline=self.conversation,
+                context={"previous_state": incremental_view.previous_state},
+                omitted_messages=incremental_view.omitted_messages,
+            )
+        if not settings.thread_preprocessing_enabled:
+            return serialize_conversation(self.conversation, settings.agent_input_token_budget)
+        thread = preprocess_thread(self.conversation, settings.thread_window_messages)
+        return serialize_conversation(
+            thread.conversation,
+            settings.agent_input_token_budget,
+            baseline=self.conversation,
+            context={"earlier_history_summary": thread.history_summary},
+            omitted_messages=thread.omitted_messages,
+        )
+
+    def conversation_to_record_str(self) -> str:
+        """The conversation as received, with original message bodies, for agent_runs.input."""
+        return compact_dumps(self.conversation.model_dump(mode="json", exclude_none=True))
+        
+class BatchProcessEmailPayload(BaseModel):
+    conversations: List[Conversation]
+    env: str = "production"
+    batch_name: Optional[str] = None
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    
+    def item_payloads(self) -> List[ProcessEmailPayload]:
+        return [
+            ProcessEmailPayload(conversation=conversation, env=self.env, batch_name=self.batch_name)
+            for conversation in self.conversations
+        ]
         
 class ActionPayload(BaseModel):
     creator_id: Optional[int] = None
@@ -22,5 +70,5 @@ class ActionPayload(BaseModel):
     instructions: str
     
     def to_json_str(self) -> str:
-        import json
-        return json.dumps(self.model_dump(), indent=2, default=str)
\ No newline at end of file
+        """Compact JSON used as the action agent's input."""
+        return serialize_model(self, "action")
\ No newline at end of file
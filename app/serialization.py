@@ -0,0 +1,238 @@
+"""
+Agent Input Serialization Module
+
+Compact JSON for text sent to LLM agents. Compared with the pretty-printed
+`json.dumps(..., indent=2)` used for logs and spans, agent inputs:
+- drop None values, empty strings and containers, and model fields left at their defaults
+- use compact separators and keep non-ASCII text as is
+- strip fields no prompt reads (AGENT_INPUT_EXCLUDED_FIELDS)
+- fit a token budget; conversations lose their oldest messages first and
+  say how many were left out, creator lists lose their last creators
+
+Every serialization is counted per request type, and one in
+`agent_input_stats_sample_every` is also measured against the size of the
+pretty-printed equivalent, so `agent_input_stats.stats()` reports the token
+reduction without pretty-printing every input. Token counts use the same
+characters-per-token estimate as audience shard budgeting.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence
+from pydantic import BaseModel
+from app.models.conversation import Conversation
+from app.config import settings
+
+# Rough size of a token in serialized JSON, used for budgets without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Fields no agent prompt reads, by the model or record they appear in
+AGENT_INPUT_EXCLUDED_FIELDS = {
+    "message": {"opened_at", "external_message_id", "conversation_id", "ai_response_used"},
+    "creator_core_information": {"screenshot_path"},
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def prune(value: Any) -> Any:
+    """Recursively drop None values, empty strings and empty containers from dicts and lists."""
+    if isinstance(value, dict):
+        pruned = {key: prune(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if item is not None and item not in ("", {}, [])}
+    if isinstance(value, (list, tuple)):
+        return [prune(item) for item in value if item is not None]
+    return value
+
+
+def compact_dumps(value: Any) -> str:
+    """Serialize already pruned data with compact separators."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class AgentInputStats:
+    """Per request type counters of compact agent input tokens, with a sampled pretty-printed baseline."""
+
+    def __init__(self, sample_every: int):
+        self._lock = threading.Lock()
+        self._sample_every = max(1, sample_every)
+        self._by_type: Dict[str, Dict[str, int]] = {}
+
+    def record(self, request_type: str, baseline: Callable[[], str], compact: str, trimmed_items: int = 0) -> None:
+        """
+        Count one agent input.
+
+        `baseline` builds the pretty-printed equivalent; it is only called for
+        sampled inputs (the first of each request type, then one in `sample_every`).
+        """
+        with self._lock:
+            counters = self._by_type.setdefault(request_type, {
+                "inputs": 0,
+                "compact_tokens": 0,
+                "trimmed_inputs": 0,
+                "trimmed_items": 0,
+                "sampled_inputs": 0,
+                "sampled_baseline_tokens": 0,
+                "sampled_compact_tokens": 0,
+            })
+            sampled = counters["inputs"] % self._sample_every == 0
+            counters["inputs"] += 1
+            counters["compact_tokens"] += estimate_tokens(compact)
+            counters["trimmed_inputs"] += 1 if trimmed_items else 0
+            counters["trimmed_items"] += trimmed_items
+        if not sampled:
+            return
+        # Build the baseline outside the lock; it is the expensive part
+        baseline_tokens = estimate_tokens(baseline())
+        with self._lock:
+            counters["sampled_inputs"] += 1
+            counters["sampled_baseline_tokens"] += baseline_tokens
+            counters["sampled_compact_tokens"] += estimate_tokens(compact)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_type = {request_type: dict(counters) for request_type, counters in self._by_type.items()}
+        for counters in by_type.values():
+            baseline = counters["sampled_baseline_tokens"]
+            counters["token_reduction_pct"] = (
+                round((baseline - counters["sampled_compact_tokens"]) / baseline * 100, 1) if baseline else None
+            )
+        return by_type
+
+
+# Global agent input stats instance
+agent_input_stats = AgentInputStats(sample_every=settings.agent_input_stats_sample_every)
+
+
+def serialize_model(model: BaseModel, request_type: str) -> str:
+    """
+    Serialize a request model as agent input, without None or default-valued fields.
+
+    Args:
+        model: The pydantic model to serialize
+        request_type: Stats bucket, e.g. "action"
+
+    Returns:
+        Compact JSON string
+    """
+    compact = compact_dumps(prune(model.model_dump(mode="json", exclude_none=True, exclude_defaults=True)))
+    agent_input_stats.record(request_type, lambda: json.dumps(model.model_dump(), indent=2, default=str), compact)
+    return compact
+
+
+def serialize_conversation(
+    conversation: Conversation,
+    token_budget: Optional[int] = None,
+    request_type: str = "process_email",
+    baseline: Optional[Conversation] = None,
+    context: Optional[Dict[str, Any]] = None,
+    omitted_messages: int = 0
+) -> str:
+    """
+    Serialize a conversation as agent input, trimming the oldest messages to fit `token_budget`.
+
+    The latest message is always kept. When messages are left out the output
+    carries `omitted_earlier_messages` so the agents know the thread is partial.
+
+    Args:
+        conversation: The conversation to serialize
+        token_budget: Maximum estimated input tokens, or None for no limit
+        request_type: Stats bucket
+        baseline: The conversation as received, when `conversation` was
+            preprocessed; savings are measured against it
+        context: Extra top-level fields standing in for messages already left
+            out, e.g. `earlier_history_summary` or `previous_state`
+        omitted_messages: Number of messages already left out
+
+    Returns:
+        Compact JSON string
+    """
+    excluded = AGENT_INPUT_EXCLUDED_FIELDS["message"]
+    data = prune(conversation.model_dump(mode="json", exclude_none=True, exclude_defaults=True, exclude={"messages"}))
+    data.update(prune(context or {}))
+    messages = [
+        prune(message.model_dump(mode="json", exclude_none=True, exclude_defaults=True, exclude=excluded))
+        for message in conversation.messages or []
+    ]
+
+    omitted = 0
+    compact = _conversation_json(data, messages, omitted_messages)
+    if token_budget is not None and estimate_tokens(compact) > token_budget and len(messages) > 1:
+        # Drop from the oldest end until the thread fits, measuring each message once
+        sizes = [len(compact_dumps(message)) + 1 for message in messages]
+        excess = len(compact) - token_budget * CHARS_PER_TOKEN
+        while excess > 0 and omitted < len(messages) - 1:
+            excess -= sizes[omitted]
+            omitted += 1
+        compact = _conversation_json(data, messages[omitted:], omitted_messages + omitted)
+
+    agent_input_stats.record(
+        request_type,
+        lambda: json.dumps((baseline or conversation).model_dump(), indent=2, default=str),
+        compact,
+        trimmed_items=omitted,
+    )
+    return compact
+
+
+def _conversation_json(data: Dict[str, Any], messages: Sequence[Dict[str, Any]], omitted: int) -> str:
+    if omitted:
+        data = {**data, "omitted_earlier_messages": omitted}
+    return compact_dumps({**data, "messages": list(messages)})
+
+
+def serialize_creators(
+    creators: Sequence[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+    request_type: str = "audience"
+) -> str:
+    """
+    Serialize creator detail records as agent input, dropping trailing creators to fit `token_budget`.
+
+    Args:
+        creators: Records shaped like app.db.queries.creator_details
+        token_budget: Maximum estimated input tokens, or None for no limit
+        request_type: Stats bucket
+
+    Returns:
+        Compact JSON array string
+    """
+    records = [_compact_creator(creator) for creator in creators]
+    encoded = [compact_dumps(record) for record in records]
+
+    kept = len(encoded)
+    if token_budget is not None:
+        limit = token_budget * CHARS_PER_TOKEN
+        size = 1
+        for position, item in enumerate(encoded):
+            size += len(item) + 1
+            if size > limit and position > 0:
+                kept = position
+                break
+    compact = "[" + ",".join(encoded[:kept]) + "]"
+
+    agent_input_stats.record(
+        request_type,
+        lambda: json.dumps(list(creators), indent=2, default=str),
+        compact,
+        trimmed_items=len(encoded) - kept,
+    )
+    return compact
+
+
+def compact_creator_size(creator: Dict[str, Any]) -> int:
+    """Estimated tokens of one creator record as serialize_creators writes it."""
+    return estimate_tokens(compact_dumps(_compact_creator(creator)))
+
+
+def _compact_creator(creator: Dict[str, Any]) -> Dict[str, Any]:
+    excluded = AGENT_INPUT_EXCLUDED_FIELDS["creator_core_information"]
+    record = dict(creator)
+    if isinstance(record.get("core_information"), dict):
+        record["core_information"] = {
+            key: value for key, value in record["core_information"].items() if key not in excluded
+        }
+    return prune(record)
+
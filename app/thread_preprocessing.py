@@ -0,0 +1,202 @@
+"""
+Thread Preprocessing Module
+
+Shrinks an email thread before it is serialized for the agents. Most
+message bodies carry the whole quoted reply chain, so a long negotiation
+sends the same text once per message. Preprocessing:
+- cuts each body at the first quoted-reply header ("On ... wrote:",
+  "-----Original Message-----", an Outlook "From:/Sent:" block) and drops
+  ">"-quoted lines
+- cuts signatures at the "-- " delimiter and removes mobile client footers
+- drops paragraphs an earlier message already contained, so text quoted
+  without a header is not sent twice
+- keeps the last `thread_window_messages` messages and replaces older ones
+  with the newest stored `negotiation_summary` from before the window; when
+  no older message has a summary, the whole thread is kept
+
+Only the agent input is affected. The payload's conversation is not
+modified, and agent runs persist the original bodies.
+
+`incremental_view` selects what an incremental run sends instead: only
+the messages after the one the previous run processed, plus that run's
+condensed state (see app/db/conversation_state.py).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from app.models.conversation import Conversation, Message
+
+# Body of a message whose every paragraph already appeared earlier in the thread
+DUPLICATE_BODY_PLACEHOLDER = "[no new content]"
+
+# Paragraphs shorter than this are too generic ("Thanks!", "Best,") to dedupe
+_MIN_DEDUPE_PARAGRAPH_CHARS = 40
+
+_REPLY_HEADER_PATTERNS = [
+    # Gmail/Apple Mail, possibly wrapped over two lines, in the common languages
+    re.compile(r"^[ \t]*(On|Le|Am|El|Il|Op)\b[^\n]{0,200}(\n[^\n]{0,200})?(wrote|a écrit|schrieb|escribió|ha scritto|schreef)\s*:[ \t]*$", re.M | re.I),
+    re.compile(r"^[ \t]*-{2,}[ \t]*(Original Message|Forwarded message|Ursprüngliche Nachricht)[ \t]*-{2,}", re.M | re.I),
+    # Outlook header block
+    re.compile(r"^[ \t]*_{10,}[ \t]*$", re.M),
+    re.compile(r"^[ \t]*\*?From:\*?[^\n]+\n(?:[^\n]*\n){0,3}?[ \t]*\*?(Sent|Date):", re.M | re.I),
+]
+_SIGNATURE_DELIMITER = re.compile(r"^-- ?$", re.M)
+_MOBILE_FOOTER = re.compile(r"^[ \t]*(Sent from my \w+|Sent from (Outlook|Mail) for \w+|Get Outlook for \w+)[^\n]*$", re.M | re.I)
+_PARAGRAPH_SPLIT = re.compile(r"\n[ \t]*\n")
+
+# Deliverable fields left out of an incremental run's previous state; the source text is in the thread
+_DELIVERABLE_STATE_EXCLUDED = {"creator_id", "raw_text"}
+
+
+@dataclass
+class PreprocessedThread:
+    conversation: Conversation
+    omitted_messages: int             # messages before the window, covered by history_summary
+    history_summary: Optional[str]
+    original_chars: int
+    preprocessed_chars: int
+
+
+@dataclass
+class IncrementalView:
+    messages: List[Message]           # messages after the processed one, oldest first
+    omitted_messages: int             # messages up to and including the processed one
+    previous_state: Dict[str, Any]
+
+
+def strip_quoted_reply(body: str) -> str:
+    """Cut a body at its first quoted-reply header and drop ">"-quoted lines."""
+    cut = len(body)
+    # A header on the first line is a forward without a comment; keep what follows it
+    first_line_end = body.find("\n", len(body) - len(body.lstrip())) + 1 or len(body)
+    for pattern in _REPLY_HEADER_PATTERNS:
+        match = pattern.search(body, first_line_end)
+        if match and match.start() < cut:
+            cut = match.start()
+    lines = [line for line in body[:cut].splitlines() if not line.lstrip().startswith(">")]
+    return "\n".join(lines).strip()
+
+
+def strip_signature(body: str) -> str:
+    """Cut a body at the "-- " signature delimiter and remove mobile client footers."""
+    match = _SIGNATURE_DELIMITER.search(body)
+    if match:
+        body = body[:match.start()]
+    return _MOBILE_FOOTER.sub("", body).strip()
+
+
+def _normalize(paragraph: str) -> str:
+    return " ".join(paragraph.split()).casefold()
+
+
+def preprocess_thread(conversation: Conversation, window_messages: int) -> PreprocessedThread:
+    """
+    Strip quoted history, signatures and repeated content, then window the thread.
+
+    Args:
+        conversation: The conversation as received; it is not modified
+        window_messages: Number of most recent messages to keep when an older summary exists
+
+    Returns:
+        PreprocessedThread with a copy of the conversation holding the reduced messages
+    """
+    messages = conversation.messages or []
+    seen_paragraphs = set()
+    cleaned: List[Message] = []
+    for message in messages:
+        body = strip_signature(strip_quoted_reply(message.body or ""))
+        paragraphs = []
+        for paragraph in _PARAGRAPH_SPLIT.split(body):
+            key = _normalize(paragraph)
+            if not key:
+                continue
+            if len(key) >= _MIN_DEDUPE_PARAGRAPH_CHARS:
+                if key in seen_paragraphs:
+                    continue
+                seen_paragraphs.add(key)
+            paragraphs.append(paragraph.strip())
+        body = "\n\n".join(paragraphs) or (DUPLICATE_BODY_PLACEHOLDER if message.body else "")
+        cleaned.append(message.model_copy(update={"body": body}))
+
+    omitted = 0
+    history_summary = None
+    if window_messages > 0 and len(cleaned) > window_messages:
+        older = cleaned[:-window_messages]
+        history_summary = next(
+            (message.negotiation_summary for message in reversed(older) if message.negotiation_summary),
+            None
+        )
+        if history_summary:
+            omitted = len(older)
+            cleaned = cleaned[omitted:]
+
+    return PreprocessedThread(
+        conversation=conversation.model_copy(update={"messages": cleaned}),
+        omitted_messages=omitted,
+        history_summary=history_summary,
+        original_chars=sum(len(message.body or "") for message in messages),
+        preprocessed_chars=sum(len(message.body) for message in cleaned),
+    )
+
+
+def incremental_view(
+    conversation: Conversation,
+    processed_message_id: int,
+    previous_metadata: Optional[Dict[str, Any]],
+    max_new_messages: int,
+    deliverables: Optional[Sequence[Dict[str, Any]]] = None
+) -> Optional[IncrementalView]:
+    """
+    Messages since the last processed one plus the condensed state of that run.
+
+    Stage, tags, negotiation summary and follow-up come from the processed
+    message as stored, falling back to the previous run's metadata output;
+    deliverables are the creator's current ones when given, else those in
+    that output.
+
+    Args:
+        conversation: The conversation as received
+        processed_message_id: message_id of the previous agent run
+        previous_metadata: The previous run's metadata_agent_output, as stored
+        max_new_messages: Above this many new messages the state is treated as stale
+        deliverables: The creator's current deliverables (stored rows plus the
+            previous run's), or None to use the previous run's only
+
+    Returns:
+        IncrementalView, or None when the thread must be processed in full:
+        the processed message is not in the thread or is the latest one,
+        too many messages arrived since, or no state was stored
+    """
+    messages = conversation.messages or []
+    position = next((index for index, message in enumerate(messages) if message.id == processed_message_id), None)
+    if position is None:
+        return None
+    new_messages = messages[position + 1:]
+    if not new_messages or len(new_messages) > max_new_messages:
+        return None
+
+    processed = messages[position]
+    stored = (previous_metadata or {}).get("message_metadata") or {}
+    if deliverables is None:
+        deliverables = (previous_metadata or {}).get("deliverables") or []
+    previous_state = {
+        "processed_through_message_id": processed_message_id,
+        "stage": processed.stage or stored.get("email_stage"),
+        "tags": processed.tags or stored.get("email_tags"),
+        "negotiation_summary": processed.negotiation_summary or stored.get("email_negotiation_summary"),
+        "follow_up_needed": processed.follow_up_needed if processed.follow_up_needed is not None else stored.get("email_follow_up_needed"),
+        "follow_up_date": processed.follow_up_date or stored.get("email_follow_up_date"),
+        "deliverables": [
+            {key: value for key, value in deliverable.items() if key not in _DELIVERABLE_STATE_EXCLUDED}
+            for deliverable in deliverables
+        ],
+    }
+    if not previous_state["stage"] and not previous_state["negotiation_summary"]:
+        return None
+
+    return IncrementalView(
+        messages=new_messages,
+        omitted_messages=position + 1,
+        previous_state=previous_state,
+    )
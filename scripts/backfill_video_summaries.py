@@ -0,0 +1,42 @@
+"""
+Backfill normalized video analysis
+
+Fills creators_platform.video_summary and mean_views from the raw
+video_analysis blob. New writes are summarized by a database trigger
+(see supabase/migrations/20261017000400_creators_platform_video_summary_trigger.sql);
+this is for rows whose summary is missing or was built by an older
+VIDEO_SUMMARY_VERSION.
+
+Usage:
+    python scripts/backfill_video_summaries.py            # missing or outdated summaries
+    python scripts/backfill_video_summaries.py --all      # recompute every row
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.video_summaries import backfill_video_summaries  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="recompute summaries that already exist")
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    updated = backfill_video_summaries(
+        only_stale=not args.all,
+        page_size=args.page_size,
+        concurrency=args.concurrency,
+    )
+    print(f"updated {updated} creators_platform rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
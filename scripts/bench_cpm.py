@@ -0,0 +1,211 @@
+"""
+CPM Ranking Benchmark
+
+Compares the previous per-creator Python loop with the vectorized build of
+the incremental index in app/analytics/cpm_index.py on synthetic campaigns,
+and checks that both produce the same ranking. The index is built from
+CreatorFeatures as /cpm-analysis does; building the features is timed on
+its own, since the feature store caches them and shares them with audience
+analysis. The speedup compares the legacy loop with building the index and
+reading the first page, which is what a paginated /cpm-analysis request
+pays. Also checks that the index still matches a full re-rank after
+random deliverable and view updates, and times one such update against a
+full rebuild.
+
+Usage:
+    python scripts/bench_cpm.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.analytics.cpm_index import CampaignCPMIndex  # noqa: E402
+from app.analytics.features import build_creator_features  # noqa: E402
+from app.models.cpm_analysis import CPMTableEntry  # noqa: E402
+
+CURRENCIES = ["USD", "usd", "EUR", "GBP", "INR", None]
+
+
+def _mean_views(creator: Dict[str, Any]) -> Optional[float]:
+    views = creator["creators_platform"][0]["video_analysis"].get("views")
+    return float(views) if views is not None else None
+
+
+def make_campaign(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    creators = []
+    deliverables_by_creator: Dict[int, List[Dict[str, Any]]] = {}
+    for creator_id in range(1, size + 1):
+        views = None if rng.random() < 0.05 else rng.randint(500, 2_000_000)
+        creators.append({
+            "id": creator_id,
+            "username": f"creator_{creator_id}",
+            "evaluation_score": rng.choice([None, 1, 2, 3, 4, 5]),
+            "creators_platform": [{"video_analysis": {"views": views}, "mean_views": views}],
+        })
+        if rng.random() < 0.9:
+            deliverables_by_creator[creator_id] = [
+                {
+                    "creator_id": creator_id,
+                    "price": None if rng.random() < 0.05 else round(rng.uniform(50, 20000), 2),
+                    "currency": rng.choice(CURRENCIES),
+                }
+                for _ in range(rng.randint(1, 6))
+            ]
+    return creators, deliverables_by_creator
+
+
+def legacy_rank(creators, deliverables_by_creator) -> List[CPMTableEntry]:
+    """The per-creator loop that get_campaign_creators_ranked_by_cpm used to run."""
+    def rate_usd(creator_id):
+        if creator_id not in deliverables_by_creator:
+            return None
+        valid_prices = []
+        for deliverable in deliverables_by_creator[creator_id]:
+            price = deliverable.get("price")
+            currency = deliverable.get("currency", "USD")
+            if price is None:
+                continue
+            currency = "USD" if currency is None else currency.upper()
+            price_float = float(price)
+            if currency == "INR":
+                price_float = price_float / 83.0
+            elif currency == "EUR":
+                price_float = price_float * 1.08
+            elif currency == "GBP":
+                price_float = price_float * 1.26
+            valid_prices.append(price_float)
+        return sum(valid_prices) / len(valid_prices) if valid_prices else None
+
+    entries = []
+    for creator in creators:
+        mean_views = _mean_views(creator)
+        if mean_views is None or mean_views <= 0:
+            continue
+        rate = rate_usd(creator["id"])
+        if rate is None or rate <= 0:
+            continue
+        entries.append({
+            "handle": creator["username"],
+            "brand_fit": creator.get("evaluation_score", 3) or 3,
+            "rate_usd": rate,
+            "mean_views": int(mean_views),
+            "cpm_usd": (rate / mean_views) * 1000,
+        })
+    entries.sort(key=lambda x: x["cpm_usd"])
+    if entries:
+        cpm_values = [entry["cpm_usd"] for entry in entries]
+        bound = sorted(cpm_values)[len(cpm_values) // 2] * 2
+    else:
+        bound = 0
+    return [
+        CPMTableEntry(
+            rank=rank,
+            outlier_rate_pct=max(0, ((entry["cpm_usd"] - bound) / bound) * 100) if bound > 0 else 0.0,
+            **entry,
+        )
+        for rank, entry in enumerate(entries, 1)
+    ]
+
+
+def index_rank(features) -> List[CPMTableEntry]:
+    return CampaignCPMIndex.from_features(features).entries()
+
+
+def index_build(features) -> int:
+    return len(CampaignCPMIndex.from_features(features))
+
+
+def index_top(features) -> List[CPMTableEntry]:
+    """Index build plus the first page (what paginated reads pay)."""
+    return CampaignCPMIndex.from_features(features).entries(0, 50)
+
+
+def _assert_same_ranking(expected: List[CPMTableEntry], actual: List[CPMTableEntry]) -> None:
+    assert [e.handle for e in expected] == [e.handle for e in actual], "ranking order differs"
+    for a, b in zip(expected, actual):
+        assert abs(a.cpm_usd - b.cpm_usd) <= 1e-9 * max(1.0, a.cpm_usd)
+        assert abs(a.rate_usd - b.rate_usd) <= 1e-9 * max(1.0, a.rate_usd)
+        assert abs(a.outlier_rate_pct - b.outlier_rate_pct) <= 1e-6
+        assert a.mean_views == b.mean_views and a.brand_fit == b.brand_fit
+
+
+def random_updates(rng: random.Random, creators, deliverables_by_creator, index: CampaignCPMIndex, count: int):
+    """Apply random price and view changes to both the raw rows and the index."""
+    for _ in range(count):
+        creator = rng.choice(creators)
+        creator_id = creator["id"]
+        if rng.random() < 0.7:
+            deliverables = [
+                {"creator_id": creator_id, "price": round(rng.uniform(50, 20000), 2), "currency": rng.choice(CURRENCIES)}
+                for _ in range(rng.randint(0, 3))
+            ]
+            deliverables_by_creator[creator_id] = deliverables
+            index.set_deliverables(creator_id, deliverables)
+        else:
+            views = None if rng.random() < 0.1 else rng.randint(500, 2_000_000)
+            creator["creators_platform"][0]["video_analysis"]["views"] = views
+            creator["creators_platform"][0]["mean_views"] = views
+            index.set_mean_views(creator_id, _mean_views(creator))
+
+
+def _time(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    # "all rows" columns materialize every CPMTableEntry; that validation costs the same in both
+    print(
+        f"{'creators':>10} {'legacy ms':>11} {'all rows ms':>12} {'build ms':>10} {'top-50 ms':>10} "
+        f"{'speedup':>8} {'features ms':>12}"
+    )
+    for size in args.sizes:
+        creators, deliverables_by_creator = make_campaign(size)
+        features = build_creator_features(creators, deliverables_by_creator)
+        _assert_same_ranking(legacy_rank(creators, deliverables_by_creator), index_rank(features))
+
+        legacy_ms = _time(legacy_rank, creators, deliverables_by_creator)
+        index_ms = _time(index_rank, features)
+        build_ms = _time(index_build, features)
+        top_ms = _time(index_top, features)
+        features_ms = _time(build_creator_features, creators, deliverables_by_creator)
+        print(
+            f"{size:>10} {legacy_ms:>11.1f} {index_ms:>12.1f} {build_ms:>10.1f} {top_ms:>10.1f} "
+            f"{legacy_ms / top_ms:>7.1f}x {features_ms:>12.1f}"
+        )
+
+    print()
+    print(f"{'creators':>10} {'update us':>11} {'top-50 us':>11} {'rebuild ms':>11}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        creators, deliverables_by_creator = make_campaign(size)
+        index = CampaignCPMIndex.from_features(build_creator_features(creators, deliverables_by_creator))
+        random_updates(rng, creators, deliverables_by_creator, index, 200)
+        _assert_same_ranking(legacy_rank(creators, deliverables_by_creator), index.entries())
+
+        updates = 1000
+        start = time.perf_counter()
+        random_updates(rng, creators, deliverables_by_creator, index, updates)
+        update_us = (time.perf_counter() - start) / updates * 1e6
+        top_us = _time(index.entries, 0, 50) * 1000
+        rebuild_ms = _time(index_top, build_creator_features(creators, deliverables_by_creator))
+        print(f"{size:>10} {update_us:>11.1f} {top_us:>11.1f} {rebuild_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
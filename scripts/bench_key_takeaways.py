@@ -0,0 +1,52 @@
+"""
+CPM Key Takeaways Benchmark
+
+Times the single-pass CPMAnalysisResponse.generate_key_takeaways against the
+previous multi-pass implementation on large rankings. Both give the same
+output; tests/test_cpm_analysis.py checks that, and this script only times
+them.
+
+Usage:
+    python scripts/bench_key_takeaways.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tests"))
+
+from app.models.cpm_analysis import CPMAnalysisResponse, compute_cpm_stats  # noqa: E402
+from test_cpm_analysis import legacy_key_takeaways, random_ranking  # noqa: E402
+
+
+def _time(fn, *args, repeat: int = 5, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'creators':>10} {'legacy ms':>11} {'single ms':>11} {'w/ stats ms':>12} {'speedup':>8}")
+    rng = random.Random(3)
+    for size in args.sizes:
+        ranking = random_ranking(rng, size)
+        stats = compute_cpm_stats([entry.cpm_usd for entry in ranking], is_sorted=True)
+        legacy_ms = _time(legacy_key_takeaways, ranking)
+        single_ms = _time(CPMAnalysisResponse.generate_key_takeaways, ranking)
+        stats_ms = _time(CPMAnalysisResponse.generate_key_takeaways, ranking, cpm_stats=stats)
+        print(f"{size:>10} {legacy_ms:>11.2f} {single_ms:>11.2f} {stats_ms:>12.2f} {legacy_ms / stats_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+/process-email Throughput Benchmark
+
+Fires N concurrent /process-email requests at a running worker and reports
+throughput and latency. Run it once against a single uvicorn worker on the
+commit before the async tool client and once after it to compare.
+
+Every request gets its own conversation id and last_message_id, so none of
+them is deduplicated or debounced against another and the "miss" rows time
+the full pipeline. The same requests are then sent again; the "hit" rows
+time answers served by the idempotency cache. Requests are grouped by the
+X-Cache header the worker returned, so a level whose misses were not all
+MISS (e.g. ids already in agent_runs) shows up in the counts.
+
+Usage:
+    uvicorn app.main:app --workers 1 --port 8000
+    python scripts/bench_process_email.py input.json --concurrency 1 4 16 --requests 32
+
+`input.json` is a ProcessEmailPayload body. Use env "labeling" to keep the
+benchmark out of the production tables.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+import httpx
+
+
+def _distinct_payloads(payload: Dict[str, Any], first_id: int, count: int) -> List[Dict[str, Any]]:
+    """Copies of `payload` whose conversation and newest message ids are unique."""
+    payloads = []
+    for offset in range(count):
+        copied = copy.deepcopy(payload)
+        conversation = copied["conversation"]
+        conversation["id"] = first_id + offset
+        conversation["last_message_id"] = first_id + offset
+        if conversation.get("messages"):
+            conversation["messages"][-1]["id"] = first_id + offset
+        payloads.append(copied)
+    return payloads
+
+
+def _latency_stats(latencies: List[float]) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+async def _run_level(
+    client: httpx.AsyncClient,
+    url: str,
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+    phase: str
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies_by_cache: Dict[str, List[float]] = defaultdict(list)
+    failures = 0
+
+    async def one_request(payload: Dict[str, Any]) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(url, json=payload)
+            latency = time.perf_counter() - start
+            if response.status_code != 200:
+                failures += 1
+                return
+            latencies_by_cache[response.headers.get("X-Cache", "NONE")].append(latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(payload) for payload in payloads))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "phase": phase,
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(payloads) / elapsed, 3),
+        "by_cache_status": {status: _latency_stats(latencies) for status, latencies in sorted(latencies_by_cache.items())},
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payload", help="Path to a ProcessEmailPayload JSON file")
+    parser.add_argument("--url", default="http://localhost:8000/process-email")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument(
+        "--first-id", type=int, default=None,
+        help="First conversation/message id to use (default: random, so reruns do not hit stored runs)"
+    )
+    args = parser.parse_args()
+
+    with open(args.payload) as f:
+        payload = json.load(f)
+
+    next_id = args.first_id if args.first_id is not None else random.randrange(1_000_000_000, 2_000_000_000)
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for concurrency in args.concurrency:
+            payloads = _distinct_payloads(payload, next_id, args.requests)
+            next_id += args.requests
+            print(json.dumps(await _run_level(client, args.url, payloads, concurrency, "miss")))
+            print(json.dumps(await _run_level(client, args.url, payloads, concurrency, "hit")))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
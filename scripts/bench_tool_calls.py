@@ -0,0 +1,119 @@
+"""
+Agent Tool Call Benchmark
+
+Runs N concurrent LLM-backed agent tools (app/agents/tools.py) on one event
+loop while every prompt lookup is a registry miss, and reports wall time and
+the worst event-loop stall seen by a heartbeat task, i.e. how long every
+other request on the worker was frozen.
+
+The Langfuse fetch and the completion are simulated with fixed latencies so
+the numbers isolate how the tools wait: "sync lookup" resolves prompts with
+the blocking PromptRegistry.get (as the tools did before aget_prompt),
+"async lookup" awaits PromptRegistry.aget. Both use the async OpenAI client.
+
+Usage:
+    python scripts/bench_tool_calls.py --concurrency 1 8 32 --fetch-ms 150 --completion-ms 400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.tool_context import ToolContext  # noqa: E402
+
+from app.agents import tools  # noqa: E402
+from app.agents.prompts import prompt_registry  # noqa: E402
+
+
+class _Prompt:
+    version = 1
+
+    def compile(self, **variables: Any) -> str:
+        return json.dumps(variables)
+
+
+class _BlockingLangfuse:
+    """Stands in for the Langfuse SDK, whose get_prompt is a blocking HTTP call."""
+
+    def __init__(self, fetch_seconds: float):
+        self._fetch_seconds = fetch_seconds
+
+    def get_prompt(self, name: str, version=None, cache_ttl_seconds=None) -> _Prompt:
+        time.sleep(self._fetch_seconds)
+        return _Prompt()
+
+
+class _AsyncCompletions:
+    def __init__(self, completion_seconds: float):
+        self._completion_seconds = completion_seconds
+
+    async def create(self, **kwargs: Any) -> Any:
+        await asyncio.sleep(self._completion_seconds)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+
+async def _sync_lookup(name: str) -> Any:
+    return prompt_registry.get(name)
+
+
+async def _call_tool(tool: Any, arguments: Dict[str, Any]) -> Any:
+    raw = json.dumps(arguments)
+    context = ToolContext(context=None, tool_name=tool.name, tool_call_id="bench", tool_arguments=raw)
+    return await tool.on_invoke_tool(context, raw)
+
+
+async def _run_level(concurrency: int) -> Dict[str, float]:
+    prompt_registry.invalidate()
+    stalls = []
+    stop = asyncio.Event()
+
+    async def heartbeat() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - start - 0.005)
+
+    calls = [
+        (tools.find_rates, {"creator_email": "a@b.c", "creator_name": "A"}),
+        (tools.extract_rates, {"email_body": "My rate is $500"}),
+        (tools.share_brief_link, {"campaign_id": "1"}),
+        (tools.verify_draft, {"subject": "Hi", "body": "Hello", "tone": "warm"}),
+    ]
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await asyncio.gather(*(_call_tool(*calls[i % len(calls)]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return {"wall_ms": round(elapsed * 1000, 1), "max_stall_ms": round(max(stalls) * 1000, 1)}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--fetch-ms", type=float, default=150.0, help="Simulated Langfuse prompt fetch")
+    parser.add_argument("--completion-ms", type=float, default=400.0, help="Simulated tool completion")
+    args = parser.parse_args()
+
+    prompt_registry._client = _BlockingLangfuse(args.fetch_ms / 1000)
+    tools.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=_AsyncCompletions(args.completion_ms / 1000)))
+    async_lookup = tools.aget_prompt
+
+    print(f"{'concurrency':>11} | {'mode':<12} | {'wall ms':>8} | {'max stall ms':>12}")
+    for concurrency in args.concurrency:
+        for mode, lookup in (("sync lookup", _sync_lookup), ("async lookup", async_lookup)):
+            tools.aget_prompt = lookup
+            result = await _run_level(concurrency)
+            print(f"{concurrency:>11} | {mode:<12} | {result['wall_ms']:>8} | {result['max_stall_ms']:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
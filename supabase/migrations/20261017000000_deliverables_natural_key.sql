@@ -0,0 +1,15 @@
+-- Natural key for deliverables, used as the conflict target of the bulk
+-- deliverable upsert in app/db/persistence.py (save_deliverables).
+
+-- Keep only the newest row for each natural key before adding the index
+delete from deliverables older
+using deliverables newer
+where older.creator_id = newer.creator_id
+  and older.media_type = newer.media_type
+  and older.platform = newer.platform
+  and older.unit is not distinct from newer.unit
+  and older.id < newer.id;
+
+-- unit is nullable, so NULLs must compare equal for the key to be unique
+create unique index if not exists deliverables_natural_key
+    on deliverables (creator_id, media_type, platform, unit) nulls not distinct;
@@ -0,0 +1,47 @@
+-- Membership index: distinct creators per parent campaign.
+-- Replaces scanning smartlead_campaigns + every conversations row and
+-- deduplicating creator_id in Python (read by get_campaign_creator_ids in
+-- app/db/feature_store.py through fetch_in_chunks).
+
+create table if not exists campaign_creators (
+    parent_campaign_id bigint not null,
+    creator_id bigint not null,
+    created_at timestamptz not null default now(),
+    primary key (parent_campaign_id, creator_id)
+);
+
+-- Maintained incrementally: each new (or re-pointed) conversation adds its
+-- creator to the parent campaign of its smartlead campaign, if not already there
+create or replace function campaign_creators_on_conversation()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.creator_id is null or new.smartlead_campaign_id is null then
+        return new;
+    end if;
+
+    insert into campaign_creators (parent_campaign_id, creator_id)
+    select sc.parent_campaign_id, new.creator_id
+    from smartlead_campaigns sc
+    where sc.id = new.smartlead_campaign_id
+      and sc.parent_campaign_id is not null
+    on conflict do nothing;
+
+    return new;
+end;
+$$;
+
+drop trigger if exists campaign_creators_on_conversation on conversations;
+create trigger campaign_creators_on_conversation
+after insert or update of creator_id, smartlead_campaign_id on conversations
+for each row execute function campaign_creators_on_conversation();
+
+-- Backfill from existing conversations
+insert into campaign_creators (parent_campaign_id, creator_id)
+select distinct sc.parent_campaign_id, c.creator_id
+from conversations c
+join smartlead_campaigns sc on sc.id = c.smartlead_campaign_id
+where sc.parent_campaign_id is not null
+  and c.creator_id is not null
+on conflict do nothing;
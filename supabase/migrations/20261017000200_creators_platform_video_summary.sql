@@ -0,0 +1,14 @@
+-- Normalized video analysis stored next to the raw blob.
+-- video_summary holds the schema-stable summary built by
+-- app/analytics/video_summary.py; mean_views is the normalized views figure
+-- used for CPM. Analytics select these two columns instead of video_analysis.
+-- Existing rows are filled by scripts/backfill_video_summaries.py.
+
+alter table creators_platform
+    add column if not exists video_summary jsonb,
+    add column if not exists mean_views double precision;
+
+-- Lets the backfill find rows that still need a summary without a full scan
+create index if not exists creators_platform_missing_video_summary
+    on creators_platform (id)
+    where video_summary is null and video_analysis is not null;
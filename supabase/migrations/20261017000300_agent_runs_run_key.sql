@@ -0,0 +1,35 @@
+-- Idempotent agent run writes. app/db/persistence.py (save_agent_runs_and_tool_calls)
+-- upserts agent_runs on a client-generated run_key and agent_tool_calls on
+-- (agent_run_id, execution_order), so a retried write-behind flush cannot
+-- insert the same run or tool call twice. Applied to every schema that holds
+-- agent runs (public, and labeling when present).
+
+do $$
+declare
+    target_schema text;
+begin
+    foreach target_schema in array array['public', 'labeling'] loop
+        if to_regclass(format('%I.agent_runs', target_schema)) is null then
+            continue;
+        end if;
+
+        execute format('alter table %I.agent_runs add column if not exists run_key text', target_schema);
+        -- Existing rows get a key of their own so the unique index can be built
+        execute format('update %I.agent_runs set run_key = md5(id::text || clock_timestamp()::text) where run_key is null', target_schema);
+        execute format('alter table %I.agent_runs alter column run_key set not null', target_schema);
+        execute format('create unique index if not exists agent_runs_run_key on %I.agent_runs (run_key)', target_schema);
+
+        -- Keep only the newest tool call for each (run, position) before adding the key
+        execute format(
+            'delete from %1$I.agent_tool_calls older using %1$I.agent_tool_calls newer '
+            'where older.agent_run_id = newer.agent_run_id '
+            'and older.execution_order = newer.execution_order '
+            'and older.id < newer.id',
+            target_schema
+        );
+        execute format(
+            'create unique index if not exists agent_tool_calls_run_order on %I.agent_tool_calls (agent_run_id, execution_order)',
+            target_schema
+        );
+    end loop;
+end $$;
@@ -0,0 +1,109 @@
+-- Keep creators_platform.video_summary and mean_views in step with
+-- video_analysis for every writer, including the scrapers outside this repo.
+-- video_summary_of mirrors summarize_video_analysis in
+-- app/analytics/video_summary.py (summary version 1); change both together.
+-- Values that are not numbers become null instead of failing the write.
+
+create or replace function video_summary_number(value jsonb)
+returns double precision
+language plpgsql
+immutable
+as $$
+begin
+    -- Some analyses store counts as {"current": n, ...}
+    if jsonb_typeof(value) = 'object' then
+        value := value -> 'current';
+    end if;
+    if value is null or jsonb_typeof(value) not in ('number', 'string') then
+        return null;
+    end if;
+    return (value #>> '{}')::double precision;
+exception when others then
+    return null;
+end;
+$$;
+
+create or replace function video_summary_mean_views(video_analysis jsonb, network text)
+returns double precision
+language sql
+immutable
+as $$
+    select case
+        when network = 'youtube'
+            and jsonb_typeof(video_analysis -> 'views') = 'object'
+            and video_analysis -> 'views' ? 'current'
+            then video_summary_number(video_analysis -> 'views' -> 'current')
+        when network = 'instagram'
+            and jsonb_typeof(video_analysis -> 'last_15_videos_summary') = 'object'
+            then case
+                when video_analysis -> 'last_15_videos_summary' ? 'mean_views'
+                    then video_summary_number(video_analysis -> 'last_15_videos_summary' -> 'mean_views')
+                -- Fall back to median if mean not available
+                when video_analysis -> 'last_15_videos_summary' ? 'median_views'
+                    then video_summary_number(video_analysis -> 'last_15_videos_summary' -> 'median_views')
+            end
+    end
+$$;
+
+create or replace function video_summary_of(video_analysis jsonb, network text)
+returns jsonb
+language sql
+immutable
+as $$
+    select case
+        when video_analysis is null
+            or jsonb_typeof(video_analysis) <> 'object'
+            or video_analysis = '{}'::jsonb
+            then null
+        else jsonb_build_object(
+            'version', 1,
+            'platform', network,
+            'mean_views', video_summary_mean_views(video_analysis, network),
+            'median_views', video_summary_number(video_analysis -> 'last_15_videos_summary' -> 'median_views'),
+            'subscribers', video_summary_number(video_analysis -> 'subscribers'),
+            'sample_size_videos', case
+                -- YouTube analyses cover the last 15 videos; Instagram ones state their sample size
+                when not video_analysis ? 'last_15_videos_summary' then null
+                when network = 'youtube' then '15'::jsonb
+                else coalesce(video_analysis -> 'sample_size_videos', '24'::jsonb)
+            end,
+            -- Only include non-zero counts
+            'performance_distribution', coalesce((
+                select jsonb_agg(
+                    jsonb_build_object('range', item -> 'range', 'count', item -> 'count', 'percentage', item -> 'percentage')
+                    order by position
+                )
+                from jsonb_array_elements(
+                    case
+                        when jsonb_typeof(video_analysis -> 'last_15_videos_distribution_relative_to_median') = 'array'
+                            then video_analysis -> 'last_15_videos_distribution_relative_to_median'
+                        else '[]'::jsonb
+                    end
+                ) with ordinality as items(item, position)
+                where coalesce(video_summary_number(item -> 'count'), 0) > 0
+            ), '[]'::jsonb)
+        )
+    end
+$$;
+
+create or replace function creators_platform_set_video_summary()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.video_summary := video_summary_of(new.video_analysis, new.network);
+    new.mean_views := (new.video_summary ->> 'mean_views')::double precision;
+    return new;
+end;
+$$;
+
+drop trigger if exists creators_platform_video_summary on creators_platform;
+create trigger creators_platform_video_summary
+    before insert or update of video_analysis, network on creators_platform
+    for each row execute function creators_platform_set_video_summary();
+
+-- Recompute every existing row, including re-scraped rows whose summary went stale
+update creators_platform
+set video_summary = video_summary_of(video_analysis, network),
+    mean_views = video_summary_mean_views(video_analysis, network)
+where video_analysis is not null or video_summary is not null;
@@ -0,0 +1,128 @@
+-- Keep campaign_creators exact instead of insert-only. 20261017000100 only
+-- added memberships, so a conversation that was deleted or moved to another
+-- creator or smartlead campaign, or a smartlead campaign moved to another
+-- parent, left its creator in the old parent campaign, and a smartlead
+-- campaign gaining a parent never brought its creators along.
+-- A membership exists exactly while some conversation links the creator to a
+-- smartlead campaign of the parent campaign.
+
+-- Membership lookups from the triggers below
+create index if not exists conversations_creator_id on conversations (creator_id);
+create index if not exists conversations_smartlead_campaign_id on conversations (smartlead_campaign_id);
+
+-- Recompute one (parent campaign, creator) membership from conversations.
+-- The transaction-scoped lock serializes writers of the same pair, so a
+-- concurrent insert and delete cannot leave the row missing or stale.
+create or replace function campaign_creators_refresh(target_parent_campaign_id bigint, target_creator_id bigint)
+returns void
+language plpgsql
+as $$
+begin
+    if target_parent_campaign_id is null or target_creator_id is null then
+        return;
+    end if;
+
+    perform pg_advisory_xact_lock(
+        hashtext('campaign_creators'),
+        hashtext(target_parent_campaign_id::text || ':' || target_creator_id::text)
+    );
+
+    if exists (
+        select 1
+        from conversations c
+        join smartlead_campaigns sc on sc.id = c.smartlead_campaign_id
+        where c.creator_id = target_creator_id
+          and sc.parent_campaign_id = target_parent_campaign_id
+    ) then
+        insert into campaign_creators (parent_campaign_id, creator_id)
+        values (target_parent_campaign_id, target_creator_id)
+        on conflict do nothing;
+    else
+        delete from campaign_creators
+        where parent_campaign_id = target_parent_campaign_id
+          and creator_id = target_creator_id;
+    end if;
+end;
+$$;
+
+-- Conversations: refresh the membership the row links to before and after the change
+create or replace function campaign_creators_on_conversation()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform campaign_creators_refresh(
+            (select parent_campaign_id from smartlead_campaigns where id = old.smartlead_campaign_id),
+            old.creator_id
+        );
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform campaign_creators_refresh(
+            (select parent_campaign_id from smartlead_campaigns where id = new.smartlead_campaign_id),
+            new.creator_id
+        );
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists campaign_creators_on_conversation on conversations;
+create trigger campaign_creators_on_conversation
+after insert or update of creator_id, smartlead_campaign_id or delete on conversations
+for each row execute function campaign_creators_on_conversation();
+
+-- Smartlead campaigns: a changed parent moves every creator of the campaign's conversations
+create or replace function campaign_creators_on_smartlead_campaign()
+returns trigger
+language plpgsql
+as $$
+declare
+    linked_creator_id bigint;
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.parent_campaign_id is not null then
+        for linked_creator_id in
+            select distinct creator_id from conversations
+            where smartlead_campaign_id = old.id and creator_id is not null
+        loop
+            perform campaign_creators_refresh(old.parent_campaign_id, linked_creator_id);
+        end loop;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') and new.parent_campaign_id is not null then
+        for linked_creator_id in
+            select distinct creator_id from conversations
+            where smartlead_campaign_id = new.id and creator_id is not null
+        loop
+            perform campaign_creators_refresh(new.parent_campaign_id, linked_creator_id);
+        end loop;
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists campaign_creators_on_smartlead_campaign on smartlead_campaigns;
+create trigger campaign_creators_on_smartlead_campaign
+after insert or update of parent_campaign_id or delete on smartlead_campaigns
+for each row execute function campaign_creators_on_smartlead_campaign();
+
+-- Drop memberships the insert-only trigger left behind, and add any it missed
+delete from campaign_creators cc
+where not exists (
+    select 1
+    from conversations c
+    join smartlead_campaigns sc on sc.id = c.smartlead_campaign_id
+    where c.creator_id = cc.creator_id
+      and sc.parent_campaign_id = cc.parent_campaign_id
+);
+
+insert into campaign_creators (parent_campaign_id, creator_id)
+select distinct sc.parent_campaign_id, c.creator_id
+from conversations c
+join smartlead_campaigns sc on sc.id = c.smartlead_campaign_id
+where sc.parent_campaign_id is not null
+  and c.creator_id is not null
+on conflict do nothing;
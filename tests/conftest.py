@@ -0,0 +1,13 @@
+import os
+
+# app.config requires these; tests never reach the services they point at
+for name, value in {
+    "LANGFUSE_PUBLIC_KEY": "test",
+    "LANGFUSE_SECRET_KEY": "test",
+    "LANGFUSE_HOST": "http://localhost:1",
+    "LANGFUSE_ENVIRONMENT": "test",
+    "SUPABASE_URL": "http://localhost:1",
+    "SUPABASE_KEY": "test",
+    "OPENAI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache("test", max_size=10, ttl_seconds=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("key", loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert loads == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.get("key") == "value"
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    cache = TTLCache("test", max_size=10, ttl_seconds=60)
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("key", loader) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [RuntimeError] * 3
+    assert cache.get("key") is None
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = TTLCache("test", max_size=10, ttl_seconds=60)
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def main():
+        first = asyncio.ensure_future(cache.aget_or_load("key", loader))
+        second = asyncio.ensure_future(cache.aget_or_load("key", loader))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "value"
+    assert cache.get("key") == "value"
+
+
+def test_load_invalidated_in_flight_is_not_stored():
+    cache = TTLCache("test", max_size=10, ttl_seconds=60)
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        return "old"
+
+    async def main():
+        load = asyncio.ensure_future(cache.aget_or_load("key", loader))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        return await load
+
+    assert asyncio.run(main()) == "old"
+    assert cache.get("key") is None
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.conversation_scheduler import ConversationScheduler
+
+
+def test_burst_runs_newest_message_once():
+    scheduler = ConversationScheduler(debounce_seconds=0.01, max_wait_seconds=1)
+    runs = []
+
+    def execute(message_id):
+        async def run():
+            runs.append(message_id)
+            return message_id
+        return run
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit("conversation", message_id, execute(message_id)) for message_id in (1, 3, 2)))
+
+    assert asyncio.run(main()) == [3, 3, 3]
+    assert runs == [3]
+    assert scheduler.stats()["active_conversations"] == 0
+
+
+@pytest.mark.parametrize("cancel_while", ["debouncing", "running"])
+def test_cancelled_worker_releases_waiters_and_lane(cancel_while):
+    scheduler = ConversationScheduler(debounce_seconds=0.05 if cancel_while == "debouncing" else 0, max_wait_seconds=1)
+
+    async def execute():
+        await asyncio.sleep(1)
+
+    async def main():
+        request = asyncio.ensure_future(scheduler.submit("conversation", 1, execute))
+        await asyncio.sleep(0.01)
+        scheduler._lanes["conversation"].worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(request, timeout=1)
+
+    asyncio.run(main())
+    assert scheduler.stats()["active_conversations"] == 0
@@ -0,0 +1,180 @@
+import random
+import statistics
+from typing import List, Optional, Sequence
+
+import pytest
+
+from app.analytics.cpm_index import CampaignCPMIndex
+from app.analytics.features import CreatorFeatures
+from app.models.cpm_analysis import (
+    _CAUTION_FILL_HEAP_SIZE,
+    CPMAnalysisResponse,
+    CPMCheatSheet,
+    CPMKeyTakeaways,
+    CPMPerformerEntry,
+    CPMTableEntry,
+    compute_cpm_stats,
+)
+
+
+def legacy_key_takeaways(creator_ranking: List[CPMTableEntry]) -> CPMKeyTakeaways:
+    """The multi-pass implementation generate_key_takeaways replaced."""
+    if not creator_ranking:
+        return CPMKeyTakeaways(
+            cheatsheet=CPMCheatSheet(low_cpm=0, high_cpm=0, median_cpm=0, average_cpm=0),
+            top_performers=[], solid_value=[], caution_zone=[]
+        )
+    cpm_values = [entry.cpm_usd for entry in creator_ranking]
+    median_cpm = statistics.median(cpm_values)
+    cheatsheet = CPMCheatSheet(
+        low_cpm=round(min(cpm_values), 2),
+        high_cpm=round(max(cpm_values), 2),
+        median_cpm=round(median_cpm, 2),
+        average_cpm=round(statistics.mean(cpm_values), 2)
+    )
+    top_performers, solid_value, caution_zone = [], [], []
+    high_threshold = median_cpm * 2
+    very_high_threshold = median_cpm * 4
+
+    for entry in creator_ranking:
+        creator_entry = CPMPerformerEntry(creator=entry.handle, cpm_usd=round(entry.cpm_usd, 2), note="")
+        if entry.cpm_usd <= median_cpm:
+            if entry.mean_views >= 100000:
+                creator_entry.note = "Top reach, best value"
+            elif entry.brand_fit >= 3:
+                creator_entry.note = "Great fit, strong value"
+            else:
+                creator_entry.note = "Engaged micro, low cost"
+            if len(top_performers) < 3:
+                top_performers.append(creator_entry)
+        elif entry.cpm_usd <= high_threshold:
+            if entry.mean_views >= 50000:
+                creator_entry.note = "High views, solid cost"
+            elif entry.brand_fit >= 3:
+                creator_entry.note = "Balanced cost and fit"
+            else:
+                creator_entry.note = "Fair cost, decent reach"
+            if len(solid_value) < 3:
+                solid_value.append(creator_entry)
+        elif entry.cpm_usd >= very_high_threshold:
+            if entry.mean_views < 20000:
+                creator_entry.note = "Costly, poor efficiency"
+            elif entry.mean_views < 50000:
+                creator_entry.note = "High cost, low reach"
+            else:
+                creator_entry.note = "Limited ROI despite fit"
+            if len(caution_zone) < 3:
+                caution_zone.append(creator_entry)
+
+    remaining_creators = [entry for entry in creator_ranking
+                          if entry.cpm_usd > median_cpm and entry.cpm_usd <= high_threshold]
+    for entry in remaining_creators:
+        if len(solid_value) >= 3:
+            break
+        if not any(sv.creator == entry.handle for sv in solid_value):
+            solid_value.append(CPMPerformerEntry(
+                creator=entry.handle, cpm_usd=round(entry.cpm_usd, 2), note="Balanced cost and performance"
+            ))
+
+    high_cpm_creators = [entry for entry in creator_ranking if entry.cpm_usd > high_threshold]
+    high_cpm_creators.sort(key=lambda x: x.cpm_usd, reverse=True)
+    for entry in high_cpm_creators:
+        if len(caution_zone) >= 3:
+            break
+        if not any(cz.creator == entry.handle for cz in caution_zone):
+            caution_zone.append(CPMPerformerEntry(
+                creator=entry.handle, cpm_usd=round(entry.cpm_usd, 2), note="High CPM, review efficiency"
+            ))
+
+    return CPMKeyTakeaways(
+        cheatsheet=cheatsheet, top_performers=top_performers, solid_value=solid_value, caution_zone=caution_zone
+    )
+
+
+def ranking_of(cpms: Sequence[float], handles: Optional[Sequence[str]] = None, seed: int = 0) -> List[CPMTableEntry]:
+    """Ranking entries with the given CPMs, in the given order."""
+    rng = random.Random(seed)
+    return [
+        CPMTableEntry(
+            rank=rank,
+            handle=handles[rank - 1] if handles else f"creator_{rank}",
+            brand_fit=rng.randint(1, 5),
+            rate_usd=cpm * 10,
+            mean_views=rng.choice([5_000, 19_999, 20_000, 49_999, 50_000, 99_999, 100_000, 1_000_000]),
+            cpm_usd=cpm,
+            outlier_rate_pct=0.0,
+        )
+        for rank, cpm in enumerate(cpms, 1)
+    ]
+
+
+def random_ranking(rng: random.Random, size: int, sort: bool = True, handles: int = 0,
+                   cpm_choices: Optional[List[float]] = None) -> List[CPMTableEntry]:
+    cpms = [rng.choice(cpm_choices) if cpm_choices else rng.lognormvariate(2.5, 1.2) for _ in range(size)]
+    if sort:
+        cpms.sort()
+    names = [f"creator_{rng.randrange(handles) if handles else index}" for index in range(size)]
+    return ranking_of(cpms, names, seed=rng.randrange(1 << 30))
+
+
+def assert_matches_legacy(ranking: List[CPMTableEntry]) -> None:
+    expected = legacy_key_takeaways(ranking).model_dump()
+    assert CPMAnalysisResponse.generate_key_takeaways(ranking).model_dump() == expected
+    if ranking:
+        stats = compute_cpm_stats([entry.cpm_usd for entry in ranking])
+        assert CPMAnalysisResponse.generate_key_takeaways(ranking, cpm_stats=stats).model_dump() == expected
+
+
+@pytest.mark.parametrize("ranking", [
+    pytest.param([], id="empty"),
+    pytest.param(ranking_of([12.5]), id="single"),
+    pytest.param(ranking_of([1.0, 3.0]), id="two"),
+    # Fewer rows above twice the median than the caution fill heap holds
+    pytest.param(ranking_of([1.0, 1.0, 1.0, 3.0, 3.5]), id="fewer-than-heap"),
+    pytest.param(ranking_of([1.0] * 6 + [2.5] * (_CAUTION_FILL_HEAP_SIZE - 1)), id="heap-size-minus-one"),
+    pytest.param(ranking_of([1.0] * 8 + [2.5] * _CAUTION_FILL_HEAP_SIZE), id="heap-size"),
+    # Ties
+    pytest.param(ranking_of([7.0] * 9), id="all-tied"),
+    pytest.param(ranking_of([0.0] * 7), id="all-zero"),
+    pytest.param(ranking_of([0.0, 0.0, 0.0, 1.0, 50.0]), id="zero-median"),
+    pytest.param(ranking_of([1.0, 1.0, 2.0, 2.0, 2.0, 4.0, 4.0, 4.0, 8.0, 8.0]), id="ties-on-thresholds"),
+    pytest.param(ranking_of([3.0, 1.0, 9.0, 2.0, 30.0, 2.5]), id="unsorted"),
+    # Duplicate handles exhaust the heap before the caution zone is full
+    pytest.param(
+        ranking_of([1.0] * 12 + [3.0] * 2 + [3.5] * 8, ["a"] * 12 + ["b", "c"] + ["d"] * 8),
+        id="duplicate-handles-past-heap",
+    ),
+])
+def test_key_takeaways_match_legacy(ranking):
+    assert_matches_legacy(ranking)
+
+
+def test_random_key_takeaways_match_legacy():
+    rng = random.Random(11)
+    for _ in range(500):
+        size = rng.randint(1, 60)
+        assert_matches_legacy(random_ranking(
+            rng,
+            size,
+            sort=rng.random() < 0.8,
+            handles=rng.choice([0, 0, 2, 4, size]),
+            cpm_choices=rng.choice([None, None, [0.0, 1.0, 2.0, 4.0, 8.0, 20.0]]),
+        ))
+
+
+def test_all_null_cpm_campaign_has_empty_takeaways():
+    # Creators without prices or views have no CPM and are left out of the ranking
+    features = [
+        CreatorFeatures(
+            creator_id=creator_id, username=f"creator_{creator_id}", evaluation_score=3, network="instagram",
+            followers=None, bio=None, mean_views=mean_views, video_summary={}, prices=prices,
+            has_formal_rates=bool(prices), rate_min_usd=None, rate_max_usd=None, profile={},
+        )
+        for creator_id, mean_views, prices in [(1, None, ((500.0, "USD"),)), (2, 10_000.0, ()), (3, None, ())]
+    ]
+    index = CampaignCPMIndex.from_features(features)
+
+    assert len(index) == 0
+    assert index.cpm_stats() is None
+    assert index.entries() == []
+    assert index.key_takeaways().model_dump() == legacy_key_takeaways([]).model_dump()
@@ -0,0 +1,66 @@
+import pytest
+
+from app.agents.preclassifier import AUTO_REPLY, BOUNCE, OUT_OF_OFFICE, THANKS, classify_message
+from app.models.conversation import Message
+
+QUOTED_OFFER = "\n\nOn Mon, Jun 3, 2024 at 10:00 AM Brand Team <team@brand.com> wrote:\n> Would you do a reel for $500?"
+LONG_REPLY = (
+    "Hi! Sorry for the slow answer, I just got back and went through everything you sent over. "
+    "The concept looks fun and I think my audience would really enjoy it. I can film next week "
+    "and share a draft with you on Thursday so you have time to review it before it goes live."
+)
+
+
+@pytest.mark.parametrize("sender, subject, body, expected", [
+    # Delivery failures
+    ("mailer-daemon@googlemail.com", "Delivery Status Notification (Failure)", "Address not found.", BOUNCE),
+    ("postmaster@outlook.com", "Undeliverable: Collab", "Your message couldn't be delivered.", BOUNCE),
+    ("MAILER-DAEMON@example.com", "Hello", "", BOUNCE),
+    # Out-of-office notices
+    ("creator@example.com", "Out of Office: Collab", "I am out of the office until June 10.", OUT_OF_OFFICE),
+    ("creator@example.com", "Re: Collab", "I'm currently on vacation until Monday with limited access to email.", OUT_OF_OFFICE),
+    ("creator@example.com", "Abwesenheitsnotiz", "Ich bin bis 12.06. abwesend.", OUT_OF_OFFICE),
+    ("creator@example.com", "Out of office", "", OUT_OF_OFFICE),
+    ("creator@example.com", "OOO", "Back on the 10th.", OUT_OF_OFFICE),
+    ("creator@example.com", "Re: Collab", "I'm on vacation until Monday and will reply when I'm back.", OUT_OF_OFFICE),
+    ("creator@example.com", "Re: Collab", "I am out of the office. I can be reached on my phone for urgent matters.", OUT_OF_OFFICE),
+    # Automatic replies
+    ("creator@example.com", "Automatic reply: Collab", "", AUTO_REPLY),
+    ("support@agency.com", "Re: Collab", "This is an automated message. Please do not reply to this email.", AUTO_REPLY),
+    ("creator@example.com", "Re: Collab", "We have received your email and will get back to you shortly.", AUTO_REPLY),
+    # Bare thanks
+    ("creator@example.com", "Re: Collab", "Thanks!", THANKS),
+    ("creator@example.com", "Re: Collab", "Perfect, thank you so much 🙏", THANKS),
+    ("creator@example.com", "Re: Collab", "Got it, thanks for the update!" + QUOTED_OFFER, THANKS),
+])
+def test_classifies_trivial_messages(sender, subject, body, expected):
+    message = Message(id=1, sender=sender, subject=subject, body=body)
+    assert classify_message(message) == expected
+
+
+@pytest.mark.parametrize("sender, subject, body", [
+    # A real reply that keeps an out-of-office or auto-reply subject
+    ("creator@example.com", "Re: Out of office", LONG_REPLY),
+    ("creator@example.com", "Re: Automatic reply: Collab", LONG_REPLY),
+    ("creator@example.com", "On leave next month", LONG_REPLY),
+    # Notices that also carry negotiation content
+    ("creator@example.com", "Out of Office", "I'm out of the office until Monday, but my rate is $500 per reel."),
+    ("creator@example.com", "Re: Collab", "I am on vacation until Friday. Can you send the contract?"),
+    ("creator@example.com", "Automatic reply", "Our price list is attached."),
+    # Thanks followed by more than thanks
+    ("creator@example.com", "Re: Collab", "Thanks! What would the budget be?"),
+    ("creator@example.com", "Re: Collab", "Thanks, but I only do stories."),
+    ("creator@example.com", "Re: Collab", "Thank you, I'll send the draft tomorrow."),
+    # Wording that only resembles a notice
+    ("creator@example.com", "Re: Collab", "I was out of office last week, happy to start now."),
+    ("creator@example.com", "Re: Collab", "Ooo I love this idea, count me in."),
+    ("creator@example.com", "Re: my absence", "Sure, send me the brief and I will get started."),
+    ("creator@example.com", "Re: on leave", "Sure, send me the brief and I will get started."),
+    ("creator@example.com", "Re: Collab", "I will be away until Monday, then I can shoot the reel."),
+    ("creator@example.com", "Out of office", "Sure, count me in."),
+    ("creator@example.com", "Re: Collab", "Ok"),
+    ("creator@example.com", "Re: Collab", ""),
+])
+def test_leaves_real_replies_to_the_agents(sender, subject, body):
+    message = Message(id=1, sender=sender, subject=subject, body=body)
+    assert classify_message(message) is None
@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.analytics.video_summary import summarize_video_analysis
+
+ROOT = Path(__file__).resolve().parent.parent
+CASES = json.loads((ROOT / "tests" / "fixtures" / "video_summary_cases.json").read_text())
+TRIGGER_MIGRATION = ROOT / "supabase" / "migrations" / "20261017000400_creators_platform_video_summary_trigger.sql"
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_python_summary(case):
+    assert summarize_video_analysis(case["video_analysis"], case["network"]) == case["expected"]
+
+
+@pytest.fixture(scope="module")
+def database():
+    # The SQL side needs a scratch Postgres, e.g. TEST_DATABASE_URL=postgresql://localhost/postgres
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    psycopg = pytest.importorskip("psycopg")
+    with psycopg.connect(url) as connection:
+        with connection.cursor() as cursor:
+            # A temporary creators_platform shadows any real one, and the rollback
+            # below drops the migration's functions and trigger again
+            cursor.execute(
+                "create temporary table creators_platform ("
+                " id serial primary key, network text, video_analysis jsonb,"
+                " video_summary jsonb, mean_views double precision)"
+            )
+            cursor.execute(TRIGGER_MIGRATION.read_text())
+            yield cursor
+        connection.rollback()
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_sql_trigger_matches_python(database, case):
+    database.execute(
+        "insert into creators_platform (network, video_analysis) values (%s, %s::jsonb)"
+        " returning video_summary, mean_views",
+        (case["network"], json.dumps(case["video_analysis"])),
+    )
+    video_summary, mean_views = database.fetchone()
+    assert video_summary == case["expected"]
+    assert mean_views == (case["expected"] or {}).get("mean_views")